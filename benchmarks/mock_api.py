@@ -0,0 +1,50 @@
+"""Time common call patterns against the offline mock server.
+
+Every request gets the same fixed latency, so the results only depend on the
+number of round trips and how many of them overlap.
+
+Usage:
+  python benchmarks/mock_api.py [LATENCY_MS] [ROUNDS]
+"""
+
+import os
+import sys
+import time
+
+from libtado.mock import MockTadoServer
+from libtado.transport import Transport
+
+FIXTURES = os.path.join(os.path.dirname(__file__), '..', 'tests', 'fixtures', 'tado.json')
+
+
+def timed(func, rounds):
+  started = time.perf_counter()
+  for _ in range(rounds):
+    func()
+  return (time.perf_counter() - started) * 1000 / rounds
+
+
+def main():
+  latency = float(sys.argv[1]) / 1000 if len(sys.argv) > 1 else 0.02
+  rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+  with MockTadoServer(FIXTURES, latency=latency) as server:
+    t = server.client()
+    cached = server.client(cache=True)
+    closing = server.client(transport=Transport(keep_alive=False))
+    conditional = server.client(conditional=True)
+    zones = [z['id'] for z in t.get_zones()]
+    cases = (
+      ('get_state per zone', lambda: [t.get_state(zone) for zone in zones]),
+      ('map_zones get_state', lambda: t.map_zones('get_state', zones=zones)),
+      ('get_zone_states', t.get_zone_states),
+      ('get_zone_states, no keep-alive', closing.get_zone_states),
+      ('get_zone_states, conditional', conditional.get_zone_states),
+      ('get_zones, cached', cached.get_zones),
+    )
+    for name, func in cases:
+      func()
+      print('%-32s %8.2f ms' % (name, timed(func, rounds)))
+
+
+if __name__ == '__main__':
+  main()
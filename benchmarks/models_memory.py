@@ -0,0 +1,75 @@
+"""Compare the memory held by zone states kept as dictionaries and as models.
+
+Usage:
+  python benchmarks/models_memory.py [COUNT]
+"""
+
+import gc
+import json
+import sys
+import tracemalloc
+
+from libtado.models import ZoneState
+
+STATE = {
+  'tadoMode': 'HOME',
+  'geolocationOverride': False,
+  'geolocationOverrideDisableTime': None,
+  'preparation': None,
+  'setting': {'type': 'HEATING', 'power': 'ON', 'temperature': {'celsius': 21.0, 'fahrenheit': 69.8}},
+  'overlayType': 'MANUAL',
+  'overlay': {
+    'type': 'MANUAL',
+    'setting': {'type': 'HEATING', 'power': 'ON', 'temperature': {'celsius': 22.0, 'fahrenheit': 71.6}},
+    'termination': {'type': 'MANUAL', 'typeSkillBasedApp': 'MANUAL', 'projectedExpiry': None},
+  },
+  'openWindow': None,
+  'nextScheduleChange': {
+    'start': '2023-01-01T16:00:00Z',
+    'setting': {'type': 'HEATING', 'power': 'ON', 'temperature': {'celsius': 20.0, 'fahrenheit': 68.0}},
+  },
+  'nextTimeBlock': {'start': '2023-01-01T16:00:00.000Z'},
+  'link': {'state': 'ONLINE'},
+  'activityDataPoints': {'heatingPower': {'type': 'PERCENTAGE', 'percentage': 0.0, 'timestamp': '2023-01-01T11:56:52.204Z'}},
+  'sensorDataPoints': {
+    'insideTemperature': {
+      'celsius': 20.5, 'fahrenheit': 68.9, 'timestamp': '2023-01-01T11:58:29.201Z', 'type': 'TEMPERATURE',
+      'precision': {'celsius': 0.1, 'fahrenheit': 0.1},
+    },
+    'humidity': {'type': 'PERCENTAGE', 'percentage': 45.2, 'timestamp': '2023-01-01T11:58:29.201Z'},
+  },
+}
+
+
+def measure(build, count):
+  payload = json.dumps(STATE)
+  gc.collect()
+  tracemalloc.start()
+  kept = [build(json.loads(payload)) for _ in range(count)]
+  gc.collect()
+  size, _ = tracemalloc.get_traced_memory()
+  tracemalloc.stop()
+  del kept
+  return size
+
+
+def decoded(data):
+  state = ZoneState(data)
+  for name in ('setting', 'overlay', 'next_schedule_change', 'next_time_block', 'link', 'activity_data_points', 'sensor_data_points'):
+    value = getattr(state, name)
+    for field in getattr(value, 'fields', ()):
+      getattr(value, field)
+  return state
+
+
+def main():
+  count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+  raw = measure(lambda data: data, count)
+  print('%-24s %8.1f KiB  %6.0f B/state' % ('dict', raw / 1024, raw / count))
+  for name, build in (('ZoneState (lazy)', ZoneState), ('ZoneState (decoded)', decoded)):
+    size = measure(build, count)
+    print('%-24s %8.1f KiB  %6.0f B/state  %+.0f%%' % (name, size / 1024, size / count, (size - raw) * 100.0 / raw))
+
+
+if __name__ == '__main__':
+  main()
@@ -6,6 +6,8 @@ import time
 from dateutil.parser import parse
 from dateutil import tz
 import libtado.api
+import libtado.schedule
+import libtado.tokenstore
 
 CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 
@@ -13,8 +15,9 @@ CONTEXT_SETTINGS = dict(help_option_names=['-h', '--help'])
 @click.option('--username', '-u', required=True, envvar='TADO_USERNAME', help='Tado username')
 @click.option('--password', '-p', required=True, envvar='TADO_PASSWORD', help='Tado password')
 @click.option('--client-secret', '-c', required=True, envvar='TADO_CLIENT_SECRET', help='Tado client secret')
+@click.option('--token-store', '-t', envvar='TADO_TOKEN_STORE', type=click.Path(dir_okay=False), help='File to keep the session in between runs')
 @click.pass_context
-def main(ctx, username, password, client_secret):
+def main(ctx, username, password, client_secret, token_store):
   """
   Example
   =======
@@ -23,10 +26,15 @@ def main(ctx, username, password, client_secret):
   You can use the environment variables TADO_USERNAME, TADO_PASSWORD and
   TADO_CLIENT_SECRET instead of the command line options.
 
+  With --token-store (or TADO_TOKEN_STORE) the session is saved to a file and
+  reused by later runs, which then skip the password login.
+
   Call 'tado COMMAND --help' to see available options for subcommands.
   """
 
-  ctx.obj = libtado.api.Tado(username, password, client_secret)
+  if token_store:
+    token_store = libtado.tokenstore.FileTokenStore(token_store)
+  ctx.obj = libtado.api.Tado(username, password, client_secret, token_store=token_store, lazy=True)
 
 
 @main.command()
@@ -178,27 +186,43 @@ def whoami(tado):
   click.echo('Mobile Devices: %s' % me['mobileDevices'])
 
 
-@main.command(short_help='Get the current state of a zone.')
-@click.option('--zone', '-z', required=True, type=int, help='Zone ID')
+@main.command(short_help='Get the current state of one or more zones.')
+@click.option('--zone', '-z', required=True, type=int, multiple=True, help='Zone ID (repeat for several zones)')
 @click.pass_obj
 def zone(tado, zone):
   """
-  Get the current state of a zone. Including temperature, humidity and
-  heating power.
+  Get the current state of one or more zones. Including temperature, humidity
+  and heating power.
+
+  Several zones are fetched with a single request.
   """
-  zone = tado.get_state(zone)
-  click.echo('Desired Temperature : %s' % zone['setting']['temperature']['celsius'])
-  click.echo('Current Temperature: %s' % zone['sensorDataPoints']['insideTemperature']['celsius'])
-  click.echo('Current Humidity: %s%%' % zone['sensorDataPoints']['humidity']['percentage'])
-  click.echo('Heating Power : %s%%' % zone['activityDataPoints']['heatingPower']['percentage'])
-  click.echo('Mode : %s' % zone['tadoMode'])
-  click.echo('Link : %s' % zone['link']['state'])
+  if len(zone) == 1:
+    states = {zone[0]: tado.get_state(zone[0])}
+  else:
+    zone_states = tado.get_zone_states()['zoneStates']
+    for z in zone:
+      if str(z) not in zone_states:
+        raise click.BadParameter('unknown zone %s' % z, param_hint="'--zone'")
+    states = {z: zone_states[str(z)] for z in zone}
+
+  for z, state in states.items():
+    if len(states) > 1:
+      click.echo('Zone %s:' % z)
+    click.echo('Desired Temperature : %s' % state['setting']['temperature']['celsius'])
+    click.echo('Current Temperature: %s' % state['sensorDataPoints']['insideTemperature']['celsius'])
+    click.echo('Current Humidity: %s%%' % state['sensorDataPoints']['humidity']['percentage'])
+    click.echo('Heating Power : %s%%' % state['activityDataPoints']['heatingPower']['percentage'])
+    click.echo('Mode : %s' % state['tadoMode'])
+    click.echo('Link : %s' % state['link']['state'])
 
 @main.command(short_help='Show current status.')
+@click.option('--watch', '-w', type=float, metavar='INTERVAL', help='Refresh the status in place every INTERVAL seconds')
 @click.pass_obj
-def status(tado):
+def status(tado, watch):
   """
   Show the current home status in a list form
+
+  The states of all zones are fetched with a single request.
   """
 
   def time_str(time_str):
@@ -299,12 +323,24 @@ def status(tado):
 
   zone_info = tado.get_zones()
 
-  for i in zone_info:
-    st = tado.get_state(i['id'])
-    if i['type'] == 'HEATING':
-      show_heating(st)
-    elif i['type'] == 'HOT_WATER':
-      show_hot_water(st)
+  while True:
+    zone_states = tado.get_zone_states()['zoneStates']
+    if watch:
+      click.clear()
+    for i in zone_info:
+      st = zone_states.get(str(i['id']))
+      if st is None:
+        continue
+      if i['type'] == 'HEATING':
+        show_heating(st)
+      elif i['type'] == 'HOT_WATER':
+        show_hot_water(st)
+    if not watch:
+      break
+    try:
+      time.sleep(watch)
+    except KeyboardInterrupt:
+      break
 
 
 @main.command(short_help='Get configuration information about all zones.')
@@ -322,13 +358,70 @@ def zones(tado):
 
 
 @main.command()
-@click.option('--zone', '-z', required=True, type=int, help='Zone ID')
-@click.option('--temperature', '-t', required=True, type=int, help='Temperature')
+@click.option('--zone', '-z', type=int, multiple=True, help='Zone ID (repeat for several zones)')
+@click.option('--all', 'all_zones', is_flag=True, help='Set every zone of the home')
+@click.option('--temperature', '-t', required=True, type=float, help='Temperature')
 @click.option('--termination', '-x', default='MANUAL', help='Termination settings')
 @click.pass_obj
-def set_temperature(tado, zone, temperature, termination):
-  """Set the desired temperature of a zone."""
-  tado.set_temperature(zone, temperature, termination=termination)
+def set_temperature(tado, zone, all_zones, temperature, termination):
+  """
+  Set the desired temperature of one or more zones.
+
+  Several zones are set concurrently, after checking the temperature against
+  the range of each zone.
+  """
+  if all_zones:
+    zone = [z['id'] for z in tado.get_zones()]
+  if not zone:
+    raise click.UsageError('Pass --zone or --all.')
+  if len(zone) == 1 and not all_zones:
+    tado.set_temperature(zone[0], temperature, termination=termination)
+    return
+
+  results = tado.set_temperatures(dict.fromkeys(zone, temperature), termination=termination)
+  failed = 0
+  for z, result in results.items():
+    if isinstance(result, Exception):
+      failed += 1
+      click.echo('Zone %s: failed: %s' % (z, result), err=True)
+    else:
+      click.echo('Zone %s: ok' % z)
+  if failed:
+    raise click.ClickException('%i of %i zones failed' % (failed, len(results)))
+
+
+@main.group(short_help='Manage the schedules of the zones.')
+def schedule():
+  """Manage the schedules of the zones."""
+
+
+@schedule.command(short_help='Apply a schedule file to zones.')
+@click.argument('file', type=click.Path(exists=True, dir_okay=False))
+@click.option('--zone', '-z', type=int, multiple=True, help='Zone ID (repeat for several zones)')
+@click.option('--all', 'all_zones', is_flag=True, help='Apply to every zone of the home')
+@click.option('--dry-run', '-n', is_flag=True, help='Only print the changes')
+@click.pass_obj
+def apply(tado, file, zone, all_zones, dry_run):
+  """
+  Apply the schedule of FILE to zones, writing only the timetables and day
+  types that differ.
+
+  FILE is a JSON file with the timetable type, the blocks of each day type
+  and optionally the zones to apply it to (see libtado.schedule). Without
+  --zone or --all, the zones of the file are used.
+  """
+  desired = libtado.schedule.load_schedule(file)
+  zones = list(zone) or None
+  if all_zones:
+    zones = [z['id'] for z in tado.get_zones()]
+  if zones is None and not desired.zones:
+    raise click.UsageError('Pass --zone or --all, or list the zones in the file.')
+
+  plan = tado.sync_schedule(desired, zones=zones, dry_run=dry_run)
+  click.echo(str(plan))
+  if plan.failed:
+    failed = set(plan.errors) | {change.zone for change in plan if change.failed}
+    raise click.ClickException('%i of %i zones failed' % (len(failed), len(plan.zones)))
 
 
 @main.command()
@@ -0,0 +1,551 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.aio
+
+This module provides an asyncio flavour of `libtado.api.Tado`.
+
+`AsyncTado` inherits every getter and setter of `Tado`, so both classes share
+the same endpoint definitions. Only the request layer is replaced: instead of
+returning decoded JSON, every method returns an awaitable which performs the
+call on a shared `aiohttp` connection pool.
+
+It requires the optional `aiohttp` dependency (`pip install libtado[async]`).
+
+Example:
+  import asyncio
+  from libtado.aio import AsyncTado
+
+  async def main():
+    async with AsyncTado('Username', 'Password', 'ClientSecret') as t:
+      zones, states = await asyncio.gather(t.get_zones(), t.get_zone_states())
+      await t.set_temperature(1, 21, 'MANUAL')
+
+  asyncio.run(main())
+"""
+
+import asyncio
+import contextlib
+import datetime
+import threading
+import time
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+  import aiohttp
+except ImportError:
+  aiohttp = None
+
+from libtado.api import Tado, turns_off
+from libtado.energy import merge_consumption
+from libtado.pipeline import Request
+from libtado.reports import ReportCache, date_range
+from libtado.schedule import CompiledSchedule, Plan
+
+
+_token_stores = weakref.WeakKeyDictionary()
+_token_stores_lock = threading.Lock()
+
+
+def _token_store_state(store):
+  """
+  Returns:
+    (tuple): The worker thread every call to `store` goes through, and the
+      `asyncio.Lock` of `store` per event loop.
+  """
+  with _token_stores_lock:
+    state = _token_stores.get(store)
+    if state is None:
+      executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='libtado-token-store')
+      state = _token_stores[store] = (executor, weakref.WeakKeyDictionary())
+    return state
+
+
+class AsyncTransport:
+  """
+  Pooled keep-alive HTTP transport for asyncio.
+
+  The underlying `aiohttp.ClientSession` is created lazily, inside the running
+  event loop, on the first request.
+
+  Parameters:
+    pool_size (int): Maximum number of connections kept open per host.
+    keep_alive (bool): Whether connections are kept open between requests.
+    limit (int): Maximum number of connections across all hosts.
+  """
+  default_pool_size = 10
+
+  def __init__(self, pool_size=None, keep_alive=True, limit=100):
+    if aiohttp is None:
+      raise ImportError('AsyncTransport requires aiohttp: pip install libtado[async]')
+    self.pool_size = pool_size or self.default_pool_size
+    self.keep_alive = keep_alive
+    self.limit = limit
+    self.session = None
+
+  def _get_session(self):
+    if self.session is None or self.session.closed:
+      connector = aiohttp.TCPConnector(limit=self.limit, limit_per_host=self.pool_size, force_close=not self.keep_alive)
+      self.session = aiohttp.ClientSession(connector=connector)
+    return self.session
+
+  async def request(self, method, url, timeout, **kwargs):
+    """
+    Send a request and read its body.
+
+    Parameters:
+      method (str): HTTP verb.
+      url (str): Absolute URL.
+      timeout (float): Total timeout in seconds.
+      **kwargs: Passed to `aiohttp.ClientSession.request`.
+
+    Returns:
+      (tuple): The HTTP status, the response headers and the raw body.
+    """
+    session = self._get_session()
+    async with session.request(method, url, timeout=aiohttp.ClientTimeout(total=timeout), **kwargs) as r:
+      body = await r.read()
+      r.raise_for_status()
+      return r.status, r.headers, body
+
+  async def close(self):
+    """Close every pooled connection."""
+    if self.session is not None:
+      await self.session.close()
+      self.session = None
+
+
+class AsyncTado(Tado):
+  """
+  Asyncio client for the Tado API.
+
+  Construction does no I/O. Call `await login()` (or use the instance as an
+  async context manager) before calling any endpoint, or pass `home_id` to
+  authenticate on the first call. Every `Tado` method is available and
+  returns an awaitable.
+
+  Parameters:
+    username (str): Tado username.
+    password (str): Tado password.
+    secret (str): Tado client secret.
+    transport (AsyncTransport): Transport to use. Share one between several
+      instances to share their connection pool.
+    pool_size (int): Connections kept open per host.
+    keep_alive (bool): Whether to keep connections open between requests.
+    cache (bool|ResponseCache): Cache responses of slow-changing resources.
+    token_store (TokenStore): Persist tokens and the home ID, and resume from
+      them instead of logging in with the password.
+    home_id (int): ID of the home to use. Skips the `get_me` lookup.
+    retry (bool|RetryPolicy): Retry failed idempotent requests.
+    rate_limiter (RateLimiter): Limit the outgoing request rate per host,
+      waiting without blocking the event loop.
+    conditional (bool|ValidatorCache): Send conditional GET requests and
+      reuse the previous result on `304 Not Modified`.
+    codec (str|Codec): JSON codec of request and response bodies. The
+      fastest installed one when omitted.
+    middleware (list): Extra `libtado.pipeline.Middleware` run on every API
+      call, see `Tado`. Their `handle_async` method is used.
+    metrics (Sink|list): Record every API call, login and token refresh into
+      one or more sinks of `libtado.metrics`.
+  """
+
+  def __init__(self, username, password, secret, transport=None, pool_size=None, keep_alive=True, cache=None, token_store=None, home_id=None, retry=None, rate_limiter=None, conditional=None, codec=None, middleware=None, metrics=None):
+    self.username = username
+    self.password = password
+    self.secret = secret
+    if transport is None:
+      transport = AsyncTransport(pool_size=pool_size, keep_alive=keep_alive)
+    self.transport = transport
+    errors = (aiohttp.ClientConnectionError, asyncio.TimeoutError) if aiohttp is not None else ()
+    self._configure(retry, cache, conditional, codec, rate_limiter, metrics, middleware, token_store, home_id, errors)
+    self._lock = None
+
+  @property
+  def id(self):
+    """The home ID. Resolved by `login` when not passed to the constructor."""
+    if self._id is None:
+      raise RuntimeError('Home ID unknown: await login() first or pass home_id')
+    return self._id
+
+  @id.setter
+  def id(self, value):
+    self._id = value
+
+  @property
+  def _auth_lock(self):
+    # Created on first use so that it binds to the running event loop.
+    if self._lock is None:
+      self._lock = asyncio.Lock()
+    return self._lock
+
+  async def __aenter__(self):
+    await self.login()
+    return self
+
+  async def __aexit__(self, *exc):
+    await self.close()
+
+  @classmethod
+  async def create(cls, *args, **kwargs):
+    """Build an instance and log it in."""
+    self = cls(*args, **kwargs)
+    await self.login()
+    return self
+
+  async def login(self):
+    """Authenticate and resolve the home ID, or resume from the token store."""
+    if not await self._in_store(self._resume):
+      async with self._auth_lock:
+        await self._login()
+      await self._in_store(self._save_token)
+    if self._id is None:
+      me = await self.get_me()
+      self.id = me['homes'][0]['id']
+      await self._in_store(self._save_token)
+
+  async def close(self):
+    """
+    Stop the background refresh and close the connections held by the
+    transport, unless this is a view returned by `home`.
+    """
+    if self._root is not self:
+      return
+    await self.stop_auto_refresh()
+    await self.transport.close()
+
+  async def homes(self):
+    me = await self.get_me()
+    return me['homes']
+  homes.__doc__ = Tado.homes.__doc__
+
+  async def map_homes(self, method, *args, homes=None, max_workers=None):
+    if homes is None:
+      homes = [h['id'] for h in await self.homes()]
+    semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+    async def call(home_id):
+      async with semaphore:
+        try:
+          return home_id, await getattr(self.home(home_id), method)(*args)
+        except Exception as e:
+          return home_id, e
+    return dict(await asyncio.gather(*[call(home_id) for home_id in homes]))
+  map_homes.__doc__ = Tado.map_homes.__doc__
+
+  async def _token_request(self, data):
+    _, _, body = await self.transport.request('POST', self.api_auth, self.timeout, data=data)
+    response = self.codec.loads(body)
+    self._set_token(response['access_token'], response['refresh_token'], time.time() + float(response['expires_in']))
+
+  async def _login(self):
+    """Login and setup the HTTP session."""
+    data = { 'client_id'     : 'tado-web-app',
+             'client_secret' : self.secret,
+             'grant_type'    : 'password',
+             'password'      : self.password,
+             'scope'         : 'home.user',
+             'username'      : self.username }
+    with self._timed('login'):
+      await self._token_request(data)
+
+  async def refresh_auth(self, margin=None):
+    if margin is None:
+      margin = self.refresh_margin
+    if self._root is not self:
+      root = self._root
+      await root.refresh_auth(margin)
+      self.access_token = root.access_token
+      self.refresh_token = root.refresh_token
+      self.token_expiry = root.token_expiry
+      self.access_headers = root.access_headers
+      return
+    if time.time() < self.token_expiry - margin:
+      return
+    async with self._auth_lock:
+      if time.time() < self.token_expiry - margin:
+        return
+      if self.token_store is None:
+        await self._refresh()
+        return
+      async with self._store_lock():
+        token = await self._in_store(self.token_store.load, self.username)
+        if token and time.time() < token['token_expiry'] - margin:
+          self._set_token(token['access_token'], token['refresh_token'], token['token_expiry'])
+          return
+        await self._refresh()
+        await self._in_store(self._save_token)
+  refresh_auth.__doc__ = Tado.refresh_auth.__doc__
+
+  async def _in_store(self, func, *args):
+    """
+    Call `func`, which uses the token store, on the worker thread of the
+    store: its locks are thread locks, and the event loop thread must not
+    block on them nor hold them across an await.
+    """
+    if self.token_store is None:
+      return func(*args)
+    executor, _ = _token_store_state(self.token_store)
+    return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+
+  @contextlib.asynccontextmanager
+  async def _store_lock(self):
+    """
+    Hold `TokenStore.lock` while refreshing. Clients of one event loop sharing
+    the store wait on an `asyncio.Lock`, and the store lock itself is taken
+    and released on the worker thread of the store.
+    """
+    _, locks = _token_store_state(self.token_store)
+    loop = asyncio.get_running_loop()
+    with _token_stores_lock:
+      lock = locks.get(loop)
+      if lock is None:
+        lock = locks[loop] = asyncio.Lock()
+    async with lock:
+      held = self.token_store.lock(self.username)
+      await self._in_store(held.__enter__)
+      try:
+        yield
+      finally:
+        await self._in_store(held.__exit__, None, None, None)
+
+  async def start_auto_refresh(self, margin=60):
+    """
+    Refresh the token in a background task of the running event loop ahead
+    of its expiry, so that API calls never wait on the auth server. The task
+    is cancelled by `stop_auto_refresh` and `close`.
+
+    Parameters:
+      margin (float): Seconds before expiry at which the token is refreshed.
+        Should be greater than `Tado.refresh_margin`.
+    """
+    if self._refresher is not None:
+      return
+    async def run():
+      while True:
+        await asyncio.sleep(max(self.token_expiry - margin - time.time(), 1))
+        try:
+          await self.refresh_auth(margin=margin)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+          # Retry later; calls still refresh on their own when needed.
+          await asyncio.sleep(self.timeout)
+    self._refresher = asyncio.ensure_future(run())
+
+  async def stop_auto_refresh(self):
+    """Cancel the background refresh started by `start_auto_refresh`."""
+    if self._refresher is None:
+      return
+    task, self._refresher = self._refresher, None
+    task.cancel()
+    try:
+      await task
+    except asyncio.CancelledError:
+      pass
+
+  async def _refresh(self):
+    if self.refresh_token is None:
+      await self._login()
+      return
+    data = { 'client_id'     : 'tado-web-app',
+             'client_secret' : self.secret,
+             'grant_type'    : 'refresh_token',
+             'refresh_token' : self.refresh_token,
+             'scope'         : 'home.user'
+           }
+    try:
+      with self._timed('refresh'):
+        await self._token_request(data)
+    except aiohttp.ClientResponseError:
+      await self._login()
+  _refresh.__doc__ = Tado._refresh.__doc__
+
+  async def _send(self, request):
+    url = request.url
+    headers = request.headers
+    body = None
+    if request.data is not None:
+      headers = {**headers, **self.json_content}
+      body = self.codec.dumps(request.data)
+    conditional = self.conditional if request.method == 'GET' else None
+    if conditional is not None:
+      status, response_headers, content = await self.transport.request('GET', url, self.timeout, headers={**headers, **conditional.headers(url)})
+      if status == 304:
+        request.context['status'] = 304
+        request.context['not_modified'] = True
+        hit, result = conditional.not_modified(url)
+        if hit:
+          return result
+        status, response_headers, content = await self.transport.request('GET', url, self.timeout, headers=headers)
+    else:
+      status, response_headers, content = await self.transport.request(request.method, url, self.timeout, headers=headers, data=body)
+    request.context['status'] = status
+    request.context['bytes_sent'] = len(body) if body else 0
+    request.context['bytes_received'] = len(content)
+    result = self.codec.loads(content) if content else None
+    if conditional is not None:
+      conditional.store(url, response_headers, result)
+    return result
+  _send.__doc__ = Tado._send.__doc__
+
+  async def _request(self, base, cmd, data=False, method='GET', decode=None):
+    request = Request(self, method, base, cmd, None if data is False else data)
+    result = await self.pipeline.run_async(request)
+    return result if decode is None else decode(result)
+  _request.__doc__ = Tado._request.__doc__
+
+  async def map_zones(self, method, *args, zones=None, max_workers=None, **kwargs):
+    if zones is None:
+      zones = [z['id'] for z in await self.get_zones()]
+    func = getattr(self, method)
+    semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+    async def call(zone):
+      async with semaphore:
+        try:
+          return zone, await func(zone, *args, **kwargs)
+        except Exception as e:
+          return zone, e
+    return dict(await asyncio.gather(*[call(zone) for zone in zones]))
+  map_zones.__doc__ = Tado.map_zones.__doc__
+
+  async def _zone_capabilities(self, zone):
+    key = (self.id, zone)
+    if key not in self._capabilities:
+      self._capabilities[key] = await self.get_capabilities(zone, model=True)
+    return self._capabilities[key]
+  _zone_capabilities.__doc__ = Tado._zone_capabilities.__doc__
+
+  async def set_temperatures(self, temperatures, termination='MANUAL', max_workers=None):
+    zones = [zone for zone, temperature in temperatures.items() if not turns_off(temperature)]
+    capabilities = await self.map_zones('_zone_capabilities', zones=zones, max_workers=max_workers) if zones else {}
+    results = self._check_temperatures(temperatures, capabilities)
+    semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+    async def call(zone):
+      async with semaphore:
+        try:
+          return zone, await self.set_temperature(zone, temperatures[zone], termination)
+        except Exception as e:
+          return zone, e
+    results.update(await asyncio.gather(*[call(zone) for zone in temperatures if zone not in results]))
+    return {zone: results[zone] for zone in temperatures}
+  set_temperatures.__doc__ = Tado.set_temperatures.__doc__
+
+  async def sync_schedule(self, schedule, zones=None, dry_run=False, max_workers=None):
+    if zones is None:
+      zones = schedule.zones or [z['id'] for z in await self.get_zones()]
+    semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+    async def call(func, *args):
+      async with semaphore:
+        try:
+          return await func(*args)
+        except Exception as e:
+          return e
+    reads = await asyncio.gather(*[call(self.get_schedule, zone) for zone in zones], *[call(self.get_schedule_blocks, zone, schedule.id) for zone in zones])
+    changes, errors = [], {}
+    for i, zone in enumerate(zones):
+      current, blocks = reads[i], reads[len(zones) + i]
+      try:
+        for result in (current, blocks):
+          if isinstance(result, Exception):
+            raise result
+        changes.extend(schedule.diff(zone, current, blocks))
+      except Exception as e:
+        errors[zone] = e
+    if not dry_run:
+      failed = {}
+      for blocks in (True, False):
+        batch = [change for change in changes if (change.day_type is not None) == blocks]
+        results = await asyncio.gather(*[call(self._apply_change, change) for change in batch if change.zone not in failed])
+        results = iter(results)
+        for change in batch:
+          change.result = failed[change.zone] if change.zone in failed else next(results)
+        for change in batch:
+          if change.failed:
+            failed.setdefault(change.zone, change.result)
+    return Plan(zones, changes, errors, applied=not dry_run)
+  sync_schedule.__doc__ = Tado.sync_schedule.__doc__
+
+  async def compile_schedule(self, zone, overlay=True):
+    async def timetable():
+      schedule = await self.get_schedule(zone)
+      return schedule, await self.get_schedule_blocks(zone, schedule['id'])
+    reads = [timetable(), self.get_home()]
+    if overlay:
+      reads.append(self.get_state(zone))
+    results = await asyncio.gather(*reads)
+    (schedule, blocks), home = results[0], results[1]
+    return CompiledSchedule.from_api(schedule, blocks, results[2] if overlay else None, home['dateTimeZone'])
+  compile_schedule.__doc__ = Tado.compile_schedule.__doc__
+
+  async def get_energy_consumption_range(self, startDate, endDate, country, cache=None, columnar=False, max_workers=None, ngsw_bypass=True):
+    if isinstance(cache, str):
+      cache = ReportCache(cache, codec=self.codec)
+    months, chunks, fetch = self._consumption_chunks(startDate, endDate, country, cache, ngsw_bypass)
+    semaphore = asyncio.Semaphore(max_workers or self.max_workers)
+    async def call(first, last, closed):
+      async with semaphore:
+        data = await self.get_energy_consumption(first.isoformat(), last.isoformat(), country, ngsw_bypass)
+      if closed and cache is not None:
+        cache.put(self.id, 'consumption/%s/%s' % (country, ngsw_bypass), first.replace(day=1).isoformat(), data)
+      return first.replace(day=1), data
+    chunks.update(await asyncio.gather(*[call(*period) for period in fetch]))
+    return merge_consumption([chunks[first] for first, _ in months], startDate, endDate, columnar)
+  get_energy_consumption_range.__doc__ = Tado.get_energy_consumption_range.__doc__
+
+  async def get_reports(self, zones, start, end, cache=None, max_workers=None):
+    if zones is None:
+      zones = [z['id'] for z in await self.get_zones()]
+    if isinstance(cache, str):
+      cache = ReportCache(cache, codec=self.codec)
+    today = datetime.date.today()
+    home_id = self.id
+
+    pending = []
+    for date in date_range(start, end):
+      for zone in zones:
+        report = None
+        if cache is not None and date < today:
+          report = cache.get(home_id, zone, date.isoformat())
+        if report is not None:
+          yield zone, date.isoformat(), report
+        else:
+          pending.append((zone, date))
+
+    max_workers = max_workers or self.max_workers
+    semaphore = asyncio.Semaphore(max_workers)
+    async def fetch(zone, date):
+      try:
+        async with semaphore:
+          report = await self.get_report(zone, date.isoformat())
+      except Exception as e:
+        return zone, date, e
+      if cache is not None and date < today:
+        cache.put(home_id, zone, date.isoformat(), report)
+      return zone, date, report
+
+    tasks = iter(pending)
+    running = set()
+    try:
+      while True:
+        # Same window as Tado.get_reports: max_workers requests in flight
+        # and as many waiting.
+        for zone, date in tasks:
+          running.add(asyncio.ensure_future(fetch(zone, date)))
+          if len(running) >= max_workers * 2:
+            break
+        if not running:
+          return
+        done, running = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+          zone, date, report = task.result()
+          yield zone, date.isoformat(), report
+    finally:
+      for task in running:
+        task.cancel()
+  get_reports.__doc__ = Tado.get_reports.__doc__
+
+  async def get_boiler_state(self, authKey):
+    devices = await self.get_devices()
+    bridge_serial = [x for x in devices if x['deviceType'] == 'IB01'][0]['serialNo']
+    if not bridge_serial:
+        return None
+    data = await self._api_call('homeByBridge/%s/boilerWiringInstallationState?authKey=%s' % (bridge_serial, authKey))
+    return data
+  get_boiler_state.__doc__ = Tado.get_boiler_state.__doc__
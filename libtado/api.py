@@ -32,9 +32,75 @@ License:
 
 """
 
-import json
-import requests
+import contextlib
+import copy
+import datetime
+import threading
 import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+import requests
+
+from libtado import models
+from libtado.cache import ResponseCache, ValidatorCache
+from libtado.codec import get_codec
+from libtado.energy import merge_consumption, month_ranges
+from libtado.metrics import Metrics, MetricsMiddleware
+from libtado.pipeline import AuthMiddleware, CacheMiddleware, Pipeline, RateLimitMiddleware, Request, RetryMiddleware
+from libtado.reports import ReportCache, date_range
+from libtado.retry import RetryPolicy
+from libtado.schedule import CompiledSchedule, Plan
+from libtado.transport import Transport
+from libtado.writebehind import WriteBehind
+
+_untimed = contextlib.nullcontext()
+
+
+def _settled(result):
+  """
+  Returns:
+    The result of a write, once sent when `Tado.write_behind` returned a
+    `Future` for it, or the exception it raised.
+  """
+  if not isinstance(result, Future):
+    return result
+  try:
+    return result.result()
+  except Exception as e:
+    return e
+
+
+def turns_off(temperature):
+  """
+  Returns:
+    (bool): Whether setting `temperature` turns the zone off, that is when
+      it is `None` or below 5.
+  """
+  return temperature is None or temperature < 5
+
+
+def overlay(temperature, termination='MANUAL'):
+  """
+  Parameters:
+    temperature (float): The desired temperature in celsius. Below 5 or
+      `None` turns the zone off.
+    termination (str/int): `'MANUAL'`, `'AUTO'` or a duration in seconds.
+
+  Returns:
+    (dict): The overlay payload of `Tado.set_temperature`.
+  """
+  if termination == 'MANUAL':
+    termination = { 'type': 'MANUAL' }
+  elif termination == 'AUTO':
+    termination = { 'type': 'TADO_MODE' }
+  else:
+    termination = { 'type': 'TIMER', 'durationInSeconds': termination }
+  if turns_off(temperature):
+    setting = { 'type': 'HEATING', 'power': 'OFF' }
+  else:
+    setting = { 'type': 'HEATING', 'power': 'ON', 'temperature': { 'celsius': temperature } }
+  return { 'setting': setting, 'termination': termination }
+
 
 class Tado:
   json_content        = { 'Content-Type': 'application/json'}
@@ -43,166 +109,495 @@ class Tado:
   api_minder          = 'https://minder.tado.com/v1'
   api_energy_insights = 'https://energy-insights.tado.com/api'
   api_energy_bob      = 'https://energy-bob.tado.com'
+  api_auth            = 'https://auth.tado.com/oauth/token'
   timeout        = 15
+  max_workers    = 8
+  refresh_margin = 30
+  write_behind   = None
 
-  def __init__(self, username, password, secret):
+  def __init__(self, username, password, secret, transport=None, pool_size=None, keep_alive=True, cache=None, token_store=None, lazy=False, home_id=None, auto_refresh=False, retry=None, rate_limiter=None, conditional=None, codec=None, middleware=None, metrics=None, write_behind=None):
+    """
+    Parameters:
+      username (str): Tado username.
+      password (str): Tado password.
+      secret (str): Tado client secret.
+      transport (Transport): HTTP transport to use. Share one between several
+        instances to share their connection pools. When omitted, a new one is
+        built from `pool_size` and `keep_alive`.
+      pool_size (int|dict): Connections kept open per host, either a single
+        number or a dictionary keyed by host name (e.g. `'my.tado.com'`).
+      keep_alive (bool): Whether to keep connections open between requests.
+      cache (bool|ResponseCache): Cache responses of slow-changing resources.
+        `True` uses a `ResponseCache` with its default policies. Disabled
+        when omitted.
+      token_store (TokenStore): Persist tokens and the home ID, and resume
+        from them instead of logging in with the password.
+      lazy (bool): Do no I/O in the constructor. Authentication and home
+        resolution happen on the first API call.
+      home_id (int): ID of the home to use. Skips the `get_me` lookup of the
+        first home of the account.
+      auto_refresh (bool): Refresh the token in a background thread ahead of
+        its expiry, see `start_auto_refresh`.
+      retry (bool|RetryPolicy): Retry failed idempotent requests. `True` uses
+        a `RetryPolicy` with its defaults.
+      rate_limiter (RateLimiter): Limit the outgoing request rate per host.
+        Share one between instances to limit them together; waiting
+        requests are served fairly between homes.
+      conditional (bool|ValidatorCache): Send conditional GET requests using
+        the `ETag` and `Last-Modified` of previous responses, and reuse the
+        previous result on `304 Not Modified`. `True` uses a
+        `ValidatorCache` with its defaults. Disabled when omitted.
+      codec (str|Codec): JSON codec of request and response bodies, see
+        `libtado.codec`. The fastest installed one when omitted.
+      middleware (list): Extra `libtado.pipeline.Middleware` run on every API
+        call, outermost first, before the cache, retry, rate limit and auth
+        middlewares. The chain is available as `pipeline`.
+      metrics (Sink|list): Record the latency, status, size, retries and
+        cache hits of every API call, login and token refresh into one or
+        more sinks of `libtado.metrics`. Disabled when omitted.
+      write_behind (bool|WriteBehind): Queue the overlay, open window,
+        early start and presence writes (`set_temperature`,
+        `end_manual_control`, `set_home_state`...) and send them from a
+        background thread, only the last of the pending writes to a resource
+        being sent. These setters then return a `concurrent.futures.Future`;
+        see `flush`. Other writes are sent at once. Disabled when omitted.
+    """
     self.username = username
     self.password = password
     self.secret = secret
-    self._login()
-    self.id = self.get_me()['homes'][0]['id']
+    if transport is None:
+      transport = Transport(pool_size=pool_size, keep_alive=keep_alive)
+    self.transport = transport
+    if write_behind is True:
+      write_behind = WriteBehind()
+    elif write_behind is False:
+      write_behind = None
+    self.write_behind = write_behind
+    self._configure(retry, cache, conditional, codec, rate_limiter, metrics, middleware, token_store, home_id, (requests.ConnectionError, requests.Timeout))
+    for url in (self.api, self.api_acme, self.api_minder, self.api_energy_insights, self.api_energy_bob, self.api_auth):
+      self.transport.mount(url)
+    self._auth_lock = threading.Lock()
+    if not self._resume() and not lazy:
+      self._login()
+      self._save_token()
+    if not lazy:
+      self._resolve_home()
+    if auto_refresh:
+      self.start_auto_refresh()
+
+  def _configure(self, retry, cache, conditional, codec, rate_limiter, metrics, middleware, token_store, home_id, errors):
+    """
+    Normalise the options shared with `libtado.aio.AsyncTado`, build the
+    request pipeline and reset the session state.
+
+    Parameters:
+      errors (tuple): Connection errors of the transport, retried by the
+        retry middleware.
+    """
+    if retry is True:
+      retry = RetryPolicy()
+    if cache is True:
+      cache = ResponseCache()
+    elif cache is False:
+      cache = None
+    self.cache = cache
+    if conditional is True:
+      conditional = ValidatorCache()
+    elif conditional is False:
+      conditional = None
+    self.conditional = conditional
+    self.codec = get_codec(codec)
+    self.rate_limiter = rate_limiter
+    self.metrics = Metrics(metrics) if metrics is not None else None
+    self.pipeline = self._build_pipeline(middleware, retry or None, errors)
+    self.token_store = token_store
+    self._id = home_id
+    self._capabilities = {}
+    self.access_token = None
+    self.refresh_token = None
+    self.token_expiry = 0
+    self._refresher = None
+    self._root = self
+
+  @property
+  def id(self):
+    """The home ID. Resolved with `get_me` on first use when not known."""
+    if self._id is None:
+      self._resolve_home()
+    return self._id
+
+  @id.setter
+  def id(self, value):
+    self._id = value
+
+  def _resolve_home(self):
+    """Use the first home of the account unless a home ID is known."""
+    if self._id is None:
+      self._id = self.get_me()['homes'][0]['id']
+      self._save_token()
+
+  def _set_token(self, access_token, refresh_token, token_expiry):
+    self.access_token = access_token
+    self.token_expiry = token_expiry
+    self.refresh_token = refresh_token
+    self.access_headers = {'Authorization': 'Bearer ' + access_token}
+
+  def _resume(self):
+    """Resume the session saved in the token store, if any."""
+    if self.token_store is None:
+      return False
+    token = self.token_store.load(self.username)
+    if not token:
+      return False
+    self._set_token(token['access_token'], token['refresh_token'], token['token_expiry'])
+    if self._id is None:
+      self._id = token['home_id']
+    return True
+
+  def _save_token(self):
+    """Save the current session to the token store."""
+    if self.token_store is None or self.refresh_token is None:
+      return
+    self.token_store.save(self.username, {
+      'access_token'  : self.access_token,
+      'refresh_token' : self.refresh_token,
+      'token_expiry'  : self.token_expiry,
+      'home_id'       : self._id,
+    })
 
   def _login(self):
     """Login and setup the HTTP session."""
-    url='https://auth.tado.com/oauth/token'
+    url = self.api_auth
     data = { 'client_id'     : 'tado-web-app',
              'client_secret' : self.secret,
              'grant_type'    : 'password',
              'password'      : self.password,
              'scope'         : 'home.user',
              'username'      : self.username }
-    request = requests.post(url, data=data, timeout=self.timeout)
-    request.raise_for_status()
-    response = request.json()
-    self.access_token = response['access_token']
-    self.token_expiry = time.time() + float(response['expires_in'])
-    self.refresh_token = response['refresh_token']
-    self.access_headers = {'Authorization': 'Bearer ' + response['access_token']}
-
-  def _api_call(self, cmd, data=False, method='GET'):
-    """Perform an API call."""
-    def call_delete(url):
-      r = requests.delete(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_put(url, data):
-      r = requests.put(url, headers={**self.access_headers, **self.json_content}, data=json.dumps(data), timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_get(url):
-      r = requests.get(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-
-    self.refresh_auth()
-    url = '%s/%s' % (self.api, cmd)
-    if method == 'DELETE':
-      return call_delete(url)
-    elif method == 'PUT' and data:
-      return call_put(url, data).json()
-    elif method == 'GET':
-      return call_get(url).json()
-
-  def _api_acme_call(self, cmd, data=False, method='GET'):
-    """Perform an API call."""
-    def call_delete(url):
-      r = requests.delete(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_put(url, data):
-      r = requests.put(url, headers={**self.access_headers, **self.json_content}, data=json.dumps(data), timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_get(url):
-      r = requests.get(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-
-    self.refresh_auth()
-    url = '%s/%s' % (self.api_acme, cmd)
-    if method == 'DELETE':
-      return call_delete(url)
-    elif method == 'PUT' and data:
-      return call_put(url, data).json()
-    elif method == 'GET':
-      return call_get(url).json()
-
-  def _api_minder_call(self, cmd, data=False, method='GET'):
-    """Perform an API call."""
-    def call_delete(url):
-      r = requests.delete(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_put(url, data):
-      r = requests.put(url, headers={**self.access_headers, **self.json_content}, data=json.dumps(data), timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_get(url):
-      r = requests.get(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-
-    self.refresh_auth()
-    url = '%s/%s' % (self.api_minder, cmd)
-    if method == 'DELETE':
-      return call_delete(url)
-    elif method == 'PUT' and data:
-      return call_put(url, data).json()
-    elif method == 'GET':
-      return call_get(url).json()
-
-
-  def _api_energy_insights_call(self, cmd, data=False, method='GET'):
-    """Perform an API call."""
-    def call_delete(url):
-      r = requests.delete(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_put(url, data):
-      r = requests.put(url, headers={**self.access_headers, **self.json_content}, data=json.dumps(data), timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_get(url):
-      r = requests.get(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_post(url, data):
-      r = requests.post(url, headers={**self.access_headers, **self.json_content}, data=json.dumps(data), timeout=self.timeout)
-      r.raise_for_status()
-      return r
-
-    self.refresh_auth()
-    url = '%s/%s' % (self.api_energy_insights, cmd)
-    if method == 'DELETE':
-      return call_delete(url)
-    elif method == 'PUT' and data:
-      return call_put(url, data).json()
-    elif method == 'GET':
-      return call_get(url).json()
-    elif method == 'POST' and data:
-      return call_post(url, data).json()
-
-
-  def _api_energy_bob_call(self, cmd, data=False, method='GET'):
-    """Perform an API call."""
-    def call_delete(url):
-      r = requests.delete(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_put(url, data):
-      r = requests.put(url, headers={**self.access_headers, **self.json_content}, data=json.dumps(data), timeout=self.timeout)
-      r.raise_for_status()
-      return r
-    def call_get(url):
-      r = requests.get(url, headers=self.access_headers, timeout=self.timeout)
-      r.raise_for_status()
-      return r
-
-    self.refresh_auth()
-    url = '%s/%s' % (self.api_energy_bob, cmd)
-    if method == 'DELETE':
-      return call_delete(url)
-    elif method == 'PUT' and data:
-      return call_put(url, data).json()
-    elif method == 'GET':
-      return call_get(url).json()
-
-
-  def refresh_auth(self):
-    """Refresh the access token."""
-    if time.time() < self.token_expiry - 30:
+    with self._timed('login'):
+      request = self.transport.post(url, data=data, timeout=self.timeout)
+      request.raise_for_status()
+    response = self.codec.loads(request.content)
+    self._set_token(response['access_token'], response['refresh_token'], time.time() + float(response['expires_in']))
+
+  def _timed(self, kind):
+    """Measure an authentication request of `kind` when metrics are enabled."""
+    if self.metrics is None:
+      return _untimed
+    return self.metrics.timed(kind, self.api_auth)
+
+  def _send(self, request):
+    """
+    Send `request` with the transport and decode the response body. With
+    `Tado.conditional`, GET requests send the validators of the previous
+    response and reuse its result on a `304`.
+    """
+    url = request.url
+    headers = request.headers
+    body = None
+    if request.data is not None:
+      headers = {**headers, **self.json_content}
+      body = self.codec.dumps(request.data)
+    conditional = self.conditional if request.method == 'GET' else None
+    context = request.context
+    if conditional is not None:
+      r = self.transport.request('GET', url, headers={**headers, **conditional.headers(url)}, timeout=self.timeout)
+      if r.status_code == 304:
+        context['status'] = 304
+        context['not_modified'] = True
+        hit, data = conditional.not_modified(url)
+        if hit:
+          return data
+        r = self.transport.request('GET', url, headers=headers, timeout=self.timeout)
+    else:
+      r = self.transport.request(request.method, url, headers=headers, data=body, timeout=self.timeout)
+    context['status'] = r.status_code
+    context['bytes_sent'] = len(body) if body else 0
+    context['bytes_received'] = len(r.content)
+    r.raise_for_status()
+    data = self.codec.loads(r.content) if r.content else None
+    if conditional is not None:
+      conditional.store(url, r.headers, data)
+    return data
+
+  def _request(self, base, cmd, data=False, method='GET', decode=None):
+    """
+    Perform an API call through the request pipeline.
+
+    Parameters:
+      base (str): Base URL of the API family, e.g. `Tado.api`.
+      cmd (str): Path relative to `base`.
+      data: Body of the request, sent as JSON. No body when `False` or
+        `None`.
+      method (str): HTTP verb.
+      decode (callable): Applied to the decoded response body.
+
+    Returns:
+      The decoded response body, `None` when empty.
+    """
+    request = Request(self, method, base, cmd, None if data is False else data)
+    result = self.pipeline.run(request)
+    return result if decode is None else decode(result)
+
+  def _api_call(self, cmd, data=False, method='GET', decode=None):
+    """Perform an API call to my.tado.com."""
+    return self._request(self.api, cmd, data, method, decode)
+
+  def _api_acme_call(self, cmd, data=False, method='GET', decode=None):
+    """Perform an API call to acme.tado.com."""
+    return self._request(self.api_acme, cmd, data, method, decode)
+
+  def _api_minder_call(self, cmd, data=False, method='GET', decode=None):
+    """Perform an API call to minder.tado.com."""
+    return self._request(self.api_minder, cmd, data, method, decode)
+
+  def _api_energy_insights_call(self, cmd, data=False, method='GET', decode=None):
+    """Perform an API call to energy-insights.tado.com."""
+    return self._request(self.api_energy_insights, cmd, data, method, decode)
+
+  def _api_energy_bob_call(self, cmd, data=False, method='GET', decode=None):
+    """Perform an API call to energy-bob.tado.com."""
+    return self._request(self.api_energy_bob, cmd, data, method, decode)
+
+  def _build_pipeline(self, middleware, retry, errors):
+    """
+    Returns:
+      (Pipeline): The write-behind queue, metrics and user `middleware`
+        followed by the cache, retry, rate limit and auth middlewares that
+        are enabled.
+    """
+    middlewares = list(middleware or [])
+    if self.metrics is not None:
+      middlewares.insert(0, MetricsMiddleware(self.metrics))
+    if self.write_behind is not None:
+      middlewares.insert(0, self.write_behind)
+    if self.cache is not None:
+      middlewares.append(CacheMiddleware(self.cache))
+    if retry is not None:
+      middlewares.append(RetryMiddleware(retry, errors))
+    if self.rate_limiter is not None:
+      middlewares.append(RateLimitMiddleware(self.rate_limiter))
+    middlewares.append(AuthMiddleware())
+    return Pipeline(self._send, middlewares)
+
+  def flush(self, timeout=None):
+    """
+    Send the writes queued by `write_behind` now and wait for them. Their
+    results are available from the futures returned by the setters.
+
+    Parameters:
+      timeout (float): Maximum number of seconds to wait. No limit when
+        omitted.
+
+    Returns:
+      (bool): Whether every queued write is done.
+    """
+    if self.write_behind is None:
+      return True
+    return self.write_behind.flush(timeout)
+
+  def close(self):
+    """
+    Send the writes queued by `write_behind`, stop the background refresh and
+    close the connections held by the transport. Does nothing on a view
+    returned by `home`.
+    """
+    if self._root is not self:
+      return
+    if self.write_behind is not None:
+      self.write_behind.close()
+    self.stop_auto_refresh()
+    self.transport.close()
+
+  def homes(self):
+    """
+    Returns:
+      (list): The homes of the account, as listed by `get_me`.
+
+    Example:
+      ```json
+      [
+        {
+          'id': 12345,
+          'name': 'Home Sweet Home'
+        }
+      ]
+      ```
+    """
+    return self.get_me()['homes']
+
+  def home(self, home_id):
+    """
+    Get a view of this client bound to another home of the account.
+
+    The view shares the token, the transport, the cache and the rate limiter
+    of this client, so it neither logs in nor opens connections of its own.
+
+    Parameters:
+      home_id (int): The home ID.
+
+    Returns:
+      (Tado): A client whose methods act on `home_id`.
+
+    Example:
+      ```python
+      >>> tado.home(67890).get_zone_states()
+      ```
+    """
+    view = copy.copy(self)
+    view._id = home_id
+    view._refresher = None
+    return view
+
+  def map_homes(self, method, *args, homes=None, max_workers=None):
+    """
+    Call a method for several homes of the account concurrently.
+
+    Parameters:
+      method (str): Name of the method, e.g. `'get_zone_states'`.
+      *args: Parameters passed to the method.
+      homes (list): Home IDs. Defaults to every home of the account.
+      max_workers (int): Maximum number of calls in flight. Defaults to
+        `Tado.max_workers`.
+
+    Returns:
+      (dict): The result of each call keyed by home ID, or the exception it
+        raised.
+
+    Example:
+      ```python
+      >>> tado.map_homes('get_zone_states')
+      {12345: {'zoneStates': {...}}, 67890: {'zoneStates': {...}}}
+      ```
+    """
+    if homes is None:
+      homes = [h['id'] for h in self.homes()]
+    def call(home_id):
+      try:
+        return home_id, getattr(self.home(home_id), method)(*args)
+      except Exception as e:
+        return home_id, e
+    with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+      return dict(executor.map(call, homes))
+
+  def map_zones(self, method, *args, zones=None, max_workers=None, **kwargs):
+    """
+    Call a per-zone method for several zones concurrently.
+
+    Parameters:
+      method (str): Name of a method taking the zone ID as first parameter,
+        e.g. `'get_capabilities'`, `'get_state'` or `'get_schedule'`.
+      *args: Extra parameters passed after the zone ID.
+      zones (list): Zone IDs. Defaults to every zone of the home.
+      max_workers (int): Maximum number of calls in flight. Defaults to
+        `Tado.max_workers`.
+      **kwargs: Keyword parameters passed to the method.
+
+    Returns:
+      (dict): The result of each call keyed by zone ID. When a call fails the
+        exception it raised is stored instead, so one bad zone does not
+        abort the whole batch. Writes queued by `write_behind` are waited
+        for.
+
+    Example:
+      ```python
+      >>> tado.map_zones('get_early_start', zones=[1, 2])
+      {1: {'enabled': True}, 2: {'enabled': False}}
+      ```
+    """
+    if zones is None:
+      zones = [z['id'] for z in self.get_zones()]
+    func = getattr(self, method)
+    def call(zone):
+      try:
+        return zone, _settled(func(zone, *args, **kwargs))
+      except Exception as e:
+        return zone, e
+    with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+      return dict(executor.map(call, zones))
+
+  def refresh_auth(self, margin=None):
+    """
+    Refresh the access token if it expires within `margin` seconds.
+
+    The refresh is single-flight: when several threads find the token
+    expiring, one of them refreshes it while the others wait and then reuse
+    the new token. With a token store, the refresh also happens under the
+    store lock and a token refreshed meanwhile by another process is reused.
+
+    Parameters:
+      margin (float): Seconds before expiry from which the token is
+        refreshed. Defaults to `Tado.refresh_margin`.
+    """
+    if margin is None:
+      margin = self.refresh_margin
+    if self._root is not self:
+      # Views returned by home() share the token of their root client.
+      root = self._root
+      root.refresh_auth(margin)
+      self.access_token = root.access_token
+      self.refresh_token = root.refresh_token
+      self.token_expiry = root.token_expiry
+      self.access_headers = root.access_headers
       return
-    url='https://auth.tado.com/oauth/token'
+    if time.time() < self.token_expiry - margin:
+      return
+    with self._auth_lock:
+      if time.time() < self.token_expiry - margin:
+        return
+      if self.token_store is None:
+        self._refresh()
+        return
+      with self.token_store.lock(self.username):
+        token = self.token_store.load(self.username)
+        if token and time.time() < token['token_expiry'] - margin:
+          self._set_token(token['access_token'], token['refresh_token'], token['token_expiry'])
+          return
+        self._refresh()
+        self._save_token()
+
+  def start_auto_refresh(self, margin=60):
+    """
+    Refresh the token in a background daemon thread ahead of its expiry, so
+    that API calls never wait on the auth server.
+
+    Parameters:
+      margin (float): Seconds before expiry at which the token is refreshed.
+        Should be greater than `Tado.refresh_margin`.
+    """
+    if self._refresher is not None:
+      return
+    stop = threading.Event()
+    def run():
+      while True:
+        delay = max(self.token_expiry - margin - time.time(), 1)
+        if stop.wait(delay):
+          return
+        try:
+          self.refresh_auth(margin=margin)
+        except requests.RequestException:
+          # Retry later; calls still refresh on their own when needed.
+          if stop.wait(self.timeout):
+            return
+    self._refresher = (threading.Thread(target=run, name='libtado-auth-refresh', daemon=True), stop)
+    self._refresher[0].start()
+
+  def stop_auto_refresh(self):
+    """Stop the background refresh started by `start_auto_refresh`."""
+    if self._refresher is None:
+      return
+    thread, stop = self._refresher
+    self._refresher = None
+    stop.set()
+    if thread is not threading.current_thread():
+      thread.join()
+
+  def _refresh(self):
+    """Exchange the refresh token, or log in again when it is rejected."""
+    if self.refresh_token is None:
+      self._login()
+      return
+    url = self.api_auth
     data = { 'client_id'     : 'tado-web-app',
              'client_secret' : self.secret,
              'grant_type'    : 'refresh_token',
@@ -210,16 +605,14 @@ class Tado:
              'scope'         : 'home.user'
            }
     try:
-      request = requests.post(url, data=data, timeout=self.timeout)
-      request.raise_for_status()
-    except:
+      with self._timed('refresh'):
+        request = self.transport.post(url, data=data, timeout=self.timeout)
+        request.raise_for_status()
+    except requests.HTTPError:
       self._login()
       return
-    response = request.json()
-    self.access_token = response['access_token']
-    self.token_expiry = time.time() + float(response['expires_in'])
-    self.refresh_token = response['refresh_token']
-    self.access_headers['Authorization'] = 'Bearer ' + self.access_token
+    response = self.codec.loads(request.content)
+    self._set_token(response['access_token'], response['refresh_token'], time.time() + float(response['expires_in']))
 
   def get_boiler_state(self, authKey):
     """
@@ -266,10 +659,11 @@ class Tado:
     data = self._api_call('homeByBridge/%s/boilerWiringInstallationState?authKey=%s' % (bridge_serial, authKey))
     return data
 
-  def get_capabilities(self, zone):
+  def get_capabilities(self, zone, model=False):
     """
     Parameters:
       zone (int): The zone ID.
+      model (bool): Return a `libtado.models.Capabilities` instead of a dictionary.
 
     Returns:
       temperatures (dict): The temperature capabilities of the zone.
@@ -286,11 +680,15 @@ class Tado:
       }
       ```
     """
-    data = self._api_call('homes/%i/zones/%i/capabilities' % (self.id, zone))
+    data = self._api_call('homes/%i/zones/%i/capabilities' % (self.id, zone), decode=models.Capabilities if model else None)
     return data
 
-  def get_devices(self):
+  def get_devices(self, model=False):
     """
+    Parameters:
+      model (bool): Return `libtado.models.Device` instances instead of
+        dictionaries.
+
     Returns:
       (list): All devices of the home as a list of dictionaries.
 
@@ -362,7 +760,7 @@ class Tado:
       ]
       ```
     """
-    data = self._api_call('homes/%i/devices' % self.id)
+    data = self._api_call('homes/%i/devices' % self.id, decode=models.list_of(models.Device) if model else None)
     return data
 
   def get_device_usage(self):
@@ -468,7 +866,7 @@ class Tado:
     else:
       payload = {'homePresence': 'AWAY'}
 
-    self._api_call('homes/%i/presenceLock' % self.id, payload, method='PUT')
+    return self._api_call('homes/%i/presenceLock' % self.id, payload, method='PUT')
 
 
   def get_invitations(self):
@@ -641,7 +1039,7 @@ class Tado:
     return self._api_call('homes/%i/zones/%i/schedule/timetables/%i/blocks' % (self.id, zone, schedule))
 
 
-  def set_schedule_blocks(self, zone, schedule, blocks):
+  def set_schedule_blocks(self, zone, schedule, blocks, day_type=None):
     """
     Sets the blocks for the current schedule on a zone
 
@@ -649,21 +1047,128 @@ class Tado:
       zone (int): The zone ID.
       schedule (int): The schedule ID.
       blocks (list): The new blocks.
+      day_type (str): Only set the blocks of this day type, e.g.
+        `'MONDAY_TO_FRIDAY'`.
 
     Returns:
       (list): The new configuration.
     """
 
     payload = blocks
-    return self._api_call('homes/%i/zones/%i/schedule/timetables/%i/blocks' % (self.id, zone, schedule), payload, method='PUT')
+    cmd = 'homes/%i/zones/%i/schedule/timetables/%i/blocks' % (self.id, zone, schedule)
+    if day_type is not None:
+      cmd += '/' + day_type
+    return self._api_call(cmd, payload, method='PUT')
+
+  def _apply_change(self, change):
+    """Write a `libtado.schedule.Change`."""
+    if change.day_type is None:
+      return self.set_schedule(change.zone, change.timetable)
+    blocks = [block.to_api(change.day_type) for block in change.new]
+    return self.set_schedule_blocks(change.zone, change.timetable, blocks, day_type=change.day_type)
+
+  def sync_schedule(self, schedule, zones=None, dry_run=False, max_workers=None):
+    """
+    Apply a schedule to several zones, writing only what differs.
+
+    The active timetable and the blocks of the desired timetable are read for
+    every zone concurrently and compared with `schedule` once normalised.
+    Then only the day types whose blocks differ are written, and the
+    timetable is activated where another one is active.
+
+    Parameters:
+      schedule (Schedule): The desired schedule, see `libtado.schedule`.
+      zones (list): Zone IDs. Defaults to the zones of the schedule, or every
+        zone of the home.
+      dry_run (bool): Only compute the changes.
+      max_workers (int): Maximum number of calls in flight. Defaults to
+        `Tado.max_workers`.
+
+    Returns:
+      (Plan): The changes, with the result of each write unless `dry_run`.
+        Zones whose schedule cannot be read are reported in its `errors`
+        and left untouched.
+
+    Example:
+      ```python
+      >>> print(tado.sync_schedule(load_schedule('schedule.json'), dry_run=True))
+      Zone 1: set SATURDAY blocks to 00:00-08:00 17.0, 08:00-00:00 20.0
+      Zone 2: up to date
+      ```
+    """
+    if zones is None:
+      zones = schedule.zones or [z['id'] for z in self.get_zones()]
+    with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+      reads = {zone: (executor.submit(self.get_schedule, zone), executor.submit(self.get_schedule_blocks, zone, schedule.id)) for zone in zones}
+      changes, errors = [], {}
+      for zone, (current, blocks) in reads.items():
+        try:
+          changes.extend(schedule.diff(zone, current.result(), blocks.result()))
+        except Exception as e:
+          errors[zone] = e
+      if not dry_run:
+        self._apply_changes(executor, changes)
+    return Plan(zones, changes, errors, applied=not dry_run)
+
+  def compile_schedule(self, zone, overlay=True):
+    """
+    Compile the active schedule of a zone for local evaluation.
 
+    The active timetable, the zone state and the home time zone are read
+    concurrently, then the blocks of the timetable. The result answers
+    setpoint queries without any further API call.
+
+    Parameters:
+      zone (int): The zone ID.
+      overlay (bool): Account for the current overlay of the zone until its
+        projected expiry.
 
-  def get_state(self, zone):
+    Returns:
+      (CompiledSchedule): The compiled schedule, see `libtado.schedule`.
+
+    Example:
+      ```python
+      >>> compiled = tado.compile_schedule(4)
+      >>> compiled.at(datetime.datetime(2024, 1, 9, 18, 30))
+      20.0
+      >>> timestamps, setpoints = compiled.curve(start, start + datetime.timedelta(days=7))
+      ```
+    """
+    with ThreadPoolExecutor(max_workers=3) as executor:
+      home = executor.submit(self.get_home)
+      state = executor.submit(self.get_state, zone) if overlay else None
+      schedule = self.get_schedule(zone)
+      blocks = self.get_schedule_blocks(zone, schedule['id'])
+      return CompiledSchedule.from_api(schedule, blocks, state.result() if state else None, home.result()['dateTimeZone'])
+
+  def _apply_changes(self, executor, changes):
+    """
+    Write the block changes concurrently, then activate the timetables of
+    the zones whose blocks were all written.
+    """
+    failed = {}
+    for blocks in (True, False):
+      batch = {}
+      for change in changes:
+        if (change.day_type is not None) != blocks:
+          continue
+        if change.zone in failed:
+          change.result = failed[change.zone]
+        else:
+          batch[executor.submit(self._apply_change, change)] = change
+      for future, change in batch.items():
+        try:
+          change.result = future.result()
+        except Exception as e:
+          change.result = failed[change.zone] = e
+
+  def get_state(self, zone, model=False):
     """
     Get the current state of a zone including its desired and current temperature. Check out the example output for more.
 
     Parameters:
       zone (int): The zone ID.
+      model (bool): Return a `libtado.models.ZoneState` instead of a dictionary.
 
     Returns:
       (dict): A dictionary with the current settings and sensor measurements of the zone.
@@ -714,7 +1219,7 @@ class Tado:
       ```
     """
 
-    data = self._api_call('homes/%i/zones/%i/state' % (self.id, zone))
+    data = self._api_call('homes/%i/zones/%i/state' % (self.id, zone), decode=models.ZoneState if model else None)
     return data
 
   def get_measuring_device(self, zone):
@@ -795,10 +1300,14 @@ class Tado:
     data = self._api_call('homes/%i/weather' % self.id)
     return data
 
-  def get_zones(self):
+  def get_zones(self, model=False):
     """
     Get all zones of your home.
 
+    Parameters:
+      model (bool): Return `libtado.models.Zone` instances instead of
+        dictionaries.
+
     Returns:
       (list): A list of dictionaries with all your zones.
 
@@ -868,7 +1377,7 @@ class Tado:
       ```
     """
 
-    data = self._api_call('homes/%i/zones' % self.id)
+    data = self._api_call('homes/%i/zones' % self.id, decode=models.list_of(models.Zone) if model else None)
     return data
 
   def set_zone_name(self, zone, new_name):
@@ -950,27 +1459,93 @@ class Tado:
       ```
     """
 
-    def get_termination_dict(termination):
-      if termination == 'MANUAL':
-        return { 'type': 'MANUAL' }
-      elif termination == 'AUTO':
-        return { 'type': 'TADO_MODE' }
-      else:
-        return { 'type': 'TIMER', 'durationInSeconds': termination }
-    def get_setting_dict(temperature):
-      if temperature < 5:
-        return { 'type': 'HEATING', 'power': 'OFF' }
-      else:
-        return { 'type': 'HEATING', 'power': 'ON', 'temperature': { 'celsius': temperature } }
-
-    payload = { 'setting': get_setting_dict(temperature),
-                'termination': get_termination_dict(termination)
-              }
+    payload = overlay(temperature, termination)
     return self._api_call('homes/%i/zones/%i/overlay' % (self.id, zone), data=payload, method='PUT')
 
   def end_manual_control(self, zone):
     """End the manual control of a zone."""
-    self._api_call('homes/%i/zones/%i/overlay' % (self.id, zone), method='DELETE')
+    return self._api_call('homes/%i/zones/%i/overlay' % (self.id, zone), method='DELETE')
+
+  def _zone_capabilities(self, zone):
+    """`get_capabilities` as a model, memoised for the client lifetime."""
+    key = (self.id, zone)
+    if key not in self._capabilities:
+      self._capabilities[key] = self.get_capabilities(zone, model=True)
+    return self._capabilities[key]
+
+  def _check_temperatures(self, temperatures, capabilities):
+    """
+    Returns:
+      (dict): The `ValueError` of each zone whose temperature does not fit
+        its `capabilities`.
+    """
+    errors = {}
+    for zone, temperature in temperatures.items():
+      if turns_off(temperature):
+        continue
+      try:
+        caps = capabilities[zone]
+        if isinstance(caps, Exception):
+          raise caps
+        caps.check_temperature(temperature)
+      except Exception as e:
+        errors[zone] = e
+    return errors
+
+  def set_temperatures(self, temperatures, termination='MANUAL', max_workers=None):
+    """
+    Set the desired temperature of several zones concurrently.
+
+    Temperatures are checked against the minimum, maximum and step of each
+    zone before anything is sent, using capabilities fetched once per zone
+    and kept for the lifetime of the client. Zones failing the check are not
+    sent. With `write_behind`, the overlays are queued together and the
+    call returns once they are sent.
+
+    Parameters:
+      temperatures (dict): Temperature in celsius keyed by zone ID. `None`
+        or below 5 turns the zone off, like `set_temperature`.
+      termination (str/int): The termination mode, see `set_temperature`.
+      max_workers (int): Maximum number of calls in flight. Defaults to
+        `Tado.max_workers`.
+
+    Returns:
+      (dict): The new zone settings keyed by zone ID, or the exception raised
+        for the zone (a `ValueError` when the check failed).
+
+    Example:
+      ```python
+      >>> tado.set_temperatures({1: 21, 2: 19.5, 3: None}, termination='AUTO')
+      {1: {'setting': {...}, ...}, 2: {...}, 3: {...}}
+      ```
+    """
+    zones = [zone for zone, temperature in temperatures.items() if not turns_off(temperature)]
+    capabilities = self.map_zones('_zone_capabilities', zones=zones, max_workers=max_workers) if zones else {}
+    results = self._check_temperatures(temperatures, capabilities)
+    def call(zone):
+      try:
+        return zone, _settled(self.set_temperature(zone, temperatures[zone], termination))
+      except Exception as e:
+        return zone, e
+    valid = [zone for zone in temperatures if zone not in results]
+    with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+      results.update(executor.map(call, valid))
+    return {zone: results[zone] for zone in temperatures}
+
+  def end_manual_control_all(self, zones=None, max_workers=None):
+    """
+    End the manual control of several zones concurrently. With
+    `write_behind`, the call returns once the writes are sent.
+
+    Parameters:
+      zones (list): Zone IDs. Defaults to every zone of the home.
+      max_workers (int): Maximum number of calls in flight. Defaults to
+        `Tado.max_workers`.
+
+    Returns:
+      (dict): `None` keyed by zone ID, or the exception raised for the zone.
+    """
+    return self.map_zones('end_manual_control', zones=zones, max_workers=max_workers)
 
   def get_away_configuration(self, zone):
     """
@@ -1001,19 +1576,97 @@ class Tado:
     data = self._api_call('homes/%i/zones/%i/openWindowDetection' % (self.id, zone), data=payload, method='PUT')
     return data
 
-  def get_report(self, zone, date):
+  def get_report(self, zone, date, model=False):
     """
     Parameters:
       zone (int): The zone ID.
       date (str): The date in ISO8601 format. e.g. "2019-02-14".
+      model (bool): Return a `libtado.models.DayReport` instead of a dictionary.
 
     Returns:
       (dict): The daily report.
 
     """
-    data = self._api_call('homes/%i/zones/%i/dayReport?date=%s' % (self.id, zone, date))
+    data = self._api_call('homes/%i/zones/%i/dayReport?date=%s' % (self.id, zone, date), decode=models.DayReport if model else None)
     return data
 
+  def get_reports(self, zones, start, end, cache=None, max_workers=None):
+    """
+    Get the daily reports of several zones over a range of days.
+
+    Reports are fetched concurrently and yielded as they complete, not in
+    order. Reports of past days are immutable: with a cache they are read
+    from it when present and stored into it once fetched, so later runs only
+    fetch missing days and today.
+
+    Parameters:
+      zones (list): Zone IDs. Defaults to every zone of the home.
+      start (str|date): First day, as a date or in ISO8601 format.
+      end (str|date): Last day, included.
+      cache (str|ReportCache): Directory or cache keeping past reports.
+      max_workers (int): Maximum number of requests in flight. Defaults to
+        `Tado.max_workers`.
+
+    Returns:
+      (generator): `(zone, date, report)` tuples, `date` being an ISO8601
+        string and `report` the daily report or the exception raised while
+        fetching it.
+
+    Example:
+      ```python
+      >>> for zone, date, report in tado.get_reports([1, 2], '2023-01-01', '2023-01-31', cache='reports'):
+      ...   print(zone, date, report['hoursInDay'])
+      ```
+    """
+    if zones is None:
+      zones = [z['id'] for z in self.get_zones()]
+    if isinstance(cache, str):
+      cache = ReportCache(cache, codec=self.codec)
+    today = datetime.date.today()
+    home_id = self.id
+
+    pending = []
+    for date in date_range(start, end):
+      for zone in zones:
+        report = None
+        if cache is not None and date < today:
+          report = cache.get(home_id, zone, date.isoformat())
+        if report is not None:
+          yield zone, date.isoformat(), report
+        else:
+          pending.append((zone, date))
+
+    def fetch(zone, date):
+      try:
+        report = self.get_report(zone, date.isoformat())
+      except Exception as e:
+        return e
+      if cache is not None and date < today:
+        cache.put(home_id, zone, date.isoformat(), report)
+      return report
+
+    max_workers = max_workers or self.max_workers
+    tasks = iter(pending)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+      running = {}
+      try:
+        while True:
+          # Keep a bounded window of requests in flight, so that stopping
+          # the iteration early does not leave thousands queued.
+          for zone, date in tasks:
+            running[executor.submit(fetch, zone, date)] = (zone, date)
+            if len(running) >= max_workers * 2:
+              break
+          if not running:
+            return
+          done, _ = wait(running, return_when=FIRST_COMPLETED)
+          for future in done:
+            zone, date = running.pop(future)
+            yield zone, date.isoformat(), future.result()
+      finally:
+        for future in running:
+          future.cancel()
+
   def get_heating_circuits(self):
     """
     Gets the heating circuits in the current home
@@ -1366,10 +2019,14 @@ class Tado:
     return data
 
 
-  def get_zone_states(self):
+  def get_zone_states(self, model=False):
     """
     Get all zone states of your home.
 
+    Parameters:
+      model (bool): Return a dictionary of `libtado.models.ZoneState` keyed
+        by zone ID instead.
+
     Returns:
       (list): A dict of your zone states.
 
@@ -1497,7 +2154,7 @@ class Tado:
       }
       ```
     """
-    data = self._api_call('homes/%i/zoneStates' % (self.id))
+    data = self._api_call('homes/%i/zoneStates' % (self.id), decode=models.zone_states if model else None)
     return data
 
   def get_energy_consumption(self, startDate, endDate, country, ngsw_bypass=True):
@@ -1551,6 +2208,75 @@ class Tado:
     data = self._api_energy_insights_call('homes/%i/consumption?startDate=%s&endDate=%s&country=%s&ngsw-bypass=%s' % (self.id, startDate, endDate, country, ngsw_bypass))
     return data
 
+  def _consumption_chunks(self, startDate, endDate, country, cache, ngsw_bypass):
+    """
+    Returns:
+      (tuple): The months of the range, the cached results keyed by first
+        day, and the periods to fetch as `(first, last, closed)`.
+    """
+    today = datetime.date.today()
+    start, end = datetime.date.fromisoformat(str(startDate)), datetime.date.fromisoformat(str(endDate))
+    months = month_ranges(start, end)
+    cached, fetch = {}, []
+    for first, last in months:
+      closed = last < today
+      if closed and cache is not None:
+        data = cache.get(self.id, 'consumption/%s/%s' % (country, ngsw_bypass), first.isoformat())
+        if data is not None:
+          cached[first] = data
+          continue
+        fetch.append((first, last, True))
+      else:
+        fetch.append((max(first, start), min(last, end), closed))
+    return months, cached, fetch
+
+  def get_energy_consumption_range(self, startDate, endDate, country, cache=None, columnar=False, max_workers=None, ngsw_bypass=True):
+    """
+    Get the energy consumption of your home over any range, one calendar
+    month at a time.
+
+    The months are fetched concurrently and merged into one result shaped
+    like the one of `get_energy_consumption`. With a cache, months that are
+    over are stored whole and read back by later calls, so only the current
+    month is fetched again.
+
+    Parameters:
+      startDate (str): First day of the range, in ISO8601 format.
+      endDate (str): Last day of the range, included.
+      country (str): Country code.
+      cache (str|ReportCache): Directory (or `libtado.reports.ReportCache`)
+        keeping the months that are over between runs. No cache when omitted.
+      columnar (bool): Return `details['perDay']` as `date`, `consumption`
+        and `costInCents` arrays instead of a list. Requires numpy.
+      max_workers (int): Maximum number of requests in flight. Defaults to
+        `Tado.max_workers`.
+      ngsw_bypass (bool): Bypass the ngsw cache.
+
+    Returns:
+      (dict): The tariff and units of the most recent month, with every day
+        of the range and the totals in `details`.
+
+    Example:
+      ```python
+      >>> year = tado.get_energy_consumption_range('2023-01-01', '2023-12-31', 'FRA', cache='~/.cache/libtado')
+      >>> year['details']['totalConsumption']
+      1834.27
+      ```
+    """
+    if isinstance(cache, str):
+      cache = ReportCache(cache, codec=self.codec)
+    months, chunks, fetch = self._consumption_chunks(startDate, endDate, country, cache, ngsw_bypass)
+    def call(period):
+      first, last, closed = period
+      data = self.get_energy_consumption(first.isoformat(), last.isoformat(), country, ngsw_bypass)
+      if closed and cache is not None:
+        cache.put(self.id, 'consumption/%s/%s' % (country, ngsw_bypass), first.replace(day=1).isoformat(), data)
+      return first.replace(day=1), data
+    if fetch:
+      with ThreadPoolExecutor(max_workers=max_workers or self.max_workers) as executor:
+        chunks.update(executor.map(call, fetch))
+    return merge_consumption([chunks[first] for first, _ in months], startDate, endDate, columnar)
+
   def get_energy_savings(self, monthYear, country, ngsw_bypass=True):
     """
     Get energy savings of your home by month and year
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.cache
+
+This module provides the response cache used by `libtado.api.Tado` for
+slow-changing resources such as zones, devices, capabilities or the home
+itself.
+
+Entries are keyed by API base URL and path. Each path gets a time to live from
+the first matching policy; paths without a policy are not cached. Writes
+(`PUT`, `POST`, `DELETE`) through `Tado` invalidate the entries of the
+resource they touch and of the few resources known to reflect it, e.g. a
+zone overlay write drops the cached state of the zone and the zone states
+of the home, but not the zones or their capabilities.
+
+Example:
+  from libtado.api import Tado
+  from libtado.cache import ResponseCache
+
+  cache = ResponseCache(ttl={r'homes/\\d+/zones/\\d+/earlyStart': 600}, maxsize=512)
+  t = Tado('Username', 'Password', 'ClientSecret', cache=cache)
+  t.get_zones()           # network
+  t.get_zones()           # cache
+  cache.invalidate(t.api, 'homes/%i/zones' % t.id)
+
+It also provides `ValidatorCache`, which keeps the `ETag` and `Last-Modified`
+of responses so that `Tado` can send conditional requests and reuse the
+previous result when the server answers `304 Not Modified`.
+"""
+
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+  """
+  Thread-safe TTL cache with LRU eviction.
+
+  Values are returned as stored: treat them as read-only.
+
+  Parameters:
+    ttl (dict): Maps regular expressions to a time to live in seconds. They
+      are matched against the request path (query string excluded) and take
+      precedence over `ResponseCache.default_policies`. A TTL of `0` disables
+      caching for the matching paths.
+    maxsize (int): Maximum number of entries. The least recently used entry
+      is evicted first.
+    defaults (bool): Whether to include `ResponseCache.default_policies`.
+
+  Attributes:
+    related (list): Pairs of a regular expression matched against the path
+      of a write and the paths it also invalidates, which may refer to the
+      groups of the match (`\\1`). See `invalidate_related`.
+  """
+  default_policies = [
+    (r'me', 3600),
+    (r'homes/\d+', 3600),
+    (r'homes/\d+/users', 3600),
+    (r'homes/\d+/heatingSystem', 3600),
+    (r'homes/\d+/zones', 300),
+    (r'homes/\d+/zones/\d+/capabilities', 3600),
+    (r'homes/\d+/devices', 300),
+    (r'homes/\d+/settings', 3600),
+  ]
+  related = [
+    (r'homes/(\d+)/zones/(\d+)/overlay', [r'homes/\1/zones/\2/state', r'homes/\1/zoneStates']),
+    (r'homes/(\d+)/zones/(\d+)/openWindowDetection', [r'homes/\1/zones', r'homes/\1/zones/\2/state', r'homes/\1/zoneStates']),
+    (r'homes/(\d+)/zones/(\d+)/details', [r'homes/\1/zones']),
+    (r'homes/(\d+)/zones/(\d+)/schedule/activeTimetable', [r'homes/\1/zones/\2/state', r'homes/\1/zoneStates']),
+    (r'homes/(\d+)/zones/(\d+)/schedule/timetables/(\d+)/blocks/\w+', [r'homes/\1/zones/\2/schedule/timetables/\3/blocks', r'homes/\1/zones/\2/state', r'homes/\1/zoneStates']),
+    (r'homes/(\d+)/zoneOrder', [r'homes/\1/zones']),
+    (r'homes/(\d+)/presenceLock', [r'homes/\1/state', r'homes/\1/zoneStates']),
+    (r'homes/(\d+)/heatingSystem/boiler', [r'homes/\1/heatingSystem']),
+  ]
+
+  def __init__(self, ttl=None, maxsize=256, defaults=True):
+    policies = list((ttl or {}).items())
+    if defaults:
+      policies += self.default_policies
+    self.policies = [(re.compile(pattern + '$'), seconds) for pattern, seconds in policies]
+    self._related = [(re.compile(pattern + '$', re.IGNORECASE), paths) for pattern, paths in self.related]
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  @staticmethod
+  def _path(cmd):
+    return cmd.split('?', 1)[0].strip('/')
+
+  def ttl_for(self, cmd):
+    """
+    Parameters:
+      cmd (str): Request path, relative to the API base URL.
+
+    Returns:
+      (float): The time to live of `cmd` in seconds, `0` when not cacheable.
+    """
+    path = self._path(cmd)
+    for pattern, seconds in self.policies:
+      if pattern.match(path):
+        return seconds
+    return 0
+
+  def lookup(self, base, cmd):
+    """
+    Parameters:
+      base (str): API base URL.
+      cmd (str): Request path, relative to `base`.
+
+    Returns:
+      (tuple): `(True, value)` on a hit, `(False, None)` otherwise.
+    """
+    key = (base, cmd)
+    with self._lock:
+      entry = self._entries.get(key)
+      if entry is not None:
+        expiry, value = entry
+        if time.monotonic() < expiry:
+          self._entries.move_to_end(key)
+          self.hits += 1
+          return True, value
+        del self._entries[key]
+      self.misses += 1
+    return False, None
+
+  def store(self, base, cmd, value):
+    """Store `value` for `cmd` if a policy allows it."""
+    ttl = self.ttl_for(cmd)
+    if ttl <= 0:
+      return
+    key = (base, cmd)
+    with self._lock:
+      self._entries[key] = (time.monotonic() + ttl, value)
+      self._entries.move_to_end(key)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def invalidate(self, base=None, cmd=None):
+    """
+    Drop cached entries.
+
+    Parameters:
+      base (str): Only drop entries of this API base URL. All when omitted.
+      cmd (str): Only drop the entry of this exact path. All when omitted.
+    """
+    with self._lock:
+      for key in list(self._entries):
+        if (base is None or key[0] == base) and (cmd is None or key[1] == cmd):
+          del self._entries[key]
+
+  def invalidate_related(self, base, cmd):
+    """
+    Drop the entries a write to `cmd` may have changed: the entry of `cmd`
+    itself and the paths `ResponseCache.related` lists for it. For example a
+    write to `homes/1/zones/3/overlay` drops `homes/1/zones/3/state` and
+    `homes/1/zoneStates`, while `homes/1/zones` and the capabilities of the
+    zone stay cached.
+
+    Parameters:
+      base (str): API base URL of the write.
+      cmd (str): Path of the write, relative to `base`.
+    """
+    path = self._path(cmd)
+    paths = {path.lower()}
+    for pattern, related in self._related:
+      match = pattern.match(path)
+      if match:
+        paths.update(match.expand(p).lower() for p in related)
+    with self._lock:
+      for key in list(self._entries):
+        if key[0] == base and self._path(key[1]).lower() in paths:
+          del self._entries[key]
+
+  def clear(self):
+    """Drop every entry."""
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    return len(self._entries)
+
+
+class ValidatorCache:
+  """
+  Thread-safe store of HTTP validators for conditional requests.
+
+  The `ETag` and `Last-Modified` headers of each `GET` response are kept per
+  URL along with the decoded body. The next request to the same URL sends
+  them back as `If-None-Match` and `If-Modified-Since`, and a
+  `304 Not Modified` answer is served from the stored body without decoding
+  anything. Values are returned as stored: treat them as read-only.
+
+  Parameters:
+    maxsize (int): Maximum number of URLs. The least recently used one is
+      evicted first.
+
+  Attributes:
+    hits (int): Number of `304` responses served from the store.
+    misses (int): Number of full responses.
+  """
+
+  def __init__(self, maxsize=256):
+    self.maxsize = maxsize
+    self.hits = 0
+    self.misses = 0
+    self._entries = OrderedDict()
+    self._lock = threading.Lock()
+
+  def headers(self, url):
+    """
+    Returns:
+      (dict): The conditional headers to send for `url`, empty when no
+        validator is known.
+    """
+    with self._lock:
+      entry = self._entries.get(url)
+    if entry is None:
+      return {}
+    etag, last_modified, _ = entry
+    headers = {}
+    if etag:
+      headers['If-None-Match'] = etag
+    if last_modified:
+      headers['If-Modified-Since'] = last_modified
+    return headers
+
+  def not_modified(self, url):
+    """
+    Get the stored body of `url` after a `304` response.
+
+    Returns:
+      (tuple): `(True, value)`, or `(False, None)` when the entry was evicted
+        meanwhile and the request must be sent again unconditionally.
+    """
+    with self._lock:
+      entry = self._entries.get(url)
+      if entry is None:
+        return False, None
+      self._entries.move_to_end(url)
+      self.hits += 1
+      return True, entry[2]
+
+  def store(self, url, headers, value):
+    """
+    Remember `value` as the body of `url` if the response carries a validator.
+
+    Parameters:
+      url (str): Absolute URL of the request.
+      headers (dict): Response headers.
+      value: Decoded body.
+    """
+    etag = headers.get('ETag')
+    last_modified = headers.get('Last-Modified')
+    with self._lock:
+      self.misses += 1
+      if not etag and not last_modified:
+        self._entries.pop(url, None)
+        return
+      self._entries[url] = (etag, last_modified, value)
+      self._entries.move_to_end(url)
+      while len(self._entries) > self.maxsize:
+        self._entries.popitem(last=False)
+
+  def clear(self):
+    """Drop every entry."""
+    with self._lock:
+      self._entries.clear()
+
+  def __len__(self):
+    return len(self._entries)
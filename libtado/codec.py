@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.codec
+
+This module provides the JSON codecs used by `libtado.api.Tado` and
+`libtado.aio.AsyncTado` to encode request bodies and decode responses.
+
+The fastest installed library among orjson, msgspec and ujson is used by
+default, falling back to the standard library. Responses are decoded
+straight from their raw bytes.
+
+Example:
+  from libtado.api import Tado
+
+  t = Tado('Username', 'Password', 'ClientSecret', codec='orjson')
+  print(t.codec.name)
+"""
+
+import json
+
+try:
+  import orjson
+except ImportError:
+  orjson = None
+
+try:
+  import msgspec
+except ImportError:
+  msgspec = None
+
+try:
+  import ujson
+except ImportError:
+  ujson = None
+
+
+class Codec:
+  """
+  A JSON codec.
+
+  Parameters:
+    name (str): Name of the codec.
+    loads (callable): Decodes `bytes` (or `str`) into Python objects. Raises
+      a `ValueError` on invalid input.
+    dumps (callable): Encodes Python objects into `bytes`.
+  """
+  __slots__ = ('name', 'loads', 'dumps')
+
+  def __init__(self, name, loads, dumps):
+    self.name = name
+    self.loads = loads
+    self.dumps = dumps
+
+  def __repr__(self):
+    return 'Codec(%r)' % self.name
+
+
+def _json_dumps(obj):
+  return json.dumps(obj).encode()
+
+
+def _msgspec_loads(data):
+  try:
+    return _msgspec_decoder.decode(data)
+  except msgspec.DecodeError as e:
+    raise ValueError(str(e)) from e
+
+
+def _ujson_dumps(obj):
+  return ujson.dumps(obj).encode()
+
+
+codecs = {'json': Codec('json', json.loads, _json_dumps)}
+if orjson is not None:
+  codecs['orjson'] = Codec('orjson', orjson.loads, orjson.dumps)
+if msgspec is not None:
+  _msgspec_decoder = msgspec.json.Decoder()
+  codecs['msgspec'] = Codec('msgspec', _msgspec_loads, msgspec.json.Encoder().encode)
+if ujson is not None:
+  codecs['ujson'] = Codec('ujson', ujson.loads, _ujson_dumps)
+
+preference = ('orjson', 'msgspec', 'ujson', 'json')
+
+
+def get_codec(codec=None):
+  """
+  Parameters:
+    codec (str|Codec): Name of an installed codec (`'orjson'`, `'msgspec'`,
+      `'ujson'` or `'json'`), or a codec. The fastest installed one when
+      omitted.
+
+  Returns:
+    (Codec): The codec.
+  """
+  if codec is None:
+    return next(codecs[name] for name in preference if name in codecs)
+  if isinstance(codec, str):
+    if codec not in codecs:
+      raise ValueError('JSON codec %r is not available, install it or use one of: %s' % (codec, ', '.join(sorted(codecs))))
+    return codecs[codec]
+  return codec
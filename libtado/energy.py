@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.energy
+
+This module provides the range splitting and merging behind
+`libtado.api.Tado.get_energy_consumption_range`.
+
+A date range is split into calendar months, fetched concurrently. Months that
+are over no longer change, so they can be kept in a `libtado.reports.ReportCache`
+and only the current month is fetched again. The per-day consumptions of the
+months are then merged back into a single result, optionally as columns.
+
+Example:
+  from libtado.api import Tado
+
+  t = Tado('Username', 'Password', 'ClientSecret')
+  year = t.get_energy_consumption_range('2023-01-01', '2023-12-31', 'FRA', cache='~/.cache/libtado')
+  print(year['details']['totalConsumption'])
+"""
+
+import datetime
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+
+def _date(value):
+  if isinstance(value, str):
+    return datetime.date.fromisoformat(value)
+  return value
+
+
+def month_ranges(start, end):
+  """
+  Parameters:
+    start (str|date): First day, as a date or in ISO8601 format.
+    end (str|date): Last day, included.
+
+  Returns:
+    (list): The first and last day of every calendar month overlapping the
+      range, whole months included.
+  """
+  start, end = _date(start), _date(end)
+  months = []
+  first = start.replace(day=1)
+  while first <= end:
+    following = (first + datetime.timedelta(days=32)).replace(day=1)
+    months.append((first, following - datetime.timedelta(days=1)))
+    first = following
+  return months
+
+
+def columns(per_day):
+  """
+  Parameters:
+    per_day (list): The `perDay` entries of a consumption.
+
+  Returns:
+    (dict): `date` (`datetime64[D]`), `consumption` and `costInCents`
+      (`float64`) arrays. Requires numpy.
+  """
+  if np is None:
+    raise ImportError('Columnar consumption requires numpy: pip install libtado[numpy]')
+  return {
+    'date':        np.array([d['date'] for d in per_day], dtype='datetime64[D]'),
+    'consumption': np.array([d.get('consumption') or 0 for d in per_day], dtype=np.float64),
+    'costInCents': np.array([d.get('costInCents') or 0 for d in per_day], dtype=np.float64),
+  }
+
+
+def merge_consumption(chunks, start, end, columnar=False):
+  """
+  Merge the consumptions of consecutive periods.
+
+  Parameters:
+    chunks (list): Results of `Tado.get_energy_consumption`, oldest first.
+    start (str|date): First day kept.
+    end (str|date): Last day kept.
+    columnar (bool): Return `perDay` as columns, see `columns`.
+
+  Returns:
+    (dict): The tariff and units of the most recent chunk, with the days of
+      every chunk within the range and their totals in `details`.
+  """
+  start, end = _date(start).isoformat(), _date(end).isoformat()
+  days = {}
+  for chunk in chunks:
+    for day in ((chunk or {}).get('details') or {}).get('perDay') or []:
+      if start <= day['date'] <= end:
+        days[day['date']] = day
+  per_day = [days[date] for date in sorted(days)]
+  result = dict(chunks[-1] or {}) if chunks else {}
+  details = dict(result.get('details') or {})
+  details['totalConsumption'] = round(sum(d.get('consumption') or 0 for d in per_day), 4)
+  details['totalCostInCents'] = round(sum(d.get('costInCents') or 0 for d in per_day), 4)
+  details['perDay'] = columns(per_day) if columnar else per_day
+  result['details'] = details
+  return result
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.metrics
+
+This module provides the instrumentation of `libtado.api.Tado` and
+`libtado.aio.AsyncTado`.
+
+When metrics are enabled, every API call and every login or token refresh
+produces a `Sample` (endpoint, latency, status code, bytes sent and
+received, retries, cache hit, ...) handed to one or more sinks:
+
+- `MemorySink` aggregates the samples per endpoint in memory.
+- `PrometheusExporter` renders those aggregates in the Prometheus text
+  format.
+- `OpenTelemetrySink` turns every sample into a client span. It requires
+  `opentelemetry-api` (`pip install libtado[opentelemetry]`).
+
+Nothing is recorded, and no time is measured, when metrics are disabled.
+
+Example:
+  from libtado.api import Tado
+  from libtado.metrics import PrometheusExporter
+
+  exporter = PrometheusExporter()
+  t = Tado('Username', 'Password', 'ClientSecret', metrics=exporter)
+  t.get_zone_states()
+  print(exporter.render())
+"""
+
+import contextlib
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+from libtado.pipeline import Middleware
+
+try:
+  from opentelemetry import trace
+except ImportError:
+  trace = None
+
+
+@lru_cache(maxsize=1024)
+def endpoint(cmd):
+  """
+  Parameters:
+    cmd (str): Request path, e.g. `'homes/123/zones/4/dayReport?date=2023-01-01'`.
+
+  Returns:
+    (str): The path without query string and with numeric IDs replaced by
+      `{id}`, e.g. `'homes/{id}/zones/{id}/dayReport'`.
+  """
+  path = cmd.split('?', 1)[0].strip('/')
+  return '/'.join('{id}' if part.isdigit() else part for part in path.split('/'))
+
+
+def status_of(error):
+  """Returns the HTTP status code carried by `error`, or `None`."""
+  response = getattr(error, 'response', None)
+  if response is not None:
+    return getattr(response, 'status_code', None)
+  status = getattr(error, 'status', None)
+  return status if isinstance(status, int) else None
+
+
+class Sample:
+  """
+  Measurement of an API call or of an authentication request.
+
+  Attributes:
+    kind (str): `'request'`, `'login'` or `'refresh'`.
+    method (str): HTTP verb.
+    host (str): Host name of the API.
+    endpoint (str): Path template, see `endpoint`.
+    status (int): HTTP status code, `None` when no response was received or
+      it came from the cache.
+    start (int): Wall-clock start time, in nanoseconds since the epoch.
+    duration (float): Duration in seconds, retries and waits included.
+    bytes_sent (int): Size of the request body.
+    bytes_received (int): Size of the response body.
+    retries (int): Number of retries.
+    cache_hit (bool): Whether the response came from the response cache.
+    not_modified (bool): Whether the server answered `304 Not Modified`.
+    error (str): Type name of the exception raised, if any.
+  """
+  __slots__ = ('kind', 'method', 'host', 'endpoint', 'status', 'start', 'duration', 'bytes_sent', 'bytes_received', 'retries', 'cache_hit', 'not_modified', 'error')
+
+  def __init__(self, kind, method, host, endpoint, start, duration, status=None, bytes_sent=0, bytes_received=0, retries=0, cache_hit=False, not_modified=False, error=None):
+    self.kind = kind
+    self.method = method
+    self.host = host
+    self.endpoint = endpoint
+    self.start = start
+    self.duration = duration
+    self.status = status
+    self.bytes_sent = bytes_sent
+    self.bytes_received = bytes_received
+    self.retries = retries
+    self.cache_hit = cache_hit
+    self.not_modified = not_modified
+    self.error = error
+
+  def __repr__(self):
+    return 'Sample(%s %s %s, status=%r, duration=%.3f)' % (self.kind, self.method, self.endpoint, self.status, self.duration)
+
+
+class Sink:
+  """Base class of the sinks. It records nothing."""
+
+  def record(self, sample):
+    """
+    Parameters:
+      sample (Sample): A finished API call, login or token refresh.
+    """
+
+
+class EndpointStats:
+  """
+  Aggregates of the samples of one endpoint.
+
+  Attributes:
+    count (int): Number of calls, cache hits excluded.
+    errors (int): Number of calls that raised.
+    duration_sum (float): Total duration of the calls, in seconds.
+    buckets (list): Cumulative number of calls per upper bound of
+      `MemorySink.buckets`.
+    statuses (Counter): Number of responses per status code.
+    bytes_sent (int): Total size of the request bodies.
+    bytes_received (int): Total size of the response bodies.
+    retries (int): Total number of retries.
+    cache_hits (int): Number of calls served by the response cache.
+    not_modified (int): Number of `304 Not Modified` responses.
+  """
+  __slots__ = ('count', 'errors', 'duration_sum', 'buckets', 'statuses', 'bytes_sent', 'bytes_received', 'retries', 'cache_hits', 'not_modified')
+
+  def __init__(self, buckets):
+    self.count = 0
+    self.errors = 0
+    self.duration_sum = 0.0
+    self.buckets = [0] * len(buckets)
+    self.statuses = Counter()
+    self.bytes_sent = 0
+    self.bytes_received = 0
+    self.retries = 0
+    self.cache_hits = 0
+    self.not_modified = 0
+
+  @property
+  def mean(self):
+    """(float): Mean duration in seconds, `None` without calls."""
+    return self.duration_sum / self.count if self.count else None
+
+  def as_dict(self):
+    out = {name: getattr(self, name) for name in self.__slots__}
+    out['buckets'] = list(self.buckets)
+    out['statuses'] = Counter(self.statuses)
+    return out
+
+
+class MemorySink(Sink):
+  """
+  Aggregate samples in memory, per `(kind, method, endpoint)`.
+
+  Parameters:
+    buckets (tuple): Upper bounds, in seconds, of the latency histogram.
+
+  Attributes:
+    stats (dict): `EndpointStats` keyed by `(kind, method, endpoint)`.
+  """
+  default_buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+  def __init__(self, buckets=None):
+    self.buckets = tuple(buckets or self.default_buckets)
+    self.stats = {}
+    self._lock = threading.Lock()
+
+  def record(self, sample):
+    key = (sample.kind, sample.method, sample.endpoint)
+    with self._lock:
+      stats = self.stats.get(key)
+      if stats is None:
+        stats = self.stats[key] = EndpointStats(self.buckets)
+      if sample.cache_hit:
+        stats.cache_hits += 1
+        return
+      stats.count += 1
+      stats.duration_sum += sample.duration
+      for i, bound in enumerate(self.buckets):
+        if sample.duration <= bound:
+          stats.buckets[i] += 1
+      if sample.error is not None:
+        stats.errors += 1
+      if sample.status is not None:
+        stats.statuses[sample.status] += 1
+      stats.bytes_sent += sample.bytes_sent
+      stats.bytes_received += sample.bytes_received
+      stats.retries += sample.retries
+      stats.not_modified += sample.not_modified
+
+  def snapshot(self):
+    """
+    Returns:
+      (dict): A copy of the aggregates as dictionaries, keyed like `stats`.
+
+    Example:
+      ```python
+      {('request', 'GET', 'homes/{id}/zoneStates'): {'count': 12, 'errors': 0, 'duration_sum': 1.9, ...}}
+      ```
+    """
+    with self._lock:
+      return {key: stats.as_dict() for key, stats in self.stats.items()}
+
+  def reset(self):
+    """Drop every aggregate."""
+    with self._lock:
+      self.stats.clear()
+
+
+def _labels(**labels):
+  def escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+  return '{%s}' % ','.join('%s="%s"' % (name, escape(value)) for name, value in labels.items())
+
+
+class PrometheusExporter(MemorySink):
+  """
+  In-memory aggregates rendered in the Prometheus text exposition format.
+
+  Serve the output of `render` on a `/metrics` endpoint of your application.
+
+  Parameters:
+    prefix (str): Prefix of the metric names.
+    buckets (tuple): Upper bounds, in seconds, of the latency histogram.
+  """
+
+  def __init__(self, prefix='libtado', buckets=None):
+    super().__init__(buckets)
+    self.prefix = prefix
+
+  def render(self):
+    """
+    Returns:
+      (str): The metrics in the Prometheus text format.
+    """
+    snapshot = self.snapshot()
+    p = self.prefix
+    lines = ['# HELP %s_request_duration_seconds Duration of the calls to the Tado API.' % p,
+             '# TYPE %s_request_duration_seconds histogram' % p]
+    for (kind, method, path), stats in sorted(snapshot.items()):
+      labels = dict(kind=kind, method=method, endpoint=path)
+      for i, bound in enumerate(self.buckets):
+        lines.append('%s_request_duration_seconds_bucket%s %d' % (p, _labels(le=bound, **labels), stats['buckets'][i]))
+      lines.append('%s_request_duration_seconds_bucket%s %d' % (p, _labels(le='+Inf', **labels), stats['count']))
+      lines.append('%s_request_duration_seconds_sum%s %r' % (p, _labels(**labels), stats['duration_sum']))
+      lines.append('%s_request_duration_seconds_count%s %d' % (p, _labels(**labels), stats['count']))
+    lines += ['# HELP %s_responses_total Responses of the Tado API per status code.' % p,
+              '# TYPE %s_responses_total counter' % p]
+    for (kind, method, path), stats in sorted(snapshot.items()):
+      for status, count in sorted(stats['statuses'].items()):
+        lines.append('%s_responses_total%s %d' % (p, _labels(kind=kind, method=method, endpoint=path, status=status), count))
+    counters = (
+      ('errors', 'request_errors_total', 'Calls to the Tado API that raised.'),
+      ('bytes_sent', 'request_bytes_total', 'Bytes sent in request bodies.'),
+      ('bytes_received', 'response_bytes_total', 'Bytes received in response bodies.'),
+      ('retries', 'retries_total', 'Retried calls to the Tado API.'),
+      ('cache_hits', 'cache_hits_total', 'Calls served by the response cache.'),
+      ('not_modified', 'not_modified_total', 'Responses 304 Not Modified.'),
+    )
+    for field, name, text in counters:
+      lines += ['# HELP %s_%s %s' % (p, name, text), '# TYPE %s_%s counter' % (p, name)]
+      for (kind, method, path), stats in sorted(snapshot.items()):
+        lines.append('%s_%s%s %d' % (p, name, _labels(kind=kind, method=method, endpoint=path), stats[field]))
+    return '\n'.join(lines) + '\n'
+
+
+class OpenTelemetrySink(Sink):
+  """
+  Record every sample as an OpenTelemetry client span.
+
+  Spans are created when the call completes, with its real start and end
+  times, under the span current at that time.
+
+  Parameters:
+    tracer (opentelemetry.trace.Tracer): Tracer to use. The tracer of the
+      global tracer provider when omitted.
+  """
+
+  def __init__(self, tracer=None):
+    if trace is None:
+      raise ImportError('OpenTelemetrySink requires opentelemetry-api: pip install libtado[opentelemetry]')
+    self.tracer = tracer or trace.get_tracer('libtado')
+
+  def record(self, sample):
+    name = 'tado %s' % sample.kind if sample.kind != 'request' else 'tado %s %s' % (sample.method, sample.endpoint)
+    attributes = {
+      'http.request.method': sample.method,
+      'server.address': sample.host,
+      'tado.endpoint': sample.endpoint,
+      'tado.retries': sample.retries,
+      'tado.cache_hit': sample.cache_hit,
+      'http.request.body.size': sample.bytes_sent,
+      'http.response.body.size': sample.bytes_received,
+    }
+    if sample.status is not None:
+      attributes['http.response.status_code'] = sample.status
+    span = self.tracer.start_span(name, kind=trace.SpanKind.CLIENT, start_time=sample.start, attributes=attributes)
+    if sample.error is not None:
+      span.set_status(trace.Status(trace.StatusCode.ERROR, sample.error))
+    span.end(end_time=sample.start + int(sample.duration * 1e9))
+
+
+class Metrics:
+  """
+  Dispatch samples to sinks.
+
+  Parameters:
+    sinks (Sink|list): One sink or a list of sinks.
+  """
+
+  def __init__(self, sinks):
+    self.sinks = list(sinks) if isinstance(sinks, (list, tuple)) else [sinks]
+
+  def record(self, sample):
+    for sink in self.sinks:
+      sink.record(sample)
+
+  @contextlib.contextmanager
+  def timed(self, kind, url):
+    """Record the duration of the block as an authentication sample."""
+    start = time.time_ns()
+    started = time.perf_counter()
+    error = None
+    try:
+      yield
+    except Exception as e:
+      error = e
+      raise
+    finally:
+      parts = urlsplit(url)
+      self.record(Sample(kind, 'POST', parts.hostname, endpoint(parts.path), start, time.perf_counter() - started,
+                         status=status_of(error) if error is not None else None,
+                         error=type(error).__name__ if error is not None else None))
+
+
+class MetricsMiddleware(Middleware):
+  """Pipeline middleware recording a `Sample` for every API call."""
+
+  def __init__(self, metrics):
+    self.metrics = metrics
+
+  def _record(self, request, start, duration, error):
+    context = request.context
+    status = context.get('status')
+    if status is None and error is not None:
+      status = status_of(error)
+    self.metrics.record(Sample(
+      'request', request.method, urlsplit(request.base).hostname, endpoint(request.cmd), start, duration,
+      status=status,
+      bytes_sent=context.get('bytes_sent', 0),
+      bytes_received=context.get('bytes_received', 0),
+      retries=context.get('retries', 0),
+      cache_hit=context.get('cache_hit', False),
+      not_modified=context.get('not_modified', False),
+      error=type(error).__name__ if error is not None else None,
+    ))
+
+  def handle(self, request, call_next):
+    start = time.time_ns()
+    started = time.perf_counter()
+    error = None
+    try:
+      return call_next(request)
+    except Exception as e:
+      error = e
+      raise
+    finally:
+      self._record(request, start, time.perf_counter() - started, error)
+
+  async def handle_async(self, request, call_next):
+    start = time.time_ns()
+    started = time.perf_counter()
+    error = None
+    try:
+      return await call_next(request)
+    except Exception as e:
+      error = e
+      raise
+    finally:
+      self._record(request, start, time.perf_counter() - started, error)
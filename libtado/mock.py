@@ -0,0 +1,441 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.mock
+
+This module provides a local stand-in for the Tado servers, to run tests and
+benchmarks deterministically and without network access.
+
+`MockTadoServer` is a small HTTP server answering for the five API hosts
+(my.tado.com, acme, minder, energy-insights and energy-bob) and the auth
+server from recorded fixtures. It issues and checks OAuth tokens and can add
+latency, inject errors and expire tokens on demand. `Recorder` records the
+responses of a live account into a fixture file.
+
+Fixtures map `'<METHOD> <host>/<path>'` to the decoded response body, e.g.
+`'GET my.tado.com/api/v2/homes/1/zones'`. A request with a query string is
+answered by the fixture with the same query, or by the one without any.
+Writes update the fixtures: a `PUT` or `POST` without a fixture of its own
+stores its body as the `GET` fixture of the same path, and a `DELETE`
+removes it.
+
+Example:
+  from libtado.mock import MockTadoServer
+
+  with MockTadoServer('tests/fixtures/tado.json', latency=0.05) as server:
+    t = server.client()
+    print(t.get_zones())
+    server.fail('my.tado.com/api/v2/homes/*/zoneStates', status=503)
+"""
+
+import fnmatch
+import hashlib
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from libtado.api import Tado
+from libtado.pipeline import Middleware
+
+bases = ('api', 'api_acme', 'api_minder', 'api_energy_insights', 'api_energy_bob', 'api_auth')
+
+
+def load_fixtures(path):
+  """
+  Parameters:
+    path (str): A JSON fixture file.
+
+  Returns:
+    (dict): The fixtures.
+  """
+  with open(path, encoding='utf-8') as f:
+    return json.load(f)
+
+
+def fixture_key(method, url):
+  """
+  Parameters:
+    method (str): HTTP verb.
+    url (str): Full URL of the request.
+
+  Returns:
+    (str): The fixture key of the request, e.g.
+      `'GET my.tado.com/api/v2/me'`.
+  """
+  parts = urlsplit(url)
+  key = '%s %s%s' % (method, parts.netloc, parts.path)
+  if parts.query:
+    key += '?' + parts.query
+  return key
+
+
+class Failure:
+  """
+  An error injected by `MockTadoServer.fail`.
+
+  Attributes:
+    pattern (str): `fnmatch` pattern matched against `<host>/<path>`.
+    method (str): HTTP verb matched, any when `None`.
+    status (int): Status code returned. `None` drops the connection instead.
+    headers (dict): Headers returned with the error, e.g. `Retry-After`.
+    times (int): Remaining number of failures. Unlimited when `None`.
+    probability (float): Chance for a matching request to fail.
+  """
+  __slots__ = ('pattern', 'method', 'status', 'headers', 'times', 'probability')
+
+  def __init__(self, pattern, method=None, status=500, headers=None, times=1, probability=1.0):
+    self.pattern = pattern
+    self.method = method
+    self.status = status
+    self.headers = headers or {}
+    self.times = times
+    self.probability = probability
+
+  def matches(self, method, path):
+    if self.times is not None and self.times <= 0:
+      return False
+    if self.method is not None and self.method != method:
+      return False
+    return fnmatch.fnmatchcase(path, self.pattern)
+
+
+class MockTadoServer:
+  """
+  Local HTTP server impersonating the Tado API and auth servers.
+
+  Parameters:
+    fixtures (dict|str): Fixtures, or the path of a JSON fixture file. Empty
+      when omitted.
+    latency (float|tuple): Delay, in seconds, added to every response. A
+      `(low, high)` tuple draws a uniform delay from `seed`.
+    expires_in (int): Lifetime, in seconds, of the access tokens issued.
+    credentials (tuple): `(username, password)` accepted by the auth server.
+      Any credentials are accepted when omitted.
+    etags (bool): Send an `ETag` with every response and answer matching
+      `If-None-Match` requests with `304 Not Modified`.
+    seed (int): Seed of the random latency and failures.
+    host (str): Address to listen on.
+    port (int): Port to listen on. A free port is picked when `0`.
+
+  Attributes:
+    fixtures (dict): The fixtures, modified by writes.
+    requests (list): `(method, path)` of every request received.
+    url (str): Base URL of the server, once started.
+    urls (dict): API base URLs of `libtado.api.Tado` pointing at the server.
+  """
+  def __init__(self, fixtures=None, latency=0, expires_in=600, credentials=None, etags=True, seed=0, host='127.0.0.1', port=0):
+    if isinstance(fixtures, str):
+      fixtures = load_fixtures(fixtures)
+    self.fixtures = dict(fixtures or {})
+    self.latency = latency
+    self.expires_in = expires_in
+    self.credentials = credentials
+    self.etags = etags
+    self.random = random.Random(seed)
+    self.address = (host, port)
+    self.requests = []
+    self.failures = []
+    self._tokens = {}
+    self._refresh_tokens = set()
+    self._counter = itertools.count(1)
+    self._lock = threading.Lock()
+    self._server = None
+    self._thread = None
+    self.url = None
+
+  def __enter__(self):
+    self.start()
+    return self
+
+  def __exit__(self, *exc):
+    self.stop()
+
+  def start(self):
+    """Start serving in a background thread."""
+    if self._server is not None:
+      return
+    server = self
+
+    class Handler(_Handler):
+      mock = server
+
+    self._server = ThreadingHTTPServer(self.address, Handler)
+    self._server.daemon_threads = True
+    host, port = self._server.server_address[:2]
+    self.url = 'http://%s:%i' % (host, port)
+    self._thread = threading.Thread(target=self._server.serve_forever, kwargs={'poll_interval': 0.05}, name='libtado-mock', daemon=True)
+    self._thread.start()
+
+  def stop(self):
+    """Stop the server."""
+    if self._server is None:
+      return
+    self._server.shutdown()
+    self._server.server_close()
+    self._thread.join()
+    self._server = None
+    self._thread = None
+
+  @property
+  def urls(self):
+    urls = {}
+    for name in bases:
+      parts = urlsplit(getattr(Tado, name))
+      urls[name] = '%s/%s%s' % (self.url, parts.netloc, parts.path)
+    return urls
+
+  def client(self, cls=Tado, username='username', password='password', secret='secret', **kwargs):
+    """
+    Create a client talking to the server.
+
+    Parameters:
+      cls (type): `libtado.api.Tado`, `libtado.aio.AsyncTado` or a subclass.
+      username (str): The username.
+      password (str): The password.
+      secret (str): The client secret.
+      **kwargs: Other arguments of `cls`.
+
+    Returns:
+      (Tado): An instance of a subclass of `cls` using the server URLs.
+    """
+    self.start()
+    return type(cls.__name__, (cls,), self.urls)(username, password, secret, **kwargs)
+
+  def route(self, method, path, body=None):
+    """
+    Set the fixture of a request.
+
+    Parameters:
+      method (str): HTTP verb.
+      path (str): `<host>/<path>`, with its query string if any.
+      body: Response body. `None` for `204 No Content`.
+    """
+    with self._lock:
+      self.fixtures['%s %s' % (method, path)] = body
+
+  def fail(self, pattern, status=500, method=None, headers=None, times=1, probability=1.0):
+    """
+    Inject errors.
+
+    Parameters:
+      pattern (str): `fnmatch` pattern matched against `<host>/<path>`
+        (without query string), e.g. `'my.tado.com/api/v2/homes/*/zones'`.
+      status (int): Status code returned. `None` closes the connection
+        without a response.
+      method (str): HTTP verb to fail. Any when omitted.
+      headers (dict): Headers returned with the error.
+      times (int): Number of requests to fail. Unlimited when `None`.
+      probability (float): Chance for each matching request to fail.
+
+    Returns:
+      (Failure): The failure, to be passed to `clear_failures`.
+    """
+    failure = Failure(pattern, method, status, headers, times, probability)
+    with self._lock:
+      self.failures.append(failure)
+    return failure
+
+  def clear_failures(self, failure=None):
+    """Remove an injected failure, or all of them."""
+    with self._lock:
+      if failure is None:
+        self.failures.clear()
+      elif failure in self.failures:
+        self.failures.remove(failure)
+
+  def expire_tokens(self, refresh=False):
+    """
+    Expire every access token issued so far, as if their lifetime had
+    elapsed.
+
+    Parameters:
+      refresh (bool): Also revoke the refresh tokens, forcing a new login.
+    """
+    with self._lock:
+      self._tokens = dict.fromkeys(self._tokens, 0)
+      if refresh:
+        self._refresh_tokens.clear()
+
+  def _issue_token(self):
+    n = next(self._counter)
+    access, refresh = 'access-%i' % n, 'refresh-%i' % n
+    self._tokens[access] = time.time() + self.expires_in
+    self._refresh_tokens.add(refresh)
+    return {
+      'access_token'  : access,
+      'token_type'    : 'bearer',
+      'refresh_token' : refresh,
+      'expires_in'    : self.expires_in,
+      'scope'         : 'home.user',
+    }
+
+  def _delay(self):
+    if isinstance(self.latency, tuple):
+      with self._lock:
+        return self.random.uniform(*self.latency)
+    return self.latency
+
+  def _failure(self, method, path):
+    with self._lock:
+      for failure in self.failures:
+        if failure.matches(method, path) and self.random.random() < failure.probability:
+          if failure.times is not None:
+            failure.times -= 1
+          return failure
+    return None
+
+  def authenticate(self, form):
+    """
+    Answer a request to the auth server.
+
+    Returns:
+      (tuple): The status code and body.
+    """
+    grant = form.get('grant_type')
+    with self._lock:
+      if grant == 'password':
+        if self.credentials is not None and (form.get('username'), form.get('password')) != tuple(self.credentials):
+          return 400, {'error': 'invalid_grant'}
+        return 200, self._issue_token()
+      if grant == 'refresh_token' and form.get('refresh_token') in self._refresh_tokens:
+        self._refresh_tokens.discard(form['refresh_token'])
+        return 200, self._issue_token()
+    return 400, {'error': 'invalid_grant'}
+
+  def authorized(self, header):
+    """Whether the `Authorization` header carries a valid access token."""
+    if not header or not header.startswith('Bearer '):
+      return False
+    with self._lock:
+      return self._tokens.get(header[7:], 0) > time.time()
+
+  def respond(self, method, path, body):
+    """
+    Answer an API request from the fixtures.
+
+    Parameters:
+      method (str): HTTP verb.
+      path (str): `<host>/<path>`, with its query string if any.
+      body: Decoded request body, `None` when empty.
+
+    Returns:
+      (tuple): The status code and body.
+    """
+    bare = path.split('?', 1)[0]
+    with self._lock:
+      for key in ('%s %s' % (method, path), '%s %s' % (method, bare)):
+        if key in self.fixtures:
+          body = self.fixtures[key]
+          return (204 if body is None else 200), body
+      if method in ('PUT', 'POST'):
+        self.fixtures['GET %s' % bare] = body
+        return 200, body
+      if method == 'DELETE':
+        self.fixtures.pop('GET %s' % bare, None)
+        return 204, None
+    return 404, {'errors': [{'code': 'notFound', 'title': 'no fixture for %s %s' % (method, path)}]}
+
+
+class _Handler(BaseHTTPRequestHandler):
+  mock = None
+  protocol_version = 'HTTP/1.1'
+  disable_nagle_algorithm = True
+
+  def log_message(self, format, *args):
+    pass
+
+  def _send(self, status, body=None, headers=None):
+    data = b'' if body is None else json.dumps(body).encode()
+    etag = None
+    if self.mock.etags and self.command == 'GET' and status == 200:
+      etag = '"%s"' % hashlib.md5(data).hexdigest()
+      if self.headers.get('If-None-Match') == etag:
+        status, data = 304, b''
+    self.send_response(status)
+    if data:
+      self.send_header('Content-Type', 'application/json')
+    if etag is not None:
+      self.send_header('ETag', etag)
+    for name, value in (headers or {}).items():
+      self.send_header(name, str(value))
+    self.send_header('Content-Length', str(len(data)))
+    self.end_headers()
+    self.wfile.write(data)
+
+  def _handle(self):
+    mock = self.mock
+    length = int(self.headers.get('Content-Length') or 0)
+    raw = self.rfile.read(length) if length else b''
+    path = self.path.lstrip('/')
+    bare = path.split('?', 1)[0]
+    with mock._lock:
+      mock.requests.append((self.command, path))
+    delay = mock._delay()
+    if delay:
+      time.sleep(delay)
+    failure = mock._failure(self.command, bare)
+    if failure is not None:
+      if failure.status is None:
+        self.close_connection = True
+        return
+      return self._send(failure.status, {'errors': [{'code': 'injected'}]}, failure.headers)
+    if bare.endswith('/oauth/token'):
+      form = {k: v[0] for k, v in parse_qs(raw.decode()).items()}
+      return self._send(*mock.authenticate(form))
+    if not mock.authorized(self.headers.get('Authorization')):
+      return self._send(401, {'errors': [{'code': 'unauthorized', 'title': 'Full authentication is required'}]})
+    body = json.loads(raw) if raw else None
+    return self._send(*mock.respond(self.command, path, body))
+
+  do_GET = do_PUT = do_POST = do_DELETE = _handle
+
+
+class Recorder(Middleware):
+  """
+  Record the API responses of a client into fixtures for `MockTadoServer`.
+
+  Responses are recorded under the URLs of the real servers, even for a
+  client of `MockTadoServer`. Responses served from the response cache are
+  recorded too. Tokens and other headers are not.
+
+  Parameters:
+    methods (tuple): HTTP verbs recorded.
+
+  Example:
+    ```python
+    from libtado.api import Tado
+    from libtado.mock import Recorder
+
+    recorder = Recorder()
+    t = Tado('Username', 'Password', 'ClientSecret', middleware=[recorder])
+    t.get_zones()
+    recorder.save('fixtures.json')
+    ```
+  """
+  def __init__(self, methods=('GET',)):
+    self.methods = methods
+    self.fixtures = {}
+
+  def _record(self, request, result):
+    if request.method in self.methods:
+      url = request.url
+      for name in bases:
+        if getattr(request.client, name) == request.base:
+          url = '%s/%s' % (getattr(Tado, name), request.cmd)
+          break
+      self.fixtures[fixture_key(request.method, url)] = result
+    return result
+
+  def handle(self, request, call_next):
+    return self._record(request, call_next(request))
+
+  async def handle_async(self, request, call_next):
+    return self._record(request, await call_next(request))
+
+  def save(self, path):
+    """Write the fixtures recorded so far to a JSON file."""
+    with open(path, 'w', encoding='utf-8') as f:
+      json.dump(self.fixtures, f, indent=2, sort_keys=True)
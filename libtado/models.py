@@ -0,0 +1,404 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.models
+
+This module provides typed, memory-efficient models for the responses of
+`libtado.api.Tado`.
+
+Models use `__slots__` instead of a dictionary per object and expose the JSON
+fields as snake_case attributes. Nested objects (setting, overlay,
+termination, sensor data points, ...) are kept as received and only turned
+into models on first access, and timestamps are only parsed into `datetime`
+on first access. Fields unknown to a model are kept in `extra`.
+
+Getters returning these resources take a `model` parameter to get models
+instead of dictionaries.
+
+Example:
+  from libtado.api import Tado
+
+  t = Tado('Username', 'Password', 'ClientSecret')
+  for zone, state in t.get_zone_states(model=True).items():
+    print(zone, state.sensor_data_points.inside_temperature.celsius)
+"""
+
+import datetime
+
+
+def parse_timestamp(value):
+  """
+  Parameters:
+    value (str): ISO8601 timestamp, e.g. `'2023-01-01T23:45:00.000Z'`.
+
+  Returns:
+    (datetime.datetime): The timezone-aware timestamp.
+  """
+  if value.endswith('Z'):
+    value = value[:-1] + '+00:00'
+  return datetime.datetime.fromisoformat(value)
+
+
+def format_timestamp(value):
+  """Inverse of `parse_timestamp`."""
+  text = value.isoformat(timespec='milliseconds')
+  if text.endswith('+00:00'):
+    text = text[:-6] + 'Z'
+  return text
+
+
+def timestamp(value):
+  return parse_timestamp(value) if isinstance(value, str) else value
+
+
+def one(cls):
+  def decode(value):
+    return cls(value) if isinstance(value, dict) else value
+  return decode
+
+
+def many(cls):
+  def decode(value):
+    return tuple(cls(item) for item in value) if isinstance(value, list) else value
+  return decode
+
+
+def _slots(fields):
+  return tuple('_' + attr for attr in fields)
+
+
+def _field(slot, decode):
+  def get(self):
+    value = getattr(self, slot, None)
+    if decode is None or value is None:
+      return value
+    decoded = decode(value)
+    if decoded is not value:
+      setattr(self, slot, decoded)
+    return decoded
+  return property(get)
+
+
+def _encode(value):
+  if isinstance(value, Model):
+    return value.to_dict()
+  if isinstance(value, tuple):
+    return [_encode(item) for item in value]
+  if isinstance(value, datetime.datetime):
+    return format_timestamp(value)
+  return value
+
+
+class Model:
+  """
+  Base class of the models.
+
+  Subclasses map attribute names to `(JSON key, decoder)` in `fields` and
+  declare `__slots__ = _slots(fields)`. The decoder, when not `None`, turns
+  the raw value into its final form on first access.
+
+  Parameters:
+    data (dict): The decoded JSON object. It is not modified.
+  """
+  __slots__ = ('_extra',)
+  fields = {}
+
+  def __init_subclass__(cls, **kwargs):
+    super().__init_subclass__(**kwargs)
+    cls._keys = {key: attr for attr, (key, _) in cls.fields.items()}
+    for attr, (_, decode) in cls.fields.items():
+      setattr(cls, attr, _field('_' + attr, decode))
+
+  def __init__(self, data):
+    keys = self._keys
+    extra = None
+    for key, value in data.items():
+      attr = keys.get(key)
+      if attr is not None:
+        setattr(self, '_' + attr, value)
+      else:
+        if extra is None:
+          extra = {}
+        extra[key] = value
+    self._extra = extra
+
+  @property
+  def extra(self):
+    """(dict): Fields of the response this model does not know."""
+    return self._extra or {}
+
+  def to_dict(self):
+    """
+    Returns:
+      (dict): The model as a JSON-compatible dictionary, like the response it
+        was built from.
+    """
+    out = {}
+    for attr, (key, _) in self.fields.items():
+      try:
+        value = getattr(self, '_' + attr)
+      except AttributeError:
+        continue
+      out[key] = _encode(value)
+    if self._extra:
+      out.update(self._extra)
+    return out
+
+  def __eq__(self, other):
+    return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+  __hash__ = None
+
+  def __repr__(self):
+    values = []
+    for attr in self.fields:
+      if hasattr(self, '_' + attr):
+        values.append('%s=%r' % (attr, getattr(self, attr)))
+    return '%s(%s)' % (type(self).__name__, ', '.join(values))
+
+
+class Temperature(Model):
+  fields = {
+    'celsius':    ('celsius', None),
+    'fahrenheit': ('fahrenheit', None),
+    'type':       ('type', None),
+    'timestamp':  ('timestamp', timestamp),
+    'precision':  ('precision', None),
+  }
+  __slots__ = _slots(fields)
+
+
+class Percentage(Model):
+  fields = {
+    'percentage': ('percentage', None),
+    'type':       ('type', None),
+    'timestamp':  ('timestamp', timestamp),
+  }
+  __slots__ = _slots(fields)
+
+
+class Value(Model):
+  """A value with the time it was last updated, e.g. a connection state."""
+  fields = {
+    'value':     ('value', None),
+    'timestamp': ('timestamp', timestamp),
+  }
+  __slots__ = _slots(fields)
+
+
+class Setting(Model):
+  fields = {
+    'type':        ('type', None),
+    'power':       ('power', None),
+    'temperature': ('temperature', one(Temperature)),
+    'mode':        ('mode', None),
+    'fan_speed':   ('fanSpeed', None),
+  }
+  __slots__ = _slots(fields)
+
+
+class Termination(Model):
+  fields = {
+    'type':                   ('type', None),
+    'type_skill_based_app':   ('typeSkillBasedApp', None),
+    'duration_in_seconds':    ('durationInSeconds', None),
+    'expiry':                 ('expiry', timestamp),
+    'remaining_time_in_seconds': ('remainingTimeInSeconds', None),
+    'projected_expiry':       ('projectedExpiry', timestamp),
+  }
+  __slots__ = _slots(fields)
+
+
+class Overlay(Model):
+  fields = {
+    'type':        ('type', None),
+    'setting':     ('setting', one(Setting)),
+    'termination': ('termination', one(Termination)),
+  }
+  __slots__ = _slots(fields)
+
+
+class OpenWindow(Model):
+  fields = {
+    'detected_time':       ('detectedTime', timestamp),
+    'duration_in_seconds': ('durationInSeconds', None),
+    'expiry':              ('expiry', timestamp),
+    'remaining_time_in_seconds': ('remainingTimeInSeconds', None),
+  }
+  __slots__ = _slots(fields)
+
+
+class Link(Model):
+  fields = {
+    'state':  ('state', None),
+    'reason': ('reason', None),
+  }
+  __slots__ = _slots(fields)
+
+
+class ScheduleChange(Model):
+  fields = {
+    'start':   ('start', timestamp),
+    'setting': ('setting', one(Setting)),
+  }
+  __slots__ = _slots(fields)
+
+
+class ActivityDataPoints(Model):
+  fields = {
+    'heating_power': ('heatingPower', one(Percentage)),
+  }
+  __slots__ = _slots(fields)
+
+
+class SensorDataPoints(Model):
+  fields = {
+    'inside_temperature': ('insideTemperature', one(Temperature)),
+    'humidity':           ('humidity', one(Percentage)),
+  }
+  __slots__ = _slots(fields)
+
+
+class ZoneState(Model):
+  """State of a zone, as returned by `Tado.get_state`."""
+  fields = {
+    'tado_mode':              ('tadoMode', None),
+    'geolocation_override':   ('geolocationOverride', None),
+    'geolocation_override_disable_time': ('geolocationOverrideDisableTime', timestamp),
+    'preparation':            ('preparation', None),
+    'setting':                ('setting', one(Setting)),
+    'overlay_type':           ('overlayType', None),
+    'overlay':                ('overlay', one(Overlay)),
+    'open_window':            ('openWindow', one(OpenWindow)),
+    'next_schedule_change':   ('nextScheduleChange', one(ScheduleChange)),
+    'next_time_block':        ('nextTimeBlock', one(ScheduleChange)),
+    'link':                   ('link', one(Link)),
+    'activity_data_points':   ('activityDataPoints', one(ActivityDataPoints)),
+    'sensor_data_points':     ('sensorDataPoints', one(SensorDataPoints)),
+  }
+  __slots__ = _slots(fields)
+
+
+class Device(Model):
+  """A device, as returned by `Tado.get_devices`."""
+  fields = {
+    'device_type':        ('deviceType', None),
+    'serial_no':          ('serialNo', None),
+    'short_serial_no':    ('shortSerialNo', None),
+    'current_fw_version': ('currentFwVersion', None),
+    'connection_state':   ('connectionState', one(Value)),
+    'characteristics':    ('characteristics', None),
+    'in_pairing_mode':    ('inPairingMode', None),
+    'mounting_state':     ('mountingState', one(Value)),
+    'mounting_state_with_error': ('mountingStateWithError', None),
+    'battery_state':      ('batteryState', None),
+    'orientation':        ('orientation', None),
+    'child_lock_enabled': ('childLockEnabled', None),
+    'gateway_operation':  ('gatewayOperation', None),
+    'duties':             ('duties', None),
+  }
+  __slots__ = _slots(fields)
+
+
+class Zone(Model):
+  """A zone, as returned by `Tado.get_zones`."""
+  fields = {
+    'id':                    ('id', None),
+    'name':                  ('name', None),
+    'type':                  ('type', None),
+    'date_created':          ('dateCreated', timestamp),
+    'device_types':          ('deviceTypes', None),
+    'devices':               ('devices', many(Device)),
+    'report_available':      ('reportAvailable', None),
+    'show_schedule_setup':   ('showScheduleSetup', None),
+    'supports_dazzle':       ('supportsDazzle', None),
+    'dazzle_enabled':        ('dazzleEnabled', None),
+    'dazzle_mode':           ('dazzleMode', None),
+    'open_window_detection': ('openWindowDetection', None),
+  }
+  __slots__ = _slots(fields)
+
+
+class Capabilities(Model):
+  """Capabilities of a zone, as returned by `Tado.get_capabilities`."""
+  fields = {
+    'type':         ('type', None),
+    'temperatures': ('temperatures', None),
+    'can_set_temperature': ('canSetTemperature', None),
+  }
+  __slots__ = _slots(fields)
+
+  def check_temperature(self, temperature, unit='celsius'):
+    """
+    Check that `temperature` can be set on the zone, raising a `ValueError`
+    when the zone has no temperature range in `unit`, or when the value is
+    out of range or off the step.
+
+    Parameters:
+      temperature (float): The temperature.
+      unit (str): `'celsius'` or `'fahrenheit'`.
+    """
+    limits = (self.temperatures or {}).get(unit)
+    if self.can_set_temperature is False or not limits:
+      raise ValueError('The zone has no %s temperature setting' % unit)
+    low, high, step = limits['min'], limits['max'], limits.get('step')
+    if not low <= temperature <= high:
+      raise ValueError('Temperature %s is out of range [%s, %s]' % (temperature, low, high))
+    if step and abs(round((temperature - low) / step) * step + low - temperature) > 1e-6:
+      raise ValueError('Temperature %s is not a multiple of %s from %s' % (temperature, step, low))
+
+
+class Interval(Model):
+  fields = {
+    'start': ('from', timestamp),
+    'end':   ('to', timestamp),
+  }
+  __slots__ = _slots(fields)
+
+
+class DayReport(Model):
+  """
+  Day report of a zone, as returned by `Tado.get_report`.
+
+  The time series are kept as received. Use `series` to get them as column
+  arrays.
+  """
+  fields = {
+    'zone_type':      ('zoneType', None),
+    'interval':       ('interval', one(Interval)),
+    'hours_in_day':   ('hoursInDay', None),
+    'measured_data':  ('measuredData', None),
+    'stripes':        ('stripes', None),
+    'settings':       ('settings', None),
+    'call_for_heat':  ('callForHeat', None),
+    'hot_water_production': ('hotWaterProduction', None),
+    'ac_activity':    ('acActivity', None),
+    'weather':        ('weather', None),
+  }
+  __slots__ = _slots(fields)
+
+  def series(self):
+    """
+    Returns:
+      (DayReportSeries): The time series of the report, see
+        `libtado.timeseries`. Requires numpy.
+    """
+    from libtado.timeseries import DayReportSeries
+    return DayReportSeries.from_report(self.to_dict())
+
+
+def zone_states(data):
+  """
+  Parameters:
+    data (dict): Response of `Tado.get_zone_states`.
+
+  Returns:
+    (dict): `ZoneState` models keyed by zone ID.
+  """
+  return {int(zone): ZoneState(state) for zone, state in data['zoneStates'].items()}
+
+
+def list_of(cls):
+  """Decoder of a JSON array of `cls` objects into a list of models."""
+  def decode(data):
+    return [cls(item) for item in data]
+  return decode
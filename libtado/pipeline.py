@@ -0,0 +1,259 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.pipeline
+
+This module provides the request pipeline shared by every API family of
+`libtado.api.Tado` and `libtado.aio.AsyncTado`.
+
+Each API call becomes a `Request` that goes through a chain of middlewares
+before being sent by the client. A middleware can inspect or modify the
+request, answer it without calling the next one (e.g. from a cache), retry
+it, or observe its result. The built-in middlewares implement the response
+cache, retries, rate limiting and authentication; more can be added for
+metrics or tracing.
+
+Example:
+  import time
+  from libtado.api import Tado
+  from libtado.pipeline import Middleware
+
+  class Timing(Middleware):
+    def handle(self, request, call_next):
+      started = time.monotonic()
+      try:
+        return call_next(request)
+      finally:
+        print(request.method, request.url, time.monotonic() - started)
+
+  t = Tado('Username', 'Password', 'ClientSecret', middleware=[Timing()])
+"""
+
+import asyncio
+import time
+from functools import partial
+
+
+class Request:
+  """
+  An API call going through the pipeline.
+
+  Attributes:
+    client (Tado): Client the call is made on, a home view included.
+    method (str): HTTP verb.
+    base (str): Base URL of the API family, e.g. `Tado.api`.
+    cmd (str): Path relative to `base`.
+    data: Body, encoded as JSON. `None` for no body.
+    headers (dict): Headers to send. The auth middleware adds the token.
+    context (dict): Free storage for middlewares.
+  """
+  __slots__ = ('client', 'method', 'base', 'cmd', 'data', 'headers', 'context')
+
+  def __init__(self, client, method, base, cmd, data=None, headers=None):
+    self.client = client
+    self.method = method
+    self.base = base
+    self.cmd = cmd
+    self.data = data
+    self.headers = dict(headers or {})
+    self.context = {}
+
+  @property
+  def url(self):
+    return '%s/%s' % (self.base, self.cmd)
+
+  def __repr__(self):
+    return 'Request(%s %s)' % (self.method, self.url)
+
+
+class Middleware:
+  """
+  Base class of the middlewares.
+
+  `handle` is called by `Tado` and `handle_async` by `AsyncTado`. Both
+  receive the request and the rest of the chain, which must be called (and
+  awaited, for `handle_async`) to send the request, and return the decoded
+  response body. The default implementations pass the request on unchanged.
+  """
+
+  def handle(self, request, call_next):
+    return call_next(request)
+
+  async def handle_async(self, request, call_next):
+    return await call_next(request)
+
+
+class AuthMiddleware(Middleware):
+  """Refresh the access token when needed and add it to the request."""
+
+  def handle(self, request, call_next):
+    request.client.refresh_auth()
+    request.headers.update(request.client.access_headers)
+    return call_next(request)
+
+  async def handle_async(self, request, call_next):
+    await request.client.refresh_auth()
+    request.headers.update(request.client.access_headers)
+    return await call_next(request)
+
+
+class RateLimitMiddleware(Middleware):
+  """
+  Wait for a slot of a `libtado.ratelimit.RateLimiter`, using the home ID
+  as fairness key.
+  """
+
+  def __init__(self, limiter):
+    self.limiter = limiter
+
+  def handle(self, request, call_next):
+    self.limiter.acquire(request.base, key=request.client._id)
+    return call_next(request)
+
+  async def handle_async(self, request, call_next):
+    await self.limiter.acquire_async(request.base, key=request.client._id)
+    return await call_next(request)
+
+
+class CacheMiddleware(Middleware):
+  """
+  Serve `GET` requests from a `libtado.cache.ResponseCache` and invalidate
+  the entries touched by writes.
+  """
+
+  def __init__(self, cache):
+    self.cache = cache
+
+  def handle(self, request, call_next):
+    if request.method != 'GET':
+      try:
+        return call_next(request)
+      finally:
+        self.cache.invalidate_related(request.base, request.cmd)
+    hit, result = self.cache.lookup(request.base, request.cmd)
+    request.context['cache_hit'] = hit
+    if hit:
+      return result
+    result = call_next(request)
+    self.cache.store(request.base, request.cmd, result)
+    return result
+
+  async def handle_async(self, request, call_next):
+    if request.method != 'GET':
+      try:
+        return await call_next(request)
+      finally:
+        self.cache.invalidate_related(request.base, request.cmd)
+    hit, result = self.cache.lookup(request.base, request.cmd)
+    request.context['cache_hit'] = hit
+    if hit:
+      return result
+    result = await call_next(request)
+    self.cache.store(request.base, request.cmd, result)
+    return result
+
+
+class RetryMiddleware(Middleware):
+  """
+  Retry requests according to a `libtado.retry.RetryPolicy`.
+
+  Each attempt goes through the rest of the chain again, so it waits for the
+  rate limiter and uses a fresh token.
+
+  Parameters:
+    policy (RetryPolicy): The policy.
+    errors (tuple): Exception types retried as connection errors. Errors
+      carrying a status code (`requests.HTTPError`,
+      `aiohttp.ClientResponseError`) are retried when the policy lists it.
+  """
+
+  def __init__(self, policy, errors=()):
+    self.policy = policy
+    self.errors = errors
+
+  def reason(self, error):
+    """
+    Returns:
+      (tuple): The reason to retry after `error` (a status code or the
+        error) and the response headers, or `None` when not retryable.
+    """
+    if isinstance(error, self.errors):
+      return error, None
+    status = getattr(error, 'status', None)
+    headers = getattr(error, 'headers', None)
+    response = getattr(error, 'response', None)
+    if response is not None:
+      status, headers = response.status_code, response.headers
+    if status in self.policy.statuses:
+      return status, headers
+    return None
+
+  def _delay(self, request, error, attempt, started):
+    failure = self.reason(error)
+    if failure is None:
+      return None
+    reason, headers = failure
+    delay = self.policy.next_delay(attempt, started, headers)
+    if delay is None:
+      self.policy.record_give_up()
+      return None
+    self.policy.record_retry(request.method, request.url, attempt, delay, reason)
+    request.context['retries'] = attempt + 1
+    return delay
+
+  def handle(self, request, call_next):
+    if not self.policy.allows(request.method):
+      return call_next(request)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+      try:
+        return call_next(request)
+      except Exception as e:
+        delay = self._delay(request, e, attempt, started)
+        if delay is None:
+          raise
+      time.sleep(delay)
+      attempt += 1
+
+  async def handle_async(self, request, call_next):
+    if not self.policy.allows(request.method):
+      return await call_next(request)
+    started = time.monotonic()
+    attempt = 0
+    while True:
+      try:
+        return await call_next(request)
+      except Exception as e:
+        delay = self._delay(request, e, attempt, started)
+        if delay is None:
+          raise
+      await asyncio.sleep(delay)
+      attempt += 1
+
+
+class Pipeline:
+  """
+  A chain of middlewares ending with the function sending the request.
+
+  Parameters:
+    handler (callable): Sends a `Request` and returns the decoded response
+      body. A coroutine function for `run_async`.
+    middlewares (list): Middlewares, outermost first. The list can be
+      modified afterwards.
+  """
+
+  def __init__(self, handler, middlewares=None):
+    self.handler = handler
+    self.middlewares = list(middlewares or [])
+
+  def run(self, request, index=0):
+    """Pass `request` through the middlewares from `index` on."""
+    if index == len(self.middlewares):
+      return self.handler(request)
+    return self.middlewares[index].handle(request, partial(self.run, index=index + 1))
+
+  async def run_async(self, request, index=0):
+    """Same as `run`, for asyncio clients."""
+    if index == len(self.middlewares):
+      return await self.handler(request)
+    return await self.middlewares[index].handle_async(request, partial(self.run_async, index=index + 1))
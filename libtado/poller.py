@@ -0,0 +1,318 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.poller
+
+This module provides a telemetry poller for `libtado.api.Tado` and
+`libtado.aio.AsyncTado`.
+
+The poller samples the zone states (`get_zone_states`), and optionally the
+weather (`get_weather`) and the air comfort (`get_air_comfort`), on a
+schedule with jitter. Each sample is compared with the previous one and only
+the differences are reported, as typed events. When a sample is unchanged,
+nothing is yielded and no diffing is done.
+
+Example:
+  from libtado.api import Tado
+  from libtado.poller import Poller, TemperatureChanged, WindowOpened
+
+  t = Tado('Username', 'Password', 'ClientSecret')
+  for event in Poller(t, interval=60, weather=True):
+    if isinstance(event, TemperatureChanged):
+      print('zone %s: %s -> %s' % (event.zone, event.old, event.new))
+    elif isinstance(event, WindowOpened):
+      print('zone %s: window open' % event.zone)
+"""
+
+import asyncio
+import random
+import time
+
+from libtado.aio import AsyncTado
+
+
+class Event:
+  """
+  A change between two samples.
+
+  Attributes:
+    source (str): `'zone'`, `'weather'` or `'air_comfort'`.
+    zone (int): Zone ID for zone events, `None` otherwise.
+    path (tuple): Keys leading to the changed value in the response.
+    old: Previous value, `None` when it did not exist.
+    new: Current value, `None` when it no longer exists.
+  """
+  __slots__ = ('source', 'zone', 'path', 'old', 'new')
+
+  def __init__(self, source, zone, path, old, new):
+    self.source = source
+    self.zone = zone
+    self.path = path
+    self.old = old
+    self.new = new
+
+  def __repr__(self):
+    return '%s(source=%r, zone=%r, path=%r, old=%r, new=%r)' % (type(self).__name__, self.source, self.zone, self.path, self.old, self.new)
+
+  def __eq__(self, other):
+    return type(self) is type(other) and all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+
+
+class Snapshot(Event):
+  """First sample of a source. `new` holds the whole response."""
+  __slots__ = ()
+
+class FieldChanged(Event):
+  """A value without a dedicated event type changed."""
+  __slots__ = ()
+
+class TemperatureChanged(Event):
+  """The measured inside temperature of a zone changed (Celsius)."""
+  __slots__ = ()
+
+class HumidityChanged(Event):
+  """The measured humidity of a zone changed (percentage)."""
+  __slots__ = ()
+
+class HeatingPowerChanged(Event):
+  """The heating power of a zone changed (percentage)."""
+  __slots__ = ()
+
+class SettingChanged(Event):
+  """The setting (power, target temperature) of a zone changed."""
+  __slots__ = ()
+
+class OverlayStarted(Event):
+  """A manual overlay started on a zone."""
+  __slots__ = ()
+
+class OverlayEnded(Event):
+  """The manual overlay of a zone ended."""
+  __slots__ = ()
+
+class OverlayChanged(Event):
+  """The manual overlay of a zone was replaced."""
+  __slots__ = ()
+
+class WindowOpened(Event):
+  """An open window was detected in a zone."""
+  __slots__ = ()
+
+class WindowClosed(Event):
+  """The open window of a zone is no longer reported."""
+  __slots__ = ()
+
+class LinkLost(Event):
+  """A zone went offline."""
+  __slots__ = ()
+
+class LinkRestored(Event):
+  """A zone came back online."""
+  __slots__ = ()
+
+class OutsideTemperatureChanged(Event):
+  """The outside temperature changed (Celsius)."""
+  __slots__ = ()
+
+
+FIELD_EVENTS = {
+  ('sensorDataPoints', 'insideTemperature', 'celsius'): TemperatureChanged,
+  ('sensorDataPoints', 'humidity', 'percentage'): HumidityChanged,
+  ('activityDataPoints', 'heatingPower', 'percentage'): HeatingPowerChanged,
+  ('outsideTemperature', 'celsius'): OutsideTemperatureChanged,
+}
+
+# Sub-trees compared as a whole: (event when it appears, when it disappears,
+# when it changes).
+SUBTREE_EVENTS = {
+  'setting': (SettingChanged, SettingChanged, SettingChanged),
+  'overlay': (OverlayStarted, OverlayEnded, OverlayChanged),
+  'openWindow': (WindowOpened, WindowClosed, FieldChanged),
+}
+
+
+def flatten(value, ignore=(), path=()):
+  """
+  Parameters:
+    value: A decoded JSON document.
+    ignore (tuple): Keys skipped wherever they appear.
+
+  Returns:
+    (dict): Leaf values keyed by their path.
+  """
+  if isinstance(value, dict):
+    out = {}
+    for key, item in value.items():
+      if key not in ignore:
+        out.update(flatten(item, ignore, path + (key,)))
+    return out
+  if isinstance(value, list):
+    out = {}
+    for index, item in enumerate(value):
+      out.update(flatten(item, ignore, path + (index,)))
+    return out
+  return {path: value}
+
+
+def diff(source, zone, old, new, ignore=()):
+  """
+  Parameters:
+    source (str): Source name set on the events.
+    zone (int): Zone ID set on the events.
+    old (dict): Previous sample.
+    new (dict): Current sample.
+    ignore (tuple): Keys skipped wherever they appear.
+
+  Returns:
+    (list): The events turning `old` into `new`.
+  """
+  events = []
+  old = old or {}
+  new = new or {}
+  for key, (started, ended, changed) in SUBTREE_EVENTS.items():
+    before, after = old.get(key), new.get(key)
+    if before == after:
+      continue
+    if before is None:
+      events.append(started(source, zone, (key,), None, after))
+    elif after is None:
+      events.append(ended(source, zone, (key,), before, None))
+    else:
+      events.append(changed(source, zone, (key,), before, after))
+
+  before = flatten({k: v for k, v in old.items() if k not in SUBTREE_EVENTS}, ignore)
+  after = flatten({k: v for k, v in new.items() if k not in SUBTREE_EVENTS}, ignore)
+  for path in sorted(set(before) | set(after), key=repr):
+    if before.get(path) == after.get(path):
+      continue
+    if path == ('link', 'state'):
+      if after.get(path) == 'ONLINE':
+        event = LinkRestored
+      elif before.get(path) == 'ONLINE':
+        event = LinkLost
+      else:
+        event = FieldChanged
+    else:
+      event = FIELD_EVENTS.get(path, FieldChanged)
+    events.append(event(source, zone, path, before.get(path), after.get(path)))
+  return events
+
+
+class Poller:
+  """
+  Poll a home and yield what changed.
+
+  Iterate over it (`for event in poller`) with a `Tado`, or asynchronously
+  (`async for event in poller`) with an `AsyncTado` or a `Tado`, whose calls
+  then run in the default executor.
+
+  Parameters:
+    tado (Tado): Client of the home to poll.
+    interval (float): Seconds between the start of two polls.
+    jitter (float): Fraction of `interval` by which each wait is randomly
+      shortened or lengthened, to spread pollers of several homes.
+    zones (list): Zone IDs to report. All zones when omitted. The states
+      of every zone are still fetched with a single request.
+    weather (bool): Also poll `get_weather`.
+    air_comfort (bool): Also poll `get_air_comfort`.
+    ignore (tuple): Keys never reported, by default timestamps and
+      Fahrenheit duplicates of Celsius values.
+    snapshot (bool): Yield a `Snapshot` event with the first sample of each
+      source.
+  """
+  default_ignore = ('timestamp', 'fahrenheit')
+
+  def __init__(self, tado, interval=60, jitter=0.1, zones=None, weather=False, air_comfort=False, ignore=None, snapshot=True):
+    self.tado = tado
+    self.interval = interval
+    self.jitter = jitter
+    self.zones = None if zones is None else {str(z) for z in zones}
+    self.sources = ['zone']
+    if weather:
+      self.sources.append('weather')
+    if air_comfort:
+      self.sources.append('air_comfort')
+    self.ignore = self.default_ignore if ignore is None else tuple(ignore)
+    self.snapshot = snapshot
+    self.previous = {}
+    self.running = True
+
+  methods = {'zone': 'get_zone_states', 'weather': 'get_weather', 'air_comfort': 'get_air_comfort'}
+
+  def stop(self):
+    """Stop iterating after the current poll."""
+    self.running = False
+
+  def delay(self):
+    """Returns the time to wait before the next poll, jitter included."""
+    return max(self.interval * (1 + random.uniform(-self.jitter, self.jitter)), 0)
+
+  def compare(self, source, sample):
+    """
+    Compare a sample with the previous one of its source and remember it.
+
+    Parameters:
+      source (str): `'zone'`, `'weather'` or `'air_comfort'`.
+      sample (dict): Response of the source.
+
+    Returns:
+      (list): The events. Empty when nothing changed.
+    """
+    previous = self.previous.get(source)
+    self.previous[source] = sample
+    if previous is None:
+      return [Snapshot(source, None, (), None, sample)] if self.snapshot else []
+    if sample is previous or sample == previous:
+      return []
+    if source != 'zone':
+      return diff(source, None, previous, sample, self.ignore)
+    events = []
+    before = previous.get('zoneStates', {})
+    after = sample.get('zoneStates', {})
+    for zone in sorted(set(before) | set(after), key=lambda z: int(z) if str(z).isdigit() else 0):
+      if self.zones is not None and str(zone) not in self.zones:
+        continue
+      if before.get(zone) != after.get(zone):
+        events.extend(diff('zone', int(zone), before.get(zone), after.get(zone), self.ignore))
+    return events
+
+  def poll(self):
+    """
+    Fetch every source once.
+
+    Returns:
+      (list): The events since the previous poll.
+    """
+    events = []
+    for source in self.sources:
+      events.extend(self.compare(source, getattr(self.tado, self.methods[source])()))
+    return events
+
+  async def poll_async(self):
+    """Same as `poll`, for asyncio callers."""
+    loop = asyncio.get_running_loop()
+    events = []
+    for source in self.sources:
+      method = getattr(self.tado, self.methods[source])
+      if isinstance(self.tado, AsyncTado):
+        sample = await method()
+      else:
+        sample = await loop.run_in_executor(None, method)
+      events.extend(self.compare(source, sample))
+    return events
+
+  def __iter__(self):
+    while self.running:
+      started = time.monotonic()
+      yield from self.poll()
+      if not self.running:
+        return
+      time.sleep(max(self.delay() - (time.monotonic() - started), 0))
+
+  async def __aiter__(self):
+    while self.running:
+      started = time.monotonic()
+      for event in await self.poll_async():
+        yield event
+      if not self.running:
+        return
+      await asyncio.sleep(max(self.delay() - (time.monotonic() - started), 0))
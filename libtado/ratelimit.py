@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.ratelimit
+
+This module provides a client-side rate limiter for `libtado.api.Tado` and
+`libtado.aio.AsyncTado`.
+
+Each API host gets a token bucket. A request takes one token, waiting for
+the bucket to refill when it is empty. Waiting requests are queued per key
+(the home ID) and served round-robin between keys, so one busy home cannot
+starve the others. Share one limiter between instances to cap their combined
+rate.
+
+Example:
+  from libtado.api import Tado
+  from libtado.ratelimit import RateLimiter
+
+  limiter = RateLimiter({'my.tado.com': (5, 10)}, default=(2, 5))
+  homes = [Tado('Username', 'Password', 'ClientSecret', home_id=h, rate_limiter=limiter) for h in (1, 2)]
+"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict, deque
+from urllib.parse import urlsplit
+
+
+class TokenBucket:
+  """
+  Token bucket with fair round-robin queueing between keys.
+
+  Parameters:
+    rate (float): Tokens added per second.
+    burst (int): Capacity of the bucket, i.e. the number of requests that can
+      be sent at once after an idle period.
+  """
+
+  def __init__(self, rate, burst=1):
+    self.rate = float(rate)
+    self.burst = max(float(burst), 1.0)
+    self.tokens = self.burst
+    self._updated = time.monotonic()
+    self._queues = OrderedDict()
+    self._cond = threading.Condition()
+
+  def _refill(self, now):
+    self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+    self._updated = now
+
+  def _enqueue(self, key):
+    ticket = object()
+    with self._cond:
+      self._queues.setdefault(key, deque()).append(ticket)
+    return ticket
+
+  def _cancel(self, key, ticket):
+    with self._cond:
+      queue = self._queues.get(key)
+      if queue is not None and ticket in queue:
+        queue.remove(ticket)
+        if not queue:
+          del self._queues[key]
+      self._cond.notify_all()
+
+  def _poll(self, key, ticket):
+    """Take a token for `ticket` if it is its turn. Returns the time to wait, 0 when granted."""
+    with self._cond:
+      now = time.monotonic()
+      self._refill(now)
+      head_key = next(iter(self._queues))
+      if head_key != key or self._queues[key][0] is not ticket:
+        return 1 / self.rate
+      if self.tokens < 1:
+        return (1 - self.tokens) / self.rate
+      self.tokens -= 1
+      queue = self._queues.pop(key)
+      queue.popleft()
+      if queue:
+        # Round-robin: the key goes to the back of the line.
+        self._queues[key] = queue
+      self._cond.notify_all()
+      return 0
+
+  def acquire(self, key=None):
+    """Take a token, blocking until one is available and it is `key`'s turn."""
+    ticket = self._enqueue(key)
+    try:
+      while True:
+        delay = self._poll(key, ticket)
+        if not delay:
+          return
+        with self._cond:
+          self._cond.wait(delay)
+    except BaseException:
+      self._cancel(key, ticket)
+      raise
+
+  async def acquire_async(self, key=None):
+    """Take a token without blocking the event loop."""
+    ticket = self._enqueue(key)
+    try:
+      while True:
+        delay = self._poll(key, ticket)
+        if not delay:
+          return
+        await asyncio.sleep(delay)
+    except BaseException:
+      self._cancel(key, ticket)
+      raise
+
+
+class RateLimiter:
+  """
+  Token buckets per API host.
+
+  Parameters:
+    limits (dict): Maps host names (e.g. `'my.tado.com'`) to a
+      `(rate, burst)` tuple, `rate` being in requests per second.
+    default (tuple): `(rate, burst)` of hosts missing from `limits`. Those
+      hosts are not limited when omitted.
+  """
+
+  def __init__(self, limits=None, default=None):
+    self.limits = dict(limits or {})
+    self.default = default
+    self._buckets = {}
+    self._lock = threading.Lock()
+
+  def bucket(self, url):
+    """
+    Parameters:
+      url (str): URL or host name.
+
+    Returns:
+      (TokenBucket): The bucket of the host, or `None` when not limited.
+    """
+    host = urlsplit(url).hostname if '://' in url else url
+    with self._lock:
+      if host not in self._buckets:
+        limit = self.limits.get(host, self.default)
+        self._buckets[host] = TokenBucket(*limit) if limit else None
+      return self._buckets[host]
+
+  def acquire(self, url, key=None):
+    """
+    Wait for a request slot to the host of `url`.
+
+    Parameters:
+      url (str): URL or host name of the request.
+      key: Fairness key, usually the home ID.
+    """
+    bucket = self.bucket(url)
+    if bucket is not None:
+      bucket.acquire(key)
+
+  async def acquire_async(self, url, key=None):
+    """Same as `acquire`, for asyncio callers."""
+    bucket = self.bucket(url)
+    if bucket is not None:
+      await bucket.acquire_async(key)
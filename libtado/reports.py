@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.reports
+
+This module provides the on-disk cache used by `libtado.api.Tado.get_reports`
+to keep day reports between runs.
+
+A day report of a past day never changes, so it is stored once under a name
+derived from the home, the zone and the date, and read back instead of being
+fetched again.
+
+Example:
+  from libtado.api import Tado
+  from libtado.reports import ReportCache
+
+  t = Tado('Username', 'Password', 'ClientSecret')
+  cache = ReportCache('~/.cache/libtado/reports')
+  for zone, date, report in t.get_reports(None, '2023-01-01', '2023-12-31', cache=cache):
+    ...
+"""
+
+import datetime
+import hashlib
+import os
+import tempfile
+
+from libtado.codec import get_codec
+
+
+def date_range(start, end):
+  """
+  Parameters:
+    start (str|date): First day, as a date or in ISO8601 format.
+    end (str|date): Last day, included.
+
+  Returns:
+    (list): Every date from `start` to `end`.
+  """
+  if isinstance(start, str):
+    start = datetime.date.fromisoformat(start)
+  if isinstance(end, str):
+    end = datetime.date.fromisoformat(end)
+  return [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+
+
+class ReportCache:
+  """
+  Day reports stored as JSON files, one per home, zone and day.
+
+  Files are named after a SHA-256 of their key and spread over 256
+  sub-directories. Writes are atomic, so concurrent runs can share a cache.
+
+  Parameters:
+    directory (str): Root directory of the cache. `~` is expanded and it is
+      created when missing.
+    codec (str|Codec): JSON codec of the files, see `libtado.codec`. The
+      fastest installed one when omitted.
+  """
+
+  def __init__(self, directory, codec=None):
+    self.directory = os.path.abspath(os.path.expanduser(directory))
+    self.codec = get_codec(codec)
+
+  def path(self, home_id, zone, date):
+    """
+    Returns:
+      (str): Path of the file holding the report of `zone` on `date`.
+    """
+    key = hashlib.sha256(('%s/%s/%s' % (home_id, zone, date)).encode()).hexdigest()
+    return os.path.join(self.directory, key[:2], key + '.json')
+
+  def get(self, home_id, zone, date):
+    """
+    Returns:
+      (dict): The stored report, or `None`.
+    """
+    try:
+      with open(self.path(home_id, zone, date), 'rb') as f:
+        return self.codec.loads(f.read())
+    except (OSError, ValueError):
+      return None
+
+  def put(self, home_id, zone, date, report):
+    """Store `report` as the report of `zone` on `date`."""
+    path = self.path(home_id, zone, date)
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.report-')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(self.codec.dumps(report))
+      os.replace(tmp, path)
+    except BaseException:
+      os.unlink(tmp)
+      raise
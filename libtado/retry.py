@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.retry
+
+This module provides the retry policy applied by the `RetryMiddleware` of the
+request pipeline of `libtado.api.Tado` and `libtado.aio.AsyncTado`.
+
+Only idempotent methods are retried, on connection errors and on the status
+codes listed in the policy. The delay between attempts grows exponentially
+with full jitter, a `Retry-After` header sent by the server takes precedence,
+and the total time spent retrying one request is capped by a budget.
+
+Example:
+  from libtado.api import Tado
+  from libtado.retry import RetryPolicy
+
+  retry = RetryPolicy(total=5, backoff_factor=0.5, budget=30)
+  t = Tado('Username', 'Password', 'ClientSecret', retry=retry)
+  ...
+  print(retry.stats)
+"""
+
+import email.utils
+import random
+import threading
+import time
+from collections import Counter
+
+
+class RetryPolicy:
+  """
+  Parameters:
+    total (int): Maximum number of retries of one request.
+    backoff_factor (float): Base delay in seconds. Retry `n` (from 0) waits a
+      random time between 0 and `backoff_factor * 2 ** n`.
+    max_backoff (float): Upper bound of a single delay, `Retry-After`
+      included.
+    budget (float): Maximum time in seconds spent on one request, retries
+      and delays included. No retry is attempted past it.
+    statuses (tuple): HTTP status codes that are retried.
+    methods (tuple): HTTP methods that are retried.
+    on_retry (callable): Called as `on_retry(method, url, attempt, delay,
+      reason)` before each retry, `reason` being the status code or the
+      exception.
+
+  Attributes:
+    stats (Counter): Number of `retries` and of requests that `gave_up`,
+      plus the number of retries per reason (e.g. `429` or
+      `'ConnectionError'`).
+  """
+  default_statuses = (429, 500, 502, 503, 504)
+  default_methods = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+  def __init__(self, total=3, backoff_factor=0.5, max_backoff=30, budget=60, statuses=None, methods=None, on_retry=None):
+    self.total = total
+    self.backoff_factor = backoff_factor
+    self.max_backoff = max_backoff
+    self.budget = budget
+    self.statuses = frozenset(statuses if statuses is not None else self.default_statuses)
+    self.methods = frozenset(m.upper() for m in (methods if methods is not None else self.default_methods))
+    self.on_retry = on_retry
+    self.stats = Counter()
+    self._lock = threading.Lock()
+
+  def allows(self, method):
+    """Whether requests with `method` may be retried."""
+    return self.total > 0 and method.upper() in self.methods
+
+  def retry_after(self, headers):
+    """
+    Parameters:
+      headers (dict): Response headers.
+
+    Returns:
+      (float): The delay requested by a `Retry-After` header, or `None`.
+    """
+    value = headers.get('Retry-After') if headers is not None else None
+    if not value:
+      return None
+    try:
+      return max(float(value), 0)
+    except ValueError:
+      pass
+    try:
+      return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+      return None
+
+  def delay(self, attempt, headers=None):
+    """
+    Parameters:
+      attempt (int): Number of retries already done.
+      headers (dict): Headers of the failed response, if any.
+
+    Returns:
+      (float): Seconds to wait before the next attempt.
+    """
+    delay = self.retry_after(headers)
+    if delay is None:
+      delay = random.uniform(0, self.backoff_factor * 2 ** attempt)
+    return min(delay, self.max_backoff)
+
+  def next_delay(self, attempt, started, headers=None):
+    """
+    Decide whether to retry.
+
+    Parameters:
+      attempt (int): Number of retries already done.
+      started (float): `time.monotonic()` of the first attempt.
+      headers (dict): Headers of the failed response, if any.
+
+    Returns:
+      (float): Seconds to wait before retrying, or `None` to give up.
+    """
+    if attempt >= self.total:
+      return None
+    delay = self.delay(attempt, headers)
+    if time.monotonic() - started + delay > self.budget:
+      return None
+    return delay
+
+  def record_retry(self, method, url, attempt, delay, reason):
+    with self._lock:
+      self.stats['retries'] += 1
+      self.stats[reason if isinstance(reason, int) else type(reason).__name__] += 1
+    if self.on_retry is not None:
+      self.on_retry(method, url, attempt, delay, reason)
+
+  def record_give_up(self):
+    with self._lock:
+      self.stats['gave_up'] += 1
@@ -0,0 +1,496 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.schedule
+
+This module provides the schedule synchronisation of
+`libtado.api.Tado.sync_schedule` and the local schedule evaluation of
+`libtado.api.Tado.compile_schedule`.
+
+A schedule is a timetable type and the blocks of each of its day types. The
+blocks read from the API and the desired ones are normalised (sorted, with
+only the fields that matter and rounded temperatures) before being compared,
+so only the timetables and day types that actually differ are written.
+
+Schedules are written as JSON, with the blocks either in the API format or
+in a short form:
+
+```json
+{
+  "timetable": "THREE_DAY",
+  "blocks": {
+    "MONDAY_TO_FRIDAY": [
+      {"start": "00:00", "end": "06:30", "temperature": 17},
+      {"start": "06:30", "end": "22:00", "temperature": 20.5},
+      {"start": "22:00", "end": "00:00", "temperature": 17}
+    ],
+    "SATURDAY": [{"start": "00:00", "end": "00:00", "temperature": 19}],
+    "SUNDAY": [{"start": "00:00", "end": "00:00", "temperature": null}]
+  }
+}
+```
+
+Example:
+  from libtado.api import Tado
+  from libtado.schedule import load_schedule
+
+  t = Tado('Username', 'Password', 'ClientSecret')
+  plan = t.sync_schedule(load_schedule('schedule.json'), dry_run=True)
+  print(plan)
+
+  compiled = t.compile_schedule(1)
+  print(compiled.at(datetime.datetime(2024, 1, 9, 18, 30)))
+"""
+
+import bisect
+import datetime
+import json
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+try:
+  from zoneinfo import ZoneInfo
+except ImportError:
+  from dateutil.tz import gettz as ZoneInfo
+
+from libtado.models import parse_timestamp
+
+timetables = {'ONE_DAY': 0, 'THREE_DAY': 1, 'SEVEN_DAY': 2}
+"""Timetable IDs keyed by type."""
+
+day_types = {
+  'ONE_DAY':   ('MONDAY_TO_SUNDAY',),
+  'THREE_DAY': ('MONDAY_TO_FRIDAY', 'SATURDAY', 'SUNDAY'),
+  'SEVEN_DAY': ('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY'),
+}
+"""Day types of each timetable type."""
+
+weekdays = ('MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY')
+
+
+def day_type(timetable, weekday):
+  """
+  Parameters:
+    timetable (str): Timetable type, e.g. `'THREE_DAY'`.
+    weekday (int): Day of the week, Monday being 0.
+
+  Returns:
+    (str): The day type of the timetable covering the weekday.
+  """
+  if timetable == 'ONE_DAY':
+    return 'MONDAY_TO_SUNDAY'
+  if timetable == 'THREE_DAY' and weekday < 5:
+    return 'MONDAY_TO_FRIDAY'
+  return weekdays[weekday]
+
+
+def minutes(time):
+  """Minutes since midnight of a `'HH:MM'` time."""
+  hours, mins = time.split(':')
+  return int(hours) * 60 + int(mins)
+
+
+class Block(tuple):
+  """
+  A normalised schedule block: `(start, end, type, power, celsius,
+  geolocation_override)`. `celsius` is `None` when the power is off; times
+  are `'HH:MM'`, `'00:00'` ending the day.
+  """
+  __slots__ = ()
+
+  def __new__(cls, start, end, type='HEATING', power='ON', celsius=None, geolocation_override=False):
+    if end == '24:00':
+      end = '00:00'
+    if power != 'ON':
+      celsius = None
+    elif celsius is not None:
+      celsius = round(float(celsius), 1)
+    return tuple.__new__(cls, (start, end, type, power, celsius, bool(geolocation_override)))
+
+  @property
+  def start(self):
+    return self[0]
+
+  @property
+  def end(self):
+    return self[1]
+
+  @property
+  def celsius(self):
+    return self[4]
+
+  @classmethod
+  def parse(cls, block):
+    """
+    Parameters:
+      block (dict): A block in the API format, or in the short form with a
+        `temperature` (`None` to turn the zone off).
+
+    Returns:
+      (Block): The normalised block.
+    """
+    if 'setting' not in block:
+      temperature = block.get('temperature')
+      power = 'OFF' if temperature is None else 'ON'
+      return cls(block['start'], block['end'], block.get('type', 'HEATING'), power, temperature, block.get('geolocationOverride', False))
+    setting = block['setting']
+    celsius = (setting.get('temperature') or {}).get('celsius')
+    return cls(block['start'], block['end'], setting.get('type', 'HEATING'), setting.get('power', 'ON'), celsius, block.get('geolocationOverride', False))
+
+  def to_api(self, day_type):
+    """
+    Returns:
+      (dict): The block in the API format.
+    """
+    setting = {'type': self[2], 'power': self[3]}
+    if self.celsius is not None:
+      setting['temperature'] = {'celsius': self.celsius}
+    return {'dayType': day_type, 'start': self.start, 'end': self.end, 'geolocationOverride': self[5], 'setting': setting}
+
+  def __str__(self):
+    value = '%s' % self.celsius if self.celsius is not None else self[3]
+    return '%s-%s %s' % (self.start, self.end, value)
+
+
+def normalise_blocks(blocks):
+  """
+  Parameters:
+    blocks (list): Blocks in the API format or the short form, of every day
+      type, as returned by `Tado.get_schedule_blocks`.
+
+  Returns:
+    (dict): Sorted `Block` tuples keyed by day type.
+  """
+  days = {}
+  for block in blocks:
+    days.setdefault(block['dayType'], []).append(Block.parse(block))
+  return {day: tuple(sorted(items)) for day, items in days.items()}
+
+
+class Schedule:
+  """
+  A desired zone schedule.
+
+  Parameters:
+    timetable (str|int): Timetable type, e.g. `'THREE_DAY'`, or its ID.
+    blocks (dict|list): Blocks of each day type of the timetable, keyed by
+      day type, or a list of blocks with their `dayType` as returned by
+      `Tado.get_schedule_blocks`. Each day must be covered from `00:00` to
+      `00:00` without gap.
+    zones (list): Zones the schedule is meant for. `Tado.sync_schedule`
+      uses them when no zones are passed to it.
+  """
+  def __init__(self, timetable, blocks, zones=None):
+    if isinstance(timetable, int):
+      timetable = {v: k for k, v in timetables.items()}.get(timetable, timetable)
+    if timetable not in timetables:
+      raise ValueError('Unknown timetable %r, use one of: %s' % (timetable, ', '.join(timetables)))
+    self.timetable = timetable
+    self.id = timetables[timetable]
+    self.zones = zones
+    if isinstance(blocks, list):
+      self.blocks = normalise_blocks(blocks)
+    else:
+      self.blocks = {day: tuple(sorted(Block.parse(block) for block in items)) for day, items in blocks.items()}
+    if set(self.blocks) != set(day_types[timetable]):
+      raise ValueError('A %s timetable needs blocks for %s' % (timetable, ', '.join(day_types[timetable])))
+    for day, items in self.blocks.items():
+      check_day(day, items)
+
+  def __eq__(self, other):
+    return isinstance(other, Schedule) and (self.id, self.blocks) == (other.id, other.blocks)
+
+  def __repr__(self):
+    return 'Schedule(%r)' % self.timetable
+
+  @classmethod
+  def from_dict(cls, data):
+    """
+    Parameters:
+      data (dict): The `timetable`, `blocks` and optional `zones` of the
+        schedule.
+
+    Returns:
+      (Schedule): The schedule.
+    """
+    return cls(data['timetable'], data['blocks'], data.get('zones'))
+
+  def diff(self, zone, current, blocks):
+    """
+    Parameters:
+      zone (int): The zone ID.
+      current (dict): The active timetable, as returned by
+        `Tado.get_schedule`.
+      blocks (list): The current blocks of the timetable of this schedule,
+        as returned by `Tado.get_schedule_blocks`.
+
+    Returns:
+      (list): The `Change` needed to apply this schedule to the zone, blocks
+        first.
+    """
+    existing = normalise_blocks(blocks)
+    changes = [Change(zone, self.id, day, existing.get(day, ()), wanted) for day, wanted in self.blocks.items() if existing.get(day, ()) != wanted]
+    if current.get('id') != self.id:
+      changes.append(Change(zone, self.id, None, current.get('type', current.get('id')), self.timetable))
+    return changes
+
+
+def check_day(day, blocks):
+  """Raise a `ValueError` unless `blocks` cover a whole day without gap."""
+  if not blocks or blocks[0].start != '00:00' or blocks[-1].end != '00:00':
+    raise ValueError('The blocks of %s must run from 00:00 to 00:00' % day)
+  for i in range(1, len(blocks)):
+    if blocks[i - 1].end != blocks[i].start:
+      raise ValueError('The blocks of %s leave a gap or overlap at %s' % (day, blocks[i - 1].end))
+
+
+def load_schedule(path):
+  """
+  Parameters:
+    path (str): A JSON schedule file.
+
+  Returns:
+    (Schedule): The schedule.
+  """
+  with open(path, encoding='utf-8') as f:
+    return Schedule.from_dict(json.load(f))
+
+
+class Change:
+  """
+  A write needed to apply a schedule.
+
+  Attributes:
+    zone (int): The zone ID.
+    timetable (int): The timetable ID.
+    day_type (str): The day type whose blocks change, `None` when the change
+      activates the timetable.
+    old: The current blocks, or the current timetable type.
+    new: The desired blocks, or the desired timetable type.
+    result: The response of the write, or the exception it raised, once
+      applied.
+  """
+  __slots__ = ('zone', 'timetable', 'day_type', 'old', 'new', 'result')
+
+  def __init__(self, zone, timetable, day_type, old, new):
+    self.zone = zone
+    self.timetable = timetable
+    self.day_type = day_type
+    self.old = old
+    self.new = new
+    self.result = None
+
+  @property
+  def failed(self):
+    return isinstance(self.result, Exception)
+
+  def __str__(self):
+    if self.day_type is None:
+      line = 'Zone %s: activate %s timetable (was %s)' % (self.zone, self.new, self.old)
+    else:
+      line = 'Zone %s: set %s blocks to %s' % (self.zone, self.day_type, ', '.join(str(b) for b in self.new))
+    if self.failed:
+      line += ': failed: %s' % self.result
+    return line
+
+  def __repr__(self):
+    return 'Change(%s)' % self
+
+
+class Plan:
+  """
+  The changes needed to apply a schedule to several zones.
+
+  Attributes:
+    changes (list): The `Change` of every zone, blocks before timetables.
+    errors (dict): The exception raised while reading the schedule of a
+      zone, keyed by zone ID. Nothing is written to these zones.
+    zones (list): The zones compared.
+    applied (bool): Whether the changes were written.
+  """
+  def __init__(self, zones, changes, errors, applied=False):
+    self.zones = zones
+    self.changes = changes
+    self.errors = errors
+    self.applied = applied
+
+  def __iter__(self):
+    return iter(self.changes)
+
+  def __len__(self):
+    return len(self.changes)
+
+  @property
+  def failed(self):
+    """Whether reading or writing the schedule of any zone failed."""
+    return bool(self.errors) or any(change.failed for change in self.changes)
+
+  def __str__(self):
+    lines = []
+    for zone in self.zones:
+      if zone in self.errors:
+        lines.append('Zone %s: failed: %s' % (zone, self.errors[zone]))
+        continue
+      changes = [str(change) for change in self.changes if change.zone == zone]
+      lines.extend(changes or ['Zone %s: up to date' % zone])
+    return '\n'.join(lines)
+
+
+class CompiledSchedule:
+  """
+  A zone schedule compiled for local evaluation.
+
+  The blocks are indexed by day type and start minute, so `at` finds the
+  setpoint of an instant with a binary search, and `evaluate` computes many
+  at once with numpy. A current overlay (manual control) overrides the
+  schedule from `since` until its projected expiry, or forever when it has
+  none.
+
+  Parameters:
+    schedule (Schedule): The active timetable and its blocks.
+    timezone (str|tzinfo): Time zone of the home, e.g. `'Europe/Paris'`.
+    overlay (dict): The `overlay` of `Tado.get_state`, `None` when there is
+      none.
+    since (datetime): When the overlay was read. Now when omitted.
+
+  Example:
+    ```python
+    >>> compiled = tado.compile_schedule(4)
+    >>> compiled.at(datetime.datetime(2024, 1, 9, 18, 30))
+    20.0
+    ```
+  """
+  def __init__(self, schedule, timezone='UTC', overlay=None, since=None):
+    if isinstance(timezone, str):
+      timezone = ZoneInfo(timezone)
+    self.schedule = schedule
+    self.timezone = timezone
+    self.days = {day: ([minutes(b.start) for b in blocks], blocks) for day, blocks in schedule.blocks.items()}
+    self.overlay = None
+    if overlay:
+      setting = overlay.get('setting') or {}
+      celsius = (setting.get('temperature') or {}).get('celsius') if setting.get('power') == 'ON' else None
+      expiry = (overlay.get('termination') or {}).get('projectedExpiry')
+      since = since or datetime.datetime.now(datetime.timezone.utc)
+      self.overlay = (celsius, since.timestamp(), parse_timestamp(expiry).timestamp() if expiry else None)
+    self._week = None
+
+  @classmethod
+  def from_api(cls, schedule, blocks, state=None, timezone='UTC', since=None):
+    """
+    Parameters:
+      schedule (dict): The active timetable, as returned by
+        `Tado.get_schedule`.
+      blocks (list): Its blocks, as returned by `Tado.get_schedule_blocks`.
+      state (dict): The zone state, as returned by `Tado.get_state`, for its
+        overlay.
+      timezone (str|tzinfo): Time zone of the home.
+      since (datetime): When the state was read. Now when omitted.
+
+    Returns:
+      (CompiledSchedule): The compiled schedule.
+    """
+    overlay = state.get('overlay') if state else None
+    return cls(Schedule(schedule['type'], blocks), timezone, overlay, since)
+
+  def _local(self, when):
+    if isinstance(when, (int, float)):
+      return datetime.datetime.fromtimestamp(when, self.timezone)
+    if when.tzinfo is None:
+      return when.replace(tzinfo=self.timezone)
+    return when.astimezone(self.timezone)
+
+  def block_at(self, when):
+    """
+    Parameters:
+      when (datetime|float): An instant: an aware datetime, a naive one in
+        the home time zone, or seconds since the epoch.
+
+    Returns:
+      (Block): The schedule block running at `when`, overlay ignored.
+    """
+    when = self._local(when)
+    starts, blocks = self.days[day_type(self.schedule.timetable, when.weekday())]
+    return blocks[bisect.bisect_right(starts, when.hour * 60 + when.minute) - 1]
+
+  def at(self, when):
+    """
+    Parameters:
+      when (datetime|float): An instant, see `block_at`.
+
+    Returns:
+      (float): The setpoint in celsius at `when`, `None` when the zone is
+        off.
+    """
+    when = self._local(when)
+    if self.overlay is not None:
+      celsius, since, until = self.overlay
+      timestamp = when.timestamp()
+      if since <= timestamp and (until is None or timestamp < until):
+        return celsius
+    return self.block_at(when).celsius
+
+  def _week_index(self):
+    """Block start minutes over a week and their setpoints, as arrays."""
+    if self._week is None:
+      starts, values = [], []
+      for weekday in range(7):
+        day_starts, blocks = self.days[day_type(self.schedule.timetable, weekday)]
+        starts.extend(weekday * 1440 + start for start in day_starts)
+        values.extend(np.nan if b.celsius is None else b.celsius for b in blocks)
+      self._week = (np.array(starts, dtype=np.int64), np.array(values, dtype=np.float64))
+    return self._week
+
+  def evaluate(self, timestamps):
+    """
+    Compute the setpoints of many instants at once. Requires numpy.
+
+    Parameters:
+      timestamps (array): Seconds since the epoch, or `datetime64` values
+        in UTC.
+
+    Returns:
+      (numpy.ndarray): The setpoints in celsius, `NaN` when the zone is off.
+    """
+    if np is None:
+      raise ImportError('CompiledSchedule.evaluate requires numpy: pip install libtado[numpy]')
+    timestamps = np.asarray(timestamps)
+    if timestamps.dtype.kind == 'M':
+      timestamps = timestamps.astype('datetime64[s]').astype(np.int64)
+    timestamps = timestamps.astype(np.int64)
+    # UTC offsets change on a quarter hour, even in half-hour zones: look
+    # them up once per 15 minutes.
+    quarters, inverse = np.unique(timestamps // 900, return_inverse=True)
+    offsets = np.array([datetime.datetime.fromtimestamp(int(q) * 900, self.timezone).utcoffset().total_seconds() for q in quarters], dtype=np.int64)
+    local = timestamps + offsets[inverse.reshape(timestamps.shape)]
+    # 1970-01-01 was a Thursday.
+    minute_of_week = ((local // 86400 + 3) % 7) * 1440 + (local // 60) % 1440
+    starts, values = self._week_index()
+    result = values[np.searchsorted(starts, minute_of_week, side='right') - 1]
+    if self.overlay is not None:
+      celsius, since, until = self.overlay
+      active = timestamps >= since
+      if until is not None:
+        active &= timestamps < until
+      result[active] = np.nan if celsius is None else celsius
+    return result
+
+  def curve(self, start, end, step=900):
+    """
+    Compute the setpoints over a time range. Requires numpy.
+
+    Parameters:
+      start (datetime|float): First instant, see `block_at`.
+      end (datetime|float): End of the range, excluded.
+      step (int): Seconds between two points.
+
+    Returns:
+      (tuple): The timestamps, as `int64` seconds since the epoch, and their
+        setpoints, see `evaluate`.
+    """
+    if np is None:
+      raise ImportError('CompiledSchedule.curve requires numpy: pip install libtado[numpy]')
+    timestamps = np.arange(int(self._local(start).timestamp()), int(self._local(end).timestamp()), step, dtype=np.int64)
+    return timestamps, self.evaluate(timestamps)
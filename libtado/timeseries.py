@@ -0,0 +1,298 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.timeseries
+
+This module turns the day reports returned by `libtado.api.Tado.get_report`
+into compact column arrays.
+
+Timestamps are stored as `int64` seconds since the epoch and values as
+`float32`, which is much lighter than the nested JSON dictionaries and lets
+charts and aggregations run vectorised. Interval data (settings, call for
+heat, weather, ...) can be expanded onto a fixed time grid, and the grid can
+be exported to pandas or Arrow when they are installed.
+
+It requires the optional `numpy` dependency (`pip install libtado[numpy]`).
+
+Example:
+  from libtado.api import Tado
+  from libtado.timeseries import DayReportSeries
+
+  t = Tado('Username', 'Password', 'ClientSecret')
+  reports = [r for _, _, r in t.get_reports([1], '2023-01-01', '2023-01-31')]
+  series = DayReportSeries.from_reports(reports)
+  series.inside_temperature.values.mean()
+  df = series.to_pandas(step=900)
+"""
+
+try:
+  import numpy as np
+except ImportError:
+  np = None
+
+
+CALL_FOR_HEAT_LEVELS = {'NONE': 0, 'LOW': 1, 'MEDIUM': 2, 'HIGH': 3}
+
+
+def _require_numpy():
+  if np is None:
+    raise ImportError('libtado.timeseries requires numpy: pip install libtado[numpy]')
+
+
+def parse_timestamps(values):
+  """
+  Parameters:
+    values (list): ISO8601 UTC timestamps, e.g. `'2023-01-01T23:45:00.000Z'`.
+
+  Returns:
+    (numpy.ndarray): `int64` seconds since the epoch.
+  """
+  _require_numpy()
+  if not values:
+    return np.empty(0, dtype=np.int64)
+  stripped = [v[:-1] if v.endswith('Z') else v for v in values]
+  return np.array(stripped, dtype='datetime64[s]').astype(np.int64)
+
+
+class Points:
+  """
+  Measurements at given instants.
+
+  Attributes:
+    timestamps (numpy.ndarray): `int64` seconds since the epoch, sorted.
+    values (numpy.ndarray): `float32` values.
+  """
+  __slots__ = ('timestamps', 'values')
+
+  def __init__(self, timestamps, values):
+    self.timestamps = timestamps
+    self.values = values
+
+  def __len__(self):
+    return len(self.timestamps)
+
+  def at(self, timestamps):
+    """
+    Sample the series on `timestamps`, carrying the last measurement forward.
+
+    Returns:
+      (numpy.ndarray): `float32` values, `NaN` before the first measurement.
+    """
+    index = np.searchsorted(self.timestamps, timestamps, side='right') - 1
+    out = np.full(len(timestamps), np.nan, dtype=np.float32)
+    valid = index >= 0
+    out[valid] = self.values[index[valid]]
+    return out
+
+  @classmethod
+  def concat(cls, series):
+    series = [s for s in series if len(s)]
+    if not series:
+      return cls(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32))
+    timestamps = np.concatenate([s.timestamps for s in series])
+    values = np.concatenate([s.values for s in series])
+    order = np.argsort(timestamps, kind='stable')
+    return cls(timestamps[order], values[order])
+
+
+class Intervals:
+  """
+  Values holding over time intervals.
+
+  Attributes:
+    starts (numpy.ndarray): `int64` start of each interval, sorted.
+    ends (numpy.ndarray): `int64` end of each interval, excluded.
+    values (numpy.ndarray): `float32` value of each interval.
+  """
+  __slots__ = ('starts', 'ends', 'values')
+
+  def __init__(self, starts, ends, values):
+    self.starts = starts
+    self.ends = ends
+    self.values = values
+
+  def __len__(self):
+    return len(self.starts)
+
+  def at(self, timestamps):
+    """
+    Expand the intervals onto `timestamps`.
+
+    Returns:
+      (numpy.ndarray): `float32` value of the interval holding each
+        timestamp, `NaN` where no interval does.
+    """
+    index = np.searchsorted(self.starts, timestamps, side='right') - 1
+    out = np.full(len(timestamps), np.nan, dtype=np.float32)
+    valid = index >= 0
+    valid[valid] = timestamps[valid] < self.ends[index[valid]]
+    out[valid] = self.values[index[valid]]
+    return out
+
+  @classmethod
+  def concat(cls, series):
+    series = [s for s in series if len(s)]
+    if not series:
+      empty = np.empty(0, dtype=np.int64)
+      return cls(empty, empty, np.empty(0, dtype=np.float32))
+    starts = np.concatenate([s.starts for s in series])
+    ends = np.concatenate([s.ends for s in series])
+    values = np.concatenate([s.values for s in series])
+    order = np.argsort(starts, kind='stable')
+    return cls(starts[order], ends[order], values[order])
+
+
+def _points(series, value):
+  points = (series or {}).get('dataPoints') or []
+  timestamps = parse_timestamps([p['timestamp'] for p in points])
+  values = np.array([value(p['value']) for p in points], dtype=np.float32)
+  return Points(timestamps, values)
+
+
+def _intervals(series, value):
+  intervals = (series or {}).get('dataIntervals') or []
+  starts = parse_timestamps([i['from'] for i in intervals])
+  ends = parse_timestamps([i['to'] for i in intervals])
+  values = np.array([value(i['value']) for i in intervals], dtype=np.float32)
+  return Intervals(starts, ends, values)
+
+
+def _celsius(value):
+  if not value:
+    return np.nan
+  temperature = value.get('temperature', value) if isinstance(value, dict) else None
+  if not temperature or temperature.get('celsius') is None:
+    return np.nan
+  return temperature['celsius']
+
+
+def _setting(value):
+  if not value or value.get('power') != 'ON':
+    return np.nan
+  return _celsius(value)
+
+
+class DayReportSeries:
+  """
+  Column arrays extracted from one or more day reports.
+
+  Attributes:
+    inside_temperature (Points): Measured temperature in Celsius.
+    humidity (Points): Measured relative humidity, as a fraction.
+    setting (Intervals): Target temperature in Celsius, `NaN` when off.
+    call_for_heat (Intervals): Heat demand, 0 (none) to 3 (high).
+    weather_temperature (Intervals): Outside temperature in Celsius.
+    sunny (Intervals): 1 when sunny, 0 otherwise.
+    device_connected (Intervals): 1 when the measuring device was
+      connected, 0 otherwise.
+  """
+  __slots__ = ('inside_temperature', 'humidity', 'setting', 'call_for_heat', 'weather_temperature', 'sunny', 'device_connected')
+  points = ('inside_temperature', 'humidity')
+  intervals = ('setting', 'call_for_heat', 'weather_temperature', 'sunny', 'device_connected')
+
+  def __init__(self, **columns):
+    for name in self.__slots__:
+      setattr(self, name, columns[name])
+
+  @classmethod
+  def from_report(cls, report):
+    """
+    Parameters:
+      report (dict): A day report as returned by `Tado.get_report`.
+
+    Returns:
+      (DayReportSeries): Its columns.
+    """
+    _require_numpy()
+    measured = report.get('measuredData') or {}
+    weather = report.get('weather') or {}
+    return cls(
+      inside_temperature=_points(measured.get('insideTemperature'), lambda v: v['celsius']),
+      humidity=_points(measured.get('humidity'), float),
+      setting=_intervals(report.get('settings'), _setting),
+      call_for_heat=_intervals(report.get('callForHeat'), lambda v: CALL_FOR_HEAT_LEVELS.get(v, np.nan)),
+      weather_temperature=_intervals(weather.get('condition'), _celsius),
+      sunny=_intervals(weather.get('sunny'), float),
+      device_connected=_intervals(measured.get('measuringDeviceConnected'), float),
+    )
+
+  @classmethod
+  def from_reports(cls, reports):
+    """
+    Parameters:
+      reports (iterable): Day reports, in any order.
+
+    Returns:
+      (DayReportSeries): Their columns concatenated and sorted by time.
+    """
+    series = [cls.from_report(r) for r in reports]
+    columns = {}
+    for name in cls.points:
+      columns[name] = Points.concat([getattr(s, name) for s in series])
+    for name in cls.intervals:
+      columns[name] = Intervals.concat([getattr(s, name) for s in series])
+    return cls(**columns)
+
+  def bounds(self):
+    """
+    Returns:
+      (tuple): First and last timestamp covered by any column, or `None`.
+    """
+    starts, ends = [], []
+    for name in self.points:
+      column = getattr(self, name)
+      if len(column):
+        starts.append(column.timestamps[0])
+        ends.append(column.timestamps[-1])
+    for name in self.intervals:
+      column = getattr(self, name)
+      if len(column):
+        starts.append(column.starts[0])
+        ends.append(column.ends.max())
+    if not starts:
+      return None
+    return int(min(starts)), int(max(ends))
+
+  def grid(self, step=900, start=None, end=None):
+    """
+    Sample every column on a fixed time grid.
+
+    Parameters:
+      step (int): Grid step in seconds.
+      start (int): First grid timestamp. Defaults to the start of the data,
+        rounded down to `step`.
+      end (int): Grid end, excluded. Defaults to the end of the data.
+
+    Returns:
+      (tuple): The `int64` grid timestamps and a dictionary of `float32`
+        arrays keyed by column name.
+    """
+    bounds = self.bounds()
+    if bounds is None:
+      return np.empty(0, dtype=np.int64), {name: np.empty(0, dtype=np.float32) for name in self.__slots__}
+    if start is None:
+      start = bounds[0] - bounds[0] % step
+    if end is None:
+      end = bounds[1]
+    timestamps = np.arange(start, end, step, dtype=np.int64)
+    return timestamps, {name: getattr(self, name).at(timestamps) for name in self.__slots__}
+
+  def to_pandas(self, step=900):
+    """
+    Returns:
+      (pandas.DataFrame): The grid, indexed by UTC time. Requires pandas.
+    """
+    import pandas as pd
+    timestamps, columns = self.grid(step)
+    index = pd.to_datetime(timestamps, unit='s', utc=True)
+    return pd.DataFrame(columns, index=index)
+
+  def to_arrow(self, step=900):
+    """
+    Returns:
+      (pyarrow.Table): The grid with a `timestamp` column. Requires pyarrow.
+    """
+    import pyarrow as pa
+    timestamps, columns = self.grid(step)
+    arrays = {'timestamp': pa.array(timestamps.astype('datetime64[s]'))}
+    arrays.update((name, pa.array(values)) for name, values in columns.items())
+    return pa.table(arrays)
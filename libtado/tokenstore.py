@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.tokenstore
+
+This module provides persistent storage for the OAuth tokens of
+`libtado.api.Tado`, so a new process can resume a session instead of doing a
+full password login followed by a home lookup.
+
+A stored entry holds the `access_token`, `refresh_token`, `token_expiry` and
+the resolved `home_id` of one account, keyed by username.
+
+Example:
+  from libtado.api import Tado
+  from libtado.tokenstore import FileTokenStore
+
+  store = FileTokenStore('~/.cache/libtado/tokens.json')
+  t = Tado('Username', 'Password', 'ClientSecret', token_store=store)
+"""
+
+import contextlib
+import json
+import os
+import tempfile
+import threading
+
+try:
+  import fcntl
+except ImportError:
+  fcntl = None
+  try:
+    import msvcrt
+  except ImportError:
+    msvcrt = None
+
+
+class TokenStore:
+  """
+  Base class of token stores. It stores nothing.
+
+  Subclasses implement `load` and `save`, and `lock` when several processes
+  may share the store.
+  """
+
+  def load(self, key):
+    """
+    Parameters:
+      key (str): Account key, the username.
+
+    Returns:
+      (dict): The stored token, or `None`.
+    """
+    return None
+
+  def save(self, key, token):
+    """
+    Parameters:
+      key (str): Account key, the username.
+      token (dict): Token to store.
+    """
+
+  @contextlib.contextmanager
+  def lock(self, key):
+    """Hold an exclusive lock on `key` while refreshing its token."""
+    yield
+
+
+class MemoryTokenStore(TokenStore):
+  """Token store living in memory, shared by instances of one process."""
+
+  def __init__(self):
+    self._tokens = {}
+    self._lock = threading.RLock()
+
+  def load(self, key):
+    token = self._tokens.get(key)
+    return dict(token) if token else None
+
+  def save(self, key, token):
+    self._tokens[key] = dict(token)
+
+  @contextlib.contextmanager
+  def lock(self, key):
+    with self._lock:
+      yield
+
+
+class FileTokenStore(TokenStore):
+  """
+  Token store backed by a JSON file.
+
+  Writes are atomic (temporary file then rename) and the file is only
+  readable by its owner. `lock` takes an exclusive advisory lock on a
+  sidecar `.lock` file, so parallel processes sharing the store refresh the
+  token one at a time.
+
+  Parameters:
+    path (str): Path of the JSON file. `~` is expanded and missing parent
+      directories are created.
+  """
+
+  def __init__(self, path):
+    self.path = os.path.abspath(os.path.expanduser(path))
+    self._thread_lock = threading.RLock()
+    # Nesting depth of _file_lock, per thread holding it.
+    self._held = threading.local()
+
+  def _read(self):
+    try:
+      with open(self.path) as f:
+        return json.load(f)
+    except (OSError, ValueError):
+      return {}
+
+  def load(self, key):
+    return self._read().get(key)
+
+  def save(self, key, token):
+    directory = os.path.dirname(self.path)
+    os.makedirs(directory, exist_ok=True)
+    with self._file_lock():
+      tokens = self._read()
+      tokens[key] = token
+      fd, tmp = tempfile.mkstemp(dir=directory, prefix='.tokens-')
+      try:
+        with os.fdopen(fd, 'w') as f:
+          json.dump(tokens, f)
+          f.flush()
+          os.fsync(f.fileno())
+        os.chmod(tmp, 0o600)
+        os.replace(tmp, self.path)
+      except BaseException:
+        os.unlink(tmp)
+        raise
+
+  @contextlib.contextmanager
+  def _file_lock(self):
+    with self._thread_lock:
+      # Re-entrant: save() is called while lock() is held.
+      depth = getattr(self._held, 'depth', 0)
+      if depth:
+        self._held.depth = depth + 1
+        try:
+          yield
+        finally:
+          self._held.depth -= 1
+        return
+      os.makedirs(os.path.dirname(self.path), exist_ok=True)
+      with open(self.path + '.lock', 'a+') as f:
+        if fcntl is not None:
+          fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+          f.seek(0)
+          msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        self._held.depth = 1
+        try:
+          yield
+        finally:
+          self._held.depth -= 1
+          if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+          elif msvcrt is not None:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+  def lock(self, key):
+    return self._file_lock()
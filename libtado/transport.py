@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.transport
+
+This module provides the HTTP transport used by `libtado.api.Tado` for every
+API family (my.tado.com, acme, minder, energy-insights, energy-bob and the
+auth server).
+
+The transport keeps a single `requests.Session` with one connection pool per
+host, so consecutive calls reuse their TCP connection and TLS session instead
+of doing a full handshake for every request.
+
+Example:
+  from libtado.api import Tado
+  from libtado.transport import Transport
+
+  transport = Transport(pool_size={'my.tado.com': 20}, keep_alive=True)
+  t = Tado('Username', 'Password', 'ClientSecret', transport=transport)
+"""
+
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class Transport:
+  """
+  Pooled keep-alive HTTP transport.
+
+  Parameters:
+    pool_size (int|dict): Maximum number of connections kept open per host.
+      Either a single number applied to every host, or a dictionary mapping
+      host names (e.g. `'my.tado.com'`) to their own pool size. Hosts missing
+      from the dictionary use `Transport.default_pool_size`.
+    keep_alive (bool): Whether connections are kept open between requests.
+      When `False` every request asks the server to close the connection.
+    hosts (list): Base URLs (or host names) to size pools for up front. Other
+      hosts get a pool lazily on first use.
+  """
+  default_pool_size = 10
+
+  def __init__(self, pool_size=None, keep_alive=True, hosts=None):
+    self.pool_size = pool_size
+    self.keep_alive = keep_alive
+    self.session = requests.Session()
+    if not keep_alive:
+      self.session.headers['Connection'] = 'close'
+    self._mounted = set()
+    self._lock = threading.Lock()
+    for host in hosts or []:
+      self.mount(host)
+
+  def _pool_size_for(self, host):
+    if isinstance(self.pool_size, dict):
+      return self.pool_size.get(host, self.default_pool_size)
+    if self.pool_size:
+      return self.pool_size
+    return self.default_pool_size
+
+  def mount(self, url):
+    """
+    Attach a dedicated connection pool for the host of `url`.
+
+    Parameters:
+      url (str): A base URL (`https://my.tado.com/api/v2`) or a bare host name.
+
+    Returns:
+      host (str): The host name the pool was created for.
+    """
+    parts = urlsplit(url if '://' in url else 'https://%s' % url)
+    host = parts.hostname
+    if host in self._mounted:
+      return host
+    with self._lock:
+      if host not in self._mounted:
+        size = self._pool_size_for(host)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=False)
+        self.session.mount('%s://%s/' % (parts.scheme, parts.netloc), adapter)
+        self._mounted.add(host)
+    return host
+
+  def request(self, method, url, **kwargs):
+    """
+    Send a request through the pooled session.
+
+    Parameters:
+      method (str): HTTP verb.
+      url (str): Absolute URL.
+      **kwargs: Passed to `requests.Session.request`.
+
+    Returns:
+      (requests.Response): The response. Status codes are not checked.
+    """
+    self.mount(url)
+    return self.session.request(method, url, **kwargs)
+
+  def get(self, url, **kwargs):
+    return self.request('GET', url, **kwargs)
+
+  def put(self, url, **kwargs):
+    return self.request('PUT', url, **kwargs)
+
+  def post(self, url, **kwargs):
+    return self.request('POST', url, **kwargs)
+
+  def delete(self, url, **kwargs):
+    return self.request('DELETE', url, **kwargs)
+
+  def close(self):
+    """Close every pooled connection."""
+    self.session.close()
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+"""libtado.writebehind
+
+This module provides the write-behind queue of `libtado.api.Tado`.
+
+With `write_behind` enabled, writes (`PUT` and `DELETE` calls such as
+`set_temperature`, `end_manual_control`, `set_early_start`,
+`set_open_window_detection` or `set_home_state`) return a
+`concurrent.futures.Future` at once and are sent by a background thread.
+Writes to the same resource that are still pending are coalesced: only the
+last one is sent, and the futures of all of them get its result. Other writes,
+such as the schedule writes of `sync_schedule` whose outcome decides the next
+step, are sent at once and return their result as usual.
+
+Example:
+  from libtado.api import Tado
+
+  t = Tado('Username', 'Password', 'ClientSecret', write_behind=True)
+  for temperature in (19, 20, 21):
+    future = t.set_temperature(1, temperature)
+  t.flush()
+  print(future.result())
+"""
+
+import re
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+
+from libtado.pipeline import Middleware
+
+
+class WriteBehind(Middleware):
+  """
+  Queue writes and send them from a background thread, last write wins.
+
+  Pending writes are sent `delay` seconds after the first of them was
+  queued, concurrently for different resources. A write queued while an
+  earlier one to the same resource is in flight is sent after it, so writes
+  to a resource are never reordered.
+
+  Parameters:
+    delay (float): Seconds to wait for more writes to coalesce before
+      sending.
+    methods (tuple): HTTP verbs queued. Other requests are sent at once.
+    max_workers (int): Maximum number of writes in flight.
+    paths (list): Regular expressions matched against the path of a write
+      (query string excluded). Only matching writes are queued. Defaults to
+      `WriteBehind.default_paths`, the setters whose last value is the only
+      one that matters.
+
+  Attributes:
+    sent (int): Number of writes sent.
+    coalesced (int): Number of writes replaced by a later one.
+  """
+  default_paths = (
+    r'homes/\d+/zones/\d+/overlay',
+    r'homes/\d+/zones/\d+/openWindowDetection',
+    r'homes/\d+/zones/\d+/earlyStart',
+    r'homes/\d+/presenceLock',
+  )
+
+  def __init__(self, delay=0.25, methods=('PUT', 'DELETE'), max_workers=8, paths=None):
+    self.delay = delay
+    self.methods = methods
+    self.max_workers = max_workers
+    self.paths = [re.compile(pattern + '$') for pattern in (self.default_paths if paths is None else paths)]
+    self.sent = 0
+    self.coalesced = 0
+    self._pending = {}
+    self._sending = []
+    self._due = None
+    self._closed = False
+    self._cond = threading.Condition()
+    self._thread = None
+    self._executor = None
+
+  def __len__(self):
+    """Number of resources with a pending write."""
+    with self._cond:
+      return len(self._pending)
+
+  def queued(self, request):
+    """Whether `request` is a write to queue."""
+    if request.method not in self.methods:
+      return False
+    path = request.cmd.split('?', 1)[0].strip('/')
+    return any(pattern.match(path) for pattern in self.paths)
+
+  def handle(self, request, call_next):
+    if not self.queued(request):
+      return call_next(request)
+    future = Future()
+    with self._cond:
+      if self._closed:
+        raise RuntimeError('Write-behind queue is closed')
+      entry = self._pending.get(request.url)
+      if entry is None:
+        self._pending[request.url] = [request, call_next, [future]]
+      else:
+        entry[0], entry[1] = request, call_next
+        entry[2].append(future)
+        self.coalesced += 1
+      if self._due is None:
+        self._due = time.monotonic() + self.delay
+      if self._thread is None:
+        self._thread = threading.Thread(target=self._run, name='libtado-write-behind', daemon=True)
+        self._thread.start()
+      self._cond.notify_all()
+    return future
+
+  def _run(self):
+    while True:
+      with self._cond:
+        while True:
+          if self._pending:
+            timeout = self._due - time.monotonic()
+            if timeout <= 0:
+              break
+          elif self._closed:
+            self._thread = None
+            return
+          else:
+            timeout = None
+          self._cond.wait(timeout)
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._due = None
+        self._sending = batch
+      if self._executor is None:
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='libtado-write')
+      wait([self._executor.submit(self._send, *entry) for entry in batch])
+      with self._cond:
+        self._sending = []
+        self._cond.notify_all()
+
+  def _send(self, request, call_next, futures):
+    try:
+      result = call_next(request)
+    except Exception as e:
+      for future in futures:
+        future.set_exception(e)
+    else:
+      for future in futures:
+        future.set_result(result)
+    with self._cond:
+      self.sent += 1
+
+  def flush(self, timeout=None):
+    """
+    Send the pending writes now and wait for them.
+
+    Parameters:
+      timeout (float): Maximum number of seconds to wait. No limit when
+        omitted.
+
+    Returns:
+      (bool): Whether every write queued before the call is done.
+    """
+    with self._cond:
+      futures = [f for entry in self._sending + list(self._pending.values()) for f in entry[2]]
+      if self._pending:
+        self._due = time.monotonic()
+        self._cond.notify_all()
+    _, not_done = wait(futures, timeout)
+    return not not_done
+
+  def close(self):
+    """Send the pending writes and stop the background thread."""
+    with self._cond:
+      self._closed = True
+      self._cond.notify_all()
+      thread = self._thread
+    self.flush()
+    if thread is not None:
+      thread.join()
+    if self._executor is not None:
+      self._executor.shutdown()
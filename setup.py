@@ -18,6 +18,12 @@ setup(
     'click',
     'requests'
   ],
+  extras_require={
+    'async': ['aiohttp'],
+    'numpy': ['numpy'],
+    'orjson': ['orjson'],
+    'opentelemetry': ['opentelemetry-api'],
+  },
   entry_points={
     'console_scripts': [
       'tado = libtado.__main__:main'
@@ -0,0 +1,162 @@
+import asyncio
+import inspect
+import time
+
+import aiohttp
+
+from libtado.aio import AsyncTado
+from libtado.api import Tado
+from libtado.metrics import MemorySink
+from libtado.tokenstore import FileTokenStore, MemoryTokenStore
+
+ZONES = "my.tado.com/api/v2/homes/1/zones"
+
+
+class TestAsyncTado:
+    def test_construction_does_no_io(self):
+        t = AsyncTado("username", "password", "secret")
+
+        assert t.token_expiry == 0
+        assert t.transport.session is None
+
+    def test_options_match_tado(self):
+        options = dict(cache=True, conditional=True, retry=True, codec="json", metrics=MemorySink(), home_id=3)
+        sync, t = Tado("username", "password", "secret", lazy=True, **options), AsyncTado("username", "password", "secret", **options)
+
+        for name in ("cache", "conditional", "codec", "metrics", "_id"):
+            assert type(getattr(t, name)) is type(getattr(sync, name)), name
+        assert [type(m) for m in t.pipeline.middlewares] == [type(m) for m in sync.pipeline.middlewares]
+        sync.close()
+
+    def test_overrides_are_async(self):
+        overrides = {name: func for name, func in vars(AsyncTado).items() if inspect.isfunction(func) and not name.startswith("__") and name != "_auth_lock"}
+
+        assert "get_reports" in overrides
+        for name, func in overrides.items():
+            func = getattr(func, "__wrapped__", func)
+            assert inspect.iscoroutinefunction(func) or inspect.isasyncgenfunction(func), name
+        assert inspect.iscoroutinefunction(AsyncTado.create.__func__)
+
+    def test_getters(self, server):
+        async def run():
+            async with server.client(AsyncTado) as t:
+                calls = (t.get_me(), t.get_home(), t.get_zones(), t.get_devices(), t.get_weather(), t.get_zone_states(),
+                         t.get_state(1), t.get_capabilities(2), t.get_early_start(1), t.get_incidents())
+                return await asyncio.gather(*calls)
+
+        me, home, zones, devices, weather, states, state, capabilities, early_start, incidents = asyncio.run(run())
+
+        assert me["homes"][0]["id"] == home["id"] == 1
+        assert [z["id"] for z in zones] == [1, 2]
+        assert {d["deviceType"] for d in devices} >= {"IB01", "RU01", "VA01"}
+        assert "outsideTemperature" in weather
+        assert set(states["zoneStates"]) == {"1", "2"}
+        assert state["setting"]["type"] == capabilities["type"] == "HEATING"
+        assert "enabled" in early_start
+        assert incidents == {"incidents": []}
+
+    def test_setters(self, server):
+        async def run():
+            async with server.client(AsyncTado) as t:
+                await t.set_temperature(1, 21.5)
+                await t.set_early_start(1, False)
+                await t.end_manual_control(2)
+
+        asyncio.run(run())
+
+        assert server.fixtures["GET %s/1/overlay" % ZONES]["setting"]["temperature"]["celsius"] == 21.5
+        assert server.fixtures["GET %s/1/earlyStart" % ZONES] == {"enabled": "false"}
+        assert "GET %s/2/overlay" % ZONES not in server.fixtures
+
+    def test_get_reports(self, server):
+        async def run():
+            async with server.client(AsyncTado) as t:
+                return [(zone, date) async for zone, date, _ in t.get_reports([1, 2], "2023-01-01", "2023-01-03", max_workers=1)]
+
+        reports = asyncio.run(run())
+
+        assert sorted(reports) == [(zone, "2023-01-0%i" % day) for zone in (1, 2) for day in (1, 2, 3)]
+
+
+class TestAsyncAuth:
+    def test_auto_refresh(self):
+        async def run():
+            t = AsyncTado("username", "password", "secret", home_id=1)
+            t._set_token("old", "refresh", time.time() + 61)
+
+            async def refresh():
+                t._set_token("new", "refresh", time.time() + 600)
+            t._refresh = refresh
+
+            await t.start_auto_refresh(margin=60)
+            deadline = time.time() + 5
+            while t.access_token == "old" and time.time() < deadline:
+                await asyncio.sleep(0.05)
+            await t.close()
+            return t
+
+        t = asyncio.run(run())
+
+        assert t.access_token == "new"
+        assert t._refresher is None
+
+    def test_refresh_reuses_stored_token(self):
+        store = MemoryTokenStore()
+        store.save("username", {"access_token": "stored", "refresh_token": "r", "token_expiry": time.time() + 600, "home_id": 1})
+        t = AsyncTado("username", "password", "secret", home_id=1, token_store=store)
+        t._set_token("old", "r", time.time() + t.refresh_margin - 1)
+
+        async def refresh():
+            raise AssertionError("refreshed")
+        t._refresh = refresh
+
+        asyncio.run(t.refresh_auth())
+
+        assert t.access_token == "stored"
+
+    def test_clients_sharing_a_store(self, tmp_path):
+        store = FileTokenStore(str(tmp_path / "tokens.json"))
+        holders, refreshes = [], []
+
+        async def run():
+            clients = [AsyncTado("username", "password", "secret", home_id=1, token_store=store) for _ in range(2)]
+            for t in clients:
+                t._set_token("old", "r", 0)
+
+                async def refresh(t=t):
+                    holders.append(t)
+                    refreshes.append(len(holders))
+                    await asyncio.sleep(0.05)
+                    t._set_token("new", "r", time.time() + 600)
+                    holders.remove(t)
+                t._refresh = refresh
+            await asyncio.gather(*[t.refresh_auth() for t in clients])
+            return clients
+
+        clients = asyncio.run(run())
+
+        assert refreshes == [1]
+        assert [t.access_token for t in clients] == ["new", "new"]
+        assert store.load("username")["access_token"] == "new"
+        with store.lock("username"):
+            assert store._held.depth == 1
+
+    def test_refresh_errors(self, server):
+        async def run(status):
+            async with server.client(AsyncTado) as t:
+                t.token_expiry = 0
+                server.fail("auth.tado.com/oauth/token", status=status)
+                logins = len(server.requests)
+                try:
+                    await t.refresh_auth()
+                except aiohttp.ClientError as e:
+                    return e, server.requests[logins:]
+                return None, server.requests[logins:]
+
+        error, sent = asyncio.run(run(None))
+        assert isinstance(error, aiohttp.ClientConnectionError)
+        assert sent == [("POST", "auth.tado.com/oauth/token")]
+
+        error, sent = asyncio.run(run(400))
+        assert error is None
+        assert sent == [("POST", "auth.tado.com/oauth/token")] * 2
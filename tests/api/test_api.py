@@ -1,6 +1,7 @@
 import os
 from datetime import date
 from dateutil.relativedelta import relativedelta
+import pytest
 from libtado.api import Tado
 
 TADO_USERNAME = os.getenv("TADO_USERNAME", None)
@@ -8,11 +9,23 @@ TADO_PASSWORD = os.getenv("TADO_PASSWORD", None)
 TADO_CLIENT_SECRET = os.getenv("TADO_CLIENT_SECRET", None)
 TADO_BRIDGE_AUTHKEY = os.getenv("TADO_BRIDGE_AUTHKEY", None)
 
-tado = Tado(TADO_USERNAME, TADO_PASSWORD, TADO_CLIENT_SECRET)
+if not TADO_USERNAME:
+    TADO_BRIDGE_AUTHKEY = TADO_BRIDGE_AUTHKEY or "authkey"
+
+
+@pytest.fixture
+def tado(request):
+    # Without credentials, run against the recorded fixtures instead of the live API.
+    if TADO_USERNAME:
+        client = Tado(TADO_USERNAME, TADO_PASSWORD, TADO_CLIENT_SECRET)
+    else:
+        client = request.getfixturevalue("server").client()
+    yield client
+    client.close()
 
 
 class TestApi:
-    def test_get_zones(self):
+    def test_get_zones(self, tado):
         response = tado.get_zones()
 
         assert isinstance(response, list)
@@ -25,7 +38,7 @@ class TestApi:
 
         assert response[0]["id"] == 1
 
-    def test_get_boiler_state(self):
+    def test_get_boiler_state(self, tado):
         response = tado.get_boiler_state(TADO_BRIDGE_AUTHKEY)
 
         assert isinstance(response, dict)
@@ -39,7 +52,7 @@ class TestApi:
         KEYS = ["celsius", "timestamp"]
         assert all(name in response["boiler"]["outputTemperature"] for name in KEYS)
 
-    def test_get_capabilities(self):
+    def test_get_capabilities(self, tado):
         ZONE_ID = tado.get_zones()[0]["id"]
         response = tado.get_capabilities(ZONE_ID)
 
@@ -53,7 +66,7 @@ class TestApi:
         assert all(name in response["temperatures"]["celsius"] for name in KEYS)
         assert all(name in response["temperatures"]["fahrenheit"] for name in KEYS)
 
-    def test_get_devices(self):
+    def test_get_devices(self, tado):
         response = tado.get_devices()
 
         assert isinstance(response, list)
@@ -97,7 +110,7 @@ class TestApi:
             KEYS = ["value", "timestamp"]
             assert all(name in DEVICES_VA[0]["mountingState"] for name in KEYS)
 
-    def test_get_early_start(self):
+    def test_get_early_start(self, tado):
         ZONE_ID = tado.get_zones()[0]["id"]
         response = tado.get_early_start(ZONE_ID)
 
@@ -105,7 +118,7 @@ class TestApi:
         KEYS = ["enabled"]
         assert all(name in response for name in KEYS)
 
-    def test_get_home(self):
+    def test_get_home(self, tado):
         response = tado.get_home()
 
         assert isinstance(response, dict)
@@ -139,7 +152,7 @@ class TestApi:
 
         assert isinstance(response, list)
 
-    def test_get_invitations(self):
+    def test_get_invitations(self, tado):
         response = tado.get_invitations()
 
         assert isinstance(response, list)
@@ -174,14 +187,14 @@ class TestApi:
         assert KEYS_DIFF_COUNT == 0, f"Too many keys in test: {', '.join(KEYS_DIFF)}"
 
 
-    def test_get_me(self):
+    def test_get_me(self, tado):
         response = tado.get_me()
 
         assert isinstance(response, dict)
         KEYS = ["name", "email", "username", "id", "homes", "locale", "mobileDevices"]
         assert all(name in response for name in KEYS)
 
-    def test_get_mobile_devices(self):
+    def test_get_mobile_devices(self, tado):
         response = tado.get_mobile_devices()
 
         assert isinstance(response, list)
@@ -194,7 +207,7 @@ class TestApi:
         KEYS = ["platform", "osVersion", "model", "locale"]
         assert all(name in response[0]["deviceMetadata"] for name in KEYS)
 
-    def test_get_schedule(self):
+    def test_get_schedule(self, tado):
         ZONE_ID = tado.get_zones()[0]["id"]
         response = tado.get_schedule(ZONE_ID)
 
@@ -202,7 +215,7 @@ class TestApi:
         KEYS = ["id", "type"]
         assert all(name in response for name in KEYS)
 
-    def test_get_state(self):
+    def test_get_state(self, tado):
         ZONE_ID = tado.get_zones()[0]["id"]
         response = tado.get_state(ZONE_ID)
 
@@ -220,14 +233,14 @@ class TestApi:
         KEYS = ["insideTemperature", "humidity"]
         assert all(name in response["sensorDataPoints"] for name in KEYS)
 
-    def test_get_users(self):
+    def test_get_users(self, tado):
         response = tado.get_users()
 
         assert isinstance(response, list)
         KEYS = ["name", "email", "username", "id", "homes", "locale", "mobileDevices"]
         assert all(name in response[0] for name in KEYS)
 
-    def test_get_weather(self):
+    def test_get_weather(self, tado):
         response = tado.get_weather()
 
         assert isinstance(response, dict)
@@ -240,28 +253,28 @@ class TestApi:
         KEYS = ["type", "value", "timestamp"]
         assert all(name in response["weatherState"] for name in KEYS)
 
-    # def test_set_early_start(self):
+    # def test_set_early_start(self, tado):
     #     response = tado.set_early_start()
 
     #     # assert isinstance(response, dict)
     #     # KEYS = ["name", "email", "username", "id", "homes", "locale", "mobileDevices"]
     #     # assert all(name in response for name in KEYS)
 
-    # def test_set_temperature(self):
+    # def test_set_temperature(self, tado):
     #     temp_current = tado.get_state(1)["setting"]["temperature"]["celsius"]
     #     tado.set_temperature(1, temp_current)
     #     temp_changed = tado.get_state(1)["setting"]["temperature"]["celsius"]
 
     #     assert temp_changed == temp_changed
 
-    # def test_end_manual_control(self):
+    # def test_end_manual_control(self, tado):
     #     response = tado.end_manual_control()
 
     #     # assert isinstance(response, dict)
     #     # KEYS = ["name", "email", "username", "id", "homes", "locale", "mobileDevices"]
     #     # assert all(name in response for name in KEYS)
 
-    def test_get_report(self):
+    def test_get_report(self, tado):
         ZONE_ID = tado.get_zones()[0]["id"]
         yesterday  = str(date.today() + relativedelta(days=-1))
         response = tado.get_report(ZONE_ID, yesterday)
@@ -318,7 +331,7 @@ class TestApi:
         KEYS = ["celsius", "fahrenheit"]
         assert all(name in response["weather"]["slots"]["slots"]["04:00"]["temperature"] for name in KEYS)
 
-    def test_get_air_comfort(self):
+    def test_get_air_comfort(self, tado):
         response = tado.get_air_comfort()
 
         assert isinstance(response, dict)
@@ -333,7 +346,7 @@ class TestApi:
         KEYS = ["radial", "angular"]
         assert all(name in response["comfort"][0]["coordinate"] for name in KEYS)
 
-    def test_get_air_comfort_geoloc(self):
+    def test_get_air_comfort_geoloc(self, tado):
         GEO_LATITUDE = 50.6312013
         GEO_LONGITUDE = 2.9070787
         response = tado.get_air_comfort_geoloc(GEO_LATITUDE, GEO_LONGITUDE)
@@ -394,7 +407,7 @@ class TestApi:
         # assert keys_diff_count == 0, f"Missing keys in test: {', '.join(keys_diff)}"
         # assert KEYS_DIFF_COUNT == 0, f"Too many keys in test: {', '.join(KEYS_DIFF)}"
 
-    def test_set_cost_simulation(self):
+    def test_set_cost_simulation(self, tado):
         country = "FRA"
         payload = {
             "temperatureDeltaPerZone": [
@@ -426,7 +439,7 @@ class TestApi:
             KEYS = ["zone", "consumption", "costInCents"]
             assert all(name in response["estimationPerZone"][0] for name in KEYS)
 
-    def test_get_consumption_overview(self):
+    def test_get_consumption_overview(self, tado):
         monthYear = "2023-09"
         country = "FRA"
         response = tado.get_consumption_overview(monthYear=monthYear, country=country)
@@ -451,14 +464,14 @@ class TestApi:
         KEYS = ["consumptionUnit", "currencySign", "customTariff", "tariffInCents"]
         assert all(name in response["tariffInfo"] for name in KEYS)
 
-    def test_get_enery_settings(self):
+    def test_get_enery_settings(self, tado):
         response = tado.get_enery_settings()
 
         assert isinstance(response, dict)
         KEYS = ["consumptionUnit", "dataSource", "homeId", "preferredEnergyUnit", "showReadingsBanner"]
         assert all(name in response for name in KEYS)
 
-    def test_get_energy_insights(self):
+    def test_get_energy_insights(self, tado):
         start_date = "2023-09-01"
         end_date = "2023-09-30"
         country = "FRA"
@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+import requests
+
+from libtado.aio import AsyncTado
+from libtado.models import Capabilities
+
+ZONES = "my.tado.com/api/v2/homes/1/zones"
+
+
+def calls(server, suffix):
+    return sorted(path for _, path in server.requests if path.endswith(suffix))
+
+
+class TestCheckTemperature:
+    def test_limits(self):
+        caps = Capabilities({"type": "HEATING", "temperatures": {"celsius": {"min": 5, "max": 25, "step": 0.5}}})
+
+        caps.check_temperature(5)
+        caps.check_temperature(21.5)
+        for value in (4.5, 25.5, 21.2):
+            with pytest.raises(ValueError):
+                caps.check_temperature(value)
+
+    def test_no_temperature(self):
+        with pytest.raises(ValueError):
+            Capabilities({"type": "HOT_WATER", "canSetTemperature": False}).check_temperature(50)
+
+
+class TestSetTemperatures:
+    def test_concurrent_overlays(self, server):
+        t = server.client()
+
+        results = t.set_temperatures({1: 21.5, 2: None}, termination="AUTO")
+
+        assert results[1]["setting"]["temperature"]["celsius"] == 21.5
+        assert results[1]["termination"] == {"type": "TADO_MODE"}
+        assert results[2]["setting"] == {"type": "HEATING", "power": "OFF"}
+        assert calls(server, "/overlay") == [ZONES + "/1/overlay", ZONES + "/2/overlay"]
+        assert calls(server, "/capabilities") == [ZONES + "/1/capabilities"]
+
+    def test_below_minimum_turns_off(self, server):
+        t = server.client()
+
+        results = t.set_temperatures({1: 0, 2: 4.5})
+
+        assert results[1]["setting"] == results[2]["setting"] == t.set_temperature(1, 0)["setting"] == {"type": "HEATING", "power": "OFF"}
+        assert calls(server, "/capabilities") == []
+
+    def test_validation_before_sending(self, server):
+        t = server.client()
+
+        results = t.set_temperatures({1: 40, 2: 20})
+
+        assert isinstance(results[1], ValueError)
+        assert results[2]["setting"]["temperature"]["celsius"] == 20
+        assert calls(server, "/overlay") == [ZONES + "/2/overlay"]
+
+    def test_capabilities_are_memoised(self, server):
+        t = server.client()
+
+        t.set_temperatures({1: 20, 2: 20})
+        t.set_temperatures({1: 21, 2: 21})
+
+        assert calls(server, "/capabilities") == [ZONES + "/1/capabilities", ZONES + "/2/capabilities"]
+
+    def test_server_errors_per_zone(self, server):
+        t = server.client()
+        server.fail(ZONES + "/2/overlay", status=422, method="PUT")
+
+        results = t.set_temperatures({1: 20, 2: 20})
+
+        assert isinstance(results[2], requests.HTTPError)
+        assert not isinstance(results[1], Exception)
+
+    def test_end_manual_control_all(self, server):
+        t = server.client()
+
+        assert t.end_manual_control_all() == {1: None, 2: None}
+        assert [m for m, p in server.requests if p.endswith("/overlay")] == ["DELETE", "DELETE"]
+
+    def test_async(self, server):
+        async def run():
+            async with server.client(AsyncTado) as t:
+                return await t.set_temperatures({1: 19, 2: 99}), await t.end_manual_control_all([1])
+
+        results, ended = asyncio.run(run())
+
+        assert results[1]["setting"]["temperature"]["celsius"] == 19
+        assert isinstance(results[2], ValueError)
+        assert ended == {1: None}
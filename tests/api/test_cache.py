@@ -0,0 +1,105 @@
+import time
+
+from libtado.cache import ResponseCache, ValidatorCache
+
+API = "https://my.tado.com/api/v2"
+
+
+class TestResponseCache:
+    def test_policies(self):
+        cache = ResponseCache(ttl={r"homes/\d+/zones/\d+/earlyStart": 60})
+
+        assert cache.ttl_for("homes/1/zones") == 300
+        assert cache.ttl_for("homes/1/zones/2/capabilities") == 3600
+        assert cache.ttl_for("homes/1/zones/2/earlyStart") == 60
+        assert cache.ttl_for("homes/1/settings?ngsw-bypass=True") == 3600
+        assert cache.ttl_for("homes/1/zones/2/state") == 0
+
+    def test_lookup_store(self):
+        cache = ResponseCache()
+
+        assert cache.lookup(API, "homes/1/zones") == (False, None)
+        cache.store(API, "homes/1/zones", [1])
+        cache.store(API, "homes/1/zones/1/state", {})
+        assert cache.lookup(API, "homes/1/zones") == (True, [1])
+        assert cache.lookup(API, "homes/1/zones/1/state") == (False, None)
+        assert (cache.hits, cache.misses) == (1, 2)
+
+    def test_expiry(self):
+        cache = ResponseCache(ttl={"me": 0.01})
+
+        cache.store(API, "me", {})
+        time.sleep(0.02)
+        assert cache.lookup(API, "me") == (False, None)
+        assert len(cache) == 0
+
+    def test_lru_eviction(self):
+        cache = ResponseCache(maxsize=2)
+
+        cache.store(API, "homes/1/zones/1/capabilities", 1)
+        cache.store(API, "homes/1/zones/2/capabilities", 2)
+        cache.lookup(API, "homes/1/zones/1/capabilities")
+        cache.store(API, "homes/1/zones/3/capabilities", 3)
+        assert cache.lookup(API, "homes/1/zones/2/capabilities") == (False, None)
+        assert cache.lookup(API, "homes/1/zones/1/capabilities") == (True, 1)
+
+    def test_invalidate_related(self):
+        cache = ResponseCache(ttl={".*": 60})
+        cached = ("me", "homes/1", "homes/1/zones", "homes/1/zoneStates", "homes/1/zones/3/state", "homes/1/zones/4/state",
+                  "homes/1/zones/3/capabilities", "homes/1/zones/3/overlay", "homes/1/zones/3/schedule/timetables/1/blocks")
+        for cmd in cached:
+            cache.store(API, cmd, cmd)
+
+        cache.invalidate_related(API, "homes/1/zones/3/overlay")
+
+        dropped = {cmd for cmd in cached if not cache.lookup(API, cmd)[0]}
+        assert dropped == {"homes/1/zoneStates", "homes/1/zones/3/state", "homes/1/zones/3/overlay"}
+
+    def test_invalidate_related_collections(self):
+        cache = ResponseCache(ttl={".*": 60})
+        for cmd in ("homes/1", "homes/1/zones", "homes/1/zones/3/capabilities", "homes/1/zones/3/schedule/timetables/1/blocks"):
+            cache.store(API, cmd, cmd)
+
+        cache.invalidate_related(API, "homes/1/zones/3/details")
+        cache.invalidate_related(API, "homes/1/zones/3/schedule/timetables/1/blocks/SATURDAY")
+        cache.invalidate_related(API, "homes/1/presenceLock")
+
+        assert cache.lookup(API, "homes/1/zones")[0] is False
+        assert cache.lookup(API, "homes/1/zones/3/schedule/timetables/1/blocks")[0] is False
+        assert cache.lookup(API, "homes/1")[0] is True
+        assert cache.lookup(API, "homes/1/zones/3/capabilities")[0] is True
+
+    def test_empty_cache_is_enabled(self):
+        from libtado.aio import AsyncTado
+
+        cache = ResponseCache()
+        assert AsyncTado("username", "password", "secret", cache=cache).cache is cache
+
+
+class TestValidatorCache:
+    def test_conditional_headers(self):
+        cache = ValidatorCache()
+        url = API + "/homes/1/zoneStates"
+
+        assert cache.headers(url) == {}
+        cache.store(url, {"ETag": '"v1"', "Last-Modified": "Sun, 01 Jan 2023 00:00:00 GMT"}, {"a": 1})
+        assert cache.headers(url) == {"If-None-Match": '"v1"', "If-Modified-Since": "Sun, 01 Jan 2023 00:00:00 GMT"}
+        assert cache.not_modified(url) == (True, {"a": 1})
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_without_validator(self):
+        cache = ValidatorCache()
+
+        cache.store(API + "/me", {}, {"a": 1})
+
+        assert len(cache) == 0
+        assert cache.not_modified(API + "/me") == (False, None)
+
+    def test_eviction(self):
+        cache = ValidatorCache(maxsize=1)
+
+        cache.store("a", {"ETag": "1"}, 1)
+        cache.store("b", {"ETag": "2"}, 2)
+
+        assert cache.headers("a") == {}
+        assert cache.headers("b") == {"If-None-Match": "2"}
@@ -0,0 +1,36 @@
+import pytest
+
+from libtado.api import Tado
+from libtado.codec import Codec, codecs, get_codec, preference
+
+
+class TestCodec:
+    @pytest.mark.parametrize("name", sorted(codecs))
+    def test_round_trip(self, name):
+        codec = get_codec(name)
+        document = {"zoneStates": {"1": {"setting": {"temperature": {"celsius": 20.5}}, "overlay": None}}}
+
+        encoded = codec.dumps(document)
+
+        assert isinstance(encoded, bytes)
+        assert codec.loads(encoded) == document
+
+    @pytest.mark.parametrize("name", sorted(codecs))
+    def test_invalid_input(self, name):
+        with pytest.raises(ValueError):
+            get_codec(name).loads(b"{not json")
+
+    def test_default_is_fastest_installed(self):
+        assert get_codec().name == next(name for name in preference if name in codecs)
+
+    def test_unavailable(self):
+        with pytest.raises(ValueError):
+            get_codec("simdjson")
+
+    def test_custom_codec(self):
+        codec = Codec("custom", lambda data: "decoded", lambda obj: b"encoded")
+
+        tado = Tado("username", "password", "secret", lazy=True, home_id=1, codec=codec)
+
+        assert tado.codec is codec
+        assert Tado("username", "password", "secret", lazy=True, codec="json").codec.name == "json"
@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+
+import numpy as np
+
+from libtado.aio import AsyncTado
+from libtado.energy import merge_consumption, month_ranges
+
+CONSUMPTION = "energy-insights.tado.com/api/homes/1/consumption"
+
+
+def consumption(first, last, tariff="0.17 €/kWh"):
+    days = [first + datetime.timedelta(days=i) for i in range((last - first).days + 1)]
+    per_day = [{"date": d.isoformat(), "consumption": 1.5, "costInCents": 25.0} for d in days]
+    return {
+        "tariff": tariff,
+        "unit": "kWh",
+        "details": {"totalConsumption": 1.5 * len(days), "totalCostInCents": 25.0 * len(days), "perDay": per_day},
+    }
+
+
+def route(server, first, last, ngsw_bypass=True, **kwargs):
+    query = "startDate=%s&endDate=%s&country=FRA&ngsw-bypass=%s" % (first, last, ngsw_bypass)
+    server.route("GET", "%s?%s" % (CONSUMPTION, query), consumption(first, last, **kwargs))
+
+
+def fetched(server):
+    return sorted(path.split("?")[1].split("&country")[0] for _, path in server.requests if path.startswith(CONSUMPTION))
+
+
+class TestEnergy:
+    def test_month_ranges(self):
+        assert month_ranges("2024-01-31", "2024-03-01") == [
+            (datetime.date(2024, 1, 1), datetime.date(2024, 1, 31)),
+            (datetime.date(2024, 2, 1), datetime.date(2024, 2, 29)),
+            (datetime.date(2024, 3, 1), datetime.date(2024, 3, 31)),
+        ]
+
+    def test_merge(self):
+        chunks = [consumption(datetime.date(2023, 1, 1), datetime.date(2023, 1, 31)), consumption(datetime.date(2023, 2, 1), datetime.date(2023, 2, 28), tariff="new")]
+
+        merged = merge_consumption(chunks, "2023-01-30", "2023-02-02", columnar=True)
+
+        assert merged["tariff"] == "new"
+        assert merged["details"]["totalConsumption"] == 6.0
+        assert merged["details"]["totalCostInCents"] == 100.0
+        assert merged["details"]["perDay"]["date"].tolist() == [datetime.date(2023, 1, 30), datetime.date(2023, 1, 31), datetime.date(2023, 2, 1), datetime.date(2023, 2, 2)]
+        assert isinstance(merged["details"]["perDay"]["consumption"], np.ndarray)
+
+
+class TestEnergyConsumptionRange:
+    def test_split_without_cache(self, server):
+        t = server.client()
+        for first, last in (("2023-01-15", "2023-01-31"), ("2023-02-01", "2023-02-28"), ("2023-03-01", "2023-03-10")):
+            route(server, datetime.date.fromisoformat(first), datetime.date.fromisoformat(last))
+
+        result = t.get_energy_consumption_range("2023-01-15", "2023-03-10", "FRA")
+
+        assert len(fetched(server)) == 3
+        assert len(result["details"]["perDay"]) == 17 + 28 + 10
+        assert result["details"]["totalConsumption"] == 1.5 * 55
+        assert result["details"]["perDay"][0]["date"] == "2023-01-15"
+
+    def test_closed_months_are_cached(self, server, tmp_path):
+        t = server.client()
+        route(server, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31))
+        route(server, datetime.date(2023, 2, 1), datetime.date(2023, 2, 28))
+
+        first = t.get_energy_consumption_range("2023-01-15", "2023-02-10", "FRA", cache=str(tmp_path))
+        second = t.get_energy_consumption_range("2023-01-01", "2023-02-28", "FRA", cache=str(tmp_path))
+
+        assert fetched(server) == ["startDate=2023-01-01&endDate=2023-01-31", "startDate=2023-02-01&endDate=2023-02-28"]
+        assert len(first["details"]["perDay"]) == 17 + 10
+        assert len(second["details"]["perDay"]) == 31 + 28
+
+    def test_cache_is_keyed_by_ngsw_bypass(self, server, tmp_path):
+        t = server.client()
+        route(server, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31))
+        route(server, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31), ngsw_bypass=False, tariff="ngsw")
+
+        for ngsw_bypass in (True, False, True, False):
+            result = t.get_energy_consumption_range("2023-01-01", "2023-01-31", "FRA", cache=str(tmp_path), ngsw_bypass=ngsw_bypass)
+
+        assert len(fetched(server)) == 2
+        assert result["tariff"] == "ngsw"
+
+    def test_current_month_is_fetched_again(self, server, tmp_path):
+        t = server.client()
+        today = datetime.date.today()
+        current = today.replace(day=1)
+        previous = (current - datetime.timedelta(days=1)).replace(day=1)
+        route(server, previous, current - datetime.timedelta(days=1))
+        route(server, current, today)
+
+        for _ in range(2):
+            result = t.get_energy_consumption_range(previous, today, "FRA", cache=str(tmp_path))
+
+        assert fetched(server).count("startDate=%s&endDate=%s" % (current, today)) == 2
+        assert fetched(server).count("startDate=%s&endDate=%s" % (previous, current - datetime.timedelta(days=1))) == 1
+        assert result["details"]["perDay"][-1]["date"] == today.isoformat()
+
+    def test_async(self, server, tmp_path):
+        route(server, datetime.date(2023, 1, 1), datetime.date(2023, 1, 31))
+        route(server, datetime.date(2023, 2, 1), datetime.date(2023, 2, 28))
+
+        async def run():
+            async with server.client(AsyncTado) as t:
+                return await t.get_energy_consumption_range("2023-01-01", "2023-02-28", "FRA", cache=str(tmp_path), columnar=True)
+
+        result = asyncio.run(run())
+
+        assert len(result["details"]["perDay"]["date"]) == 59
+        assert len(fetched(server)) == 2
@@ -0,0 +1,75 @@
+import pytest
+import requests
+
+from libtado.metrics import MemorySink, MetricsMiddleware, PrometheusExporter, endpoint
+from libtado.retry import RetryPolicy
+from tests.conftest import Response, Transport, make_tado
+
+
+class TestMetrics:
+    def test_endpoint(self):
+        assert endpoint("homes/123/zones/4/dayReport?date=2023-01-01") == "homes/{id}/zones/{id}/dayReport"
+        assert endpoint("me") == "me"
+
+    def test_disabled(self):
+        tado = make_tado(Transport())
+
+        assert tado.metrics is None
+        assert not any(isinstance(m, MetricsMiddleware) for m in tado.pipeline.middlewares)
+
+    def test_requests(self):
+        sink = MemorySink()
+        tado = make_tado(Transport([Response(503), Response(body={"ok": True}), Response(404)]), metrics=sink, cache=True, retry=RetryPolicy(backoff_factor=0))
+
+        tado.get_zones()
+        tado.get_zones()
+        with pytest.raises(requests.HTTPError):
+            tado.get_state(1)
+
+        zones = sink.stats[("request", "GET", "homes/{id}/zones")]
+        assert (zones.count, zones.cache_hits, zones.retries, zones.errors) == (1, 1, 1, 0)
+        assert zones.statuses == {200: 1}
+        assert zones.bytes_received == len(b'{"ok": true}')
+        state = sink.stats[("request", "GET", "homes/{id}/zones/{id}/state")]
+        assert (state.count, state.errors, state.statuses) == (1, 1, {404: 1})
+        assert sum(zones.buckets) >= 1
+
+    def test_auth(self):
+        sink = MemorySink()
+        tado = make_tado(Transport(), metrics=sink)
+
+        tado._login()
+
+        login = sink.stats[("login", "POST", "oauth/token")]
+        assert (login.count, login.errors) == (1, 0)
+
+    def test_prometheus(self):
+        exporter = PrometheusExporter()
+        tado = make_tado(Transport(), metrics=[exporter])
+
+        tado.get_zone_states()
+        text = exporter.render()
+
+        labels = 'kind="request",method="GET",endpoint="homes/{id}/zoneStates"'
+        assert "# TYPE libtado_request_duration_seconds histogram" in text
+        assert 'libtado_request_duration_seconds_bucket{le="+Inf",%s} 1' % labels in text
+        assert 'libtado_responses_total{%s,status="200"} 1' % labels in text
+        assert "libtado_cache_hits_total{%s} 0" % labels in text
+
+    def test_opentelemetry(self):
+        sdk = pytest.importorskip("opentelemetry.sdk.trace")
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+
+        from libtado.metrics import OpenTelemetrySink
+
+        exporter = InMemorySpanExporter()
+        provider = sdk.TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(exporter))
+        tado = make_tado(Transport(), metrics=OpenTelemetrySink(provider.get_tracer("test")))
+
+        tado.get_zone_states()
+
+        span = exporter.get_finished_spans()[0]
+        assert span.name == "tado GET homes/{id}/zoneStates"
+        assert span.attributes["http.response.status_code"] == 200
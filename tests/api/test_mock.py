@@ -0,0 +1,111 @@
+import asyncio
+import time
+
+import pytest
+import requests
+
+from libtado.aio import AsyncTado
+from libtado.mock import MockTadoServer, Recorder
+from libtado.retry import RetryPolicy
+from tests.conftest import FIXTURES
+
+
+class TestMockTadoServer:
+    def test_serves_every_host(self, server):
+        t = server.client()
+
+        assert t.id == 1
+        assert t.get_zones()[0]["id"] == 1
+        assert "roomMessages" in t.get_air_comfort_geoloc(50.63, 2.90)
+        assert t.get_enery_settings()["homeId"] == 1
+        assert t.get_incidents() == {"incidents": []}
+        assert t.get_running_times("2023-09-18")["summary"]["totalRunningTimeInSeconds"] == 5400
+        assert t.get_energy_savings("2023-09", "FRA")["yearMonth"] == "2023-09"
+        hosts = {path.split("/")[0] for _, path in server.requests}
+        assert hosts == {"auth.tado.com", "my.tado.com", "acme.tado.com", "minder.tado.com", "energy-insights.tado.com", "energy-bob.tado.com"}
+
+    def test_writes_update_fixtures(self, server):
+        t = server.client()
+
+        t.set_temperature(1, 22)
+        assert server.fixtures["GET my.tado.com/api/v2/homes/1/zones/1/overlay"]["setting"]["temperature"]["celsius"] == 22
+        t.end_manual_control(1)
+        assert "GET my.tado.com/api/v2/homes/1/zones/1/overlay" not in server.fixtures
+
+    def test_injected_errors(self, server):
+        t = server.client()
+        server.fail("my.tado.com/api/v2/homes/*/zones", status=503, times=2)
+
+        with pytest.raises(requests.HTTPError) as e:
+            t.get_zones()
+        assert e.value.response.status_code == 503
+
+        retrying = server.client(retry=RetryPolicy(backoff_factor=0))
+        assert retrying.get_zones()[0]["id"] == 1
+
+    def test_dropped_connection(self, server):
+        t = server.client()
+        server.fail("my.tado.com/api/v2/homes/1/weather", status=None)
+
+        with pytest.raises(requests.ConnectionError):
+            t.get_weather()
+        assert "outsideTemperature" in t.get_weather()
+
+    def test_token_expiry(self, server):
+        server.expires_in = 1
+        t = server.client()
+        logins = len(server.requests)
+
+        time.sleep(1.1)
+        t.get_me()
+        assert server.requests[logins][1] == "auth.tado.com/oauth/token"
+
+    def test_expired_tokens(self, server):
+        t = server.client()
+
+        server.expire_tokens()
+        with pytest.raises(requests.HTTPError) as e:
+            t.get_me()
+        assert e.value.response.status_code == 401
+
+    def test_latency(self):
+        with MockTadoServer(FIXTURES, latency=0.05) as server:
+            t = server.client()
+            started = time.monotonic()
+            t.get_me()
+            assert time.monotonic() - started >= 0.05
+
+    def test_etags(self, server):
+        t = server.client(conditional=True)
+
+        first = t.get_zone_states()
+        assert t.get_zone_states() is first
+        assert t.conditional.hits == 1
+
+    def test_async_client(self, server):
+        async def run():
+            async with server.client(AsyncTado) as t:
+                return await asyncio.gather(t.get_zones(), t.get_weather())
+
+        zones, weather = asyncio.run(run())
+
+        assert zones[0]["id"] == 1
+        assert "solarIntensity" in weather
+
+
+class TestRecorder:
+    def test_replay(self, server, tmp_path):
+        recorder = Recorder()
+        t = server.client(middleware=[recorder])
+        zones = t.get_zones()
+        t.get_air_comfort_geoloc(50.63, 2.90)
+        path = str(tmp_path / "fixtures.json")
+        recorder.save(path)
+
+        assert sorted(recorder.fixtures) == [
+            "GET acme.tado.com/v1/homes/1/airComfort?latitude=50.630000&longitude=2.900000",
+            "GET my.tado.com/api/v2/homes/1/zones",
+            "GET my.tado.com/api/v2/me",
+        ]
+        with MockTadoServer(path) as replay:
+            assert replay.client().get_zones() == zones
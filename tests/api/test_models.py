@@ -0,0 +1,69 @@
+import datetime
+
+from libtado.models import Device, Zone, ZoneState, list_of, parse_timestamp, zone_states
+
+
+def state():
+    return {
+        "tadoMode": "HOME",
+        "setting": {"type": "HEATING", "power": "ON", "temperature": {"celsius": 21.0, "fahrenheit": 69.8}},
+        "overlayType": "MANUAL",
+        "overlay": {
+            "type": "MANUAL",
+            "setting": {"type": "HEATING", "power": "ON", "temperature": {"celsius": 22.0, "fahrenheit": 71.6}},
+            "termination": {"type": "TIMER", "durationInSeconds": 900, "projectedExpiry": "2023-01-01T10:15:00Z"},
+        },
+        "openWindow": None,
+        "link": {"state": "ONLINE"},
+        "sensorDataPoints": {
+            "insideTemperature": {"celsius": 20.5, "fahrenheit": 68.9, "timestamp": "2023-01-01T10:00:00.123Z", "type": "TEMPERATURE"},
+            "humidity": {"type": "PERCENTAGE", "percentage": 45.2, "timestamp": "2023-01-01T10:00:00.123Z"},
+        },
+        "newField": [1, 2],
+    }
+
+
+class TestModels:
+    def test_fields(self):
+        s = ZoneState(state())
+
+        assert s.tado_mode == "HOME"
+        assert s.setting.temperature.celsius == 21.0
+        assert s.overlay.termination.duration_in_seconds == 900
+        assert s.open_window is None
+        assert s.next_time_block is None
+        assert s.link.state == "ONLINE"
+        assert s.sensor_data_points.humidity.percentage == 45.2
+        assert s.extra == {"newField": [1, 2]}
+
+    def test_lazy_decoding(self):
+        raw = state()
+        s = ZoneState(raw)
+
+        assert isinstance(s._overlay, dict)
+        termination = s.overlay.termination
+        assert s.overlay.termination is termination
+        assert termination._projected_expiry == "2023-01-01T10:15:00Z"
+        assert termination.projected_expiry == datetime.datetime(2023, 1, 1, 10, 15, tzinfo=datetime.timezone.utc)
+        assert raw == state()
+
+    def test_timestamps(self):
+        value = parse_timestamp("2023-01-01T10:00:00.123Z")
+
+        assert value == datetime.datetime(2023, 1, 1, 10, 0, 0, 123000, tzinfo=datetime.timezone.utc)
+
+    def test_to_dict(self):
+        s = ZoneState(state())
+        assert isinstance(s.sensor_data_points.inside_temperature.timestamp, datetime.datetime)
+
+        assert s.to_dict() == state()
+        assert s == ZoneState(state())
+
+    def test_collections(self):
+        zones = list_of(Zone)([{"id": 1, "name": "Living", "devices": [{"serialNo": "VA1", "connectionState": {"value": True}}]}])
+        states = zone_states({"zoneStates": {"1": state(), "2": state()}})
+
+        assert zones[0].devices[0] == Device({"serialNo": "VA1", "connectionState": {"value": True}})
+        assert zones[0].devices[0].connection_state.value is True
+        assert sorted(states) == [1, 2]
+        assert isinstance(states[2], ZoneState)
@@ -0,0 +1,93 @@
+import asyncio
+
+import pytest
+
+from libtado.aio import AsyncTado
+from libtado.pipeline import Middleware
+from libtado.retry import RetryPolicy
+from tests.conftest import Response, Transport, make_tado
+
+
+class Recorder(Middleware):
+    def __init__(self):
+        self.seen = []
+
+    def handle(self, request, call_next):
+        result = call_next(request)
+        self.seen.append((request.method, request.cmd, result))
+        return result
+
+    async def handle_async(self, request, call_next):
+        result = await call_next(request)
+        self.seen.append((request.method, request.cmd, result))
+        return result
+
+
+class TestPipeline:
+    @pytest.mark.parametrize("call", ["_api_call", "_api_acme_call", "_api_minder_call", "_api_energy_insights_call", "_api_energy_bob_call"])
+    @pytest.mark.parametrize("method", ["GET", "PUT", "POST", "DELETE"])
+    def test_every_verb_on_every_host(self, call, method):
+        transport = Transport()
+        tado = make_tado(transport)
+
+        result = getattr(tado, call)("x", {"a": 1} if method in ("PUT", "POST") else False, method=method)
+
+        assert result == {"method": method}
+        assert transport.sent[0][0] == method
+        assert transport.sent[0][2] == (tado.codec.dumps({"a": 1}) if method in ("PUT", "POST") else None)
+
+    def test_empty_payload_and_body(self):
+        transport = Transport([Response(204), Response(204)])
+        tado = make_tado(transport, codec="json")
+
+        assert tado._api_call("homes/1/zones/1/schedule/timetables/0/blocks/MON_SUN", [], method="PUT") is None
+        assert tado.end_manual_control(1) is None
+        assert transport.sent[0] == ("PUT", tado.api + "/homes/1/zones/1/schedule/timetables/0/blocks/MON_SUN", b"[]")
+        assert transport.sent[1] == ("DELETE", tado.api + "/homes/1/zones/1/overlay", None)
+
+    def test_retry_goes_through_auth(self):
+        refreshes = []
+        transport = Transport([Response(503), Response(body={"ok": True})])
+        tado = make_tado(transport, retry=RetryPolicy(backoff_factor=0))
+        tado.refresh_auth = lambda: refreshes.append(1)
+
+        assert tado.get_zone_states() == {"ok": True}
+        assert len(transport.sent) == 2
+        assert len(refreshes) == 2
+        assert tado.pipeline.middlewares[0].policy.stats["retries"] == 1
+
+    def test_user_middleware_sees_cache_hits(self):
+        recorder = Recorder()
+        transport = Transport()
+        tado = make_tado(transport, cache=True, middleware=[recorder])
+
+        tado.get_zones()
+        tado.get_zones()
+
+        assert len(transport.sent) == 1
+        assert [method for method, _, _ in recorder.seen] == ["GET", "GET"]
+
+    def test_async(self):
+        class AsyncTransport:
+            def __init__(self):
+                self.sent = []
+
+            async def request(self, method, url, timeout, headers=None, data=None):
+                self.sent.append((method, url, data))
+                return 200, {}, b'{"zoneStates": {}}' if method == "GET" else b""
+
+        async def run():
+            recorder = Recorder()
+            tado = AsyncTado("username", "password", "secret", transport=AsyncTransport(), home_id=1, middleware=[recorder])
+            async def refresh_auth():
+                tado.access_headers = {}
+            tado.refresh_auth = refresh_auth
+            states = await tado.get_zone_states()
+            deleted = await tado._api_minder_call("x", method="DELETE")
+            return states, deleted, recorder.seen
+
+        states, deleted, seen = asyncio.run(run())
+
+        assert states == {"zoneStates": {}}
+        assert deleted is None
+        assert [method for method, _, _ in seen] == ["GET", "DELETE"]
@@ -0,0 +1,106 @@
+import asyncio
+import copy
+
+from libtado.poller import (
+    FieldChanged,
+    LinkLost,
+    OverlayEnded,
+    OverlayStarted,
+    Poller,
+    Snapshot,
+    TemperatureChanged,
+    WindowOpened,
+)
+
+
+def zone_state(celsius=20.0, overlay=None, open_window=None, link="ONLINE"):
+    return {
+        "setting": {"type": "HEATING", "power": "ON", "temperature": {"celsius": 21.0}},
+        "overlay": overlay,
+        "openWindow": open_window,
+        "link": {"state": link},
+        "sensorDataPoints": {
+            "insideTemperature": {"celsius": celsius, "fahrenheit": celsius * 1.8 + 32, "timestamp": "2023-01-01T00:00:00Z"},
+            "humidity": {"percentage": 50.0, "timestamp": "2023-01-01T00:00:00Z"},
+        },
+    }
+
+
+class FakeTado:
+    def __init__(self, samples):
+        self.samples = list(samples)
+        self.calls = 0
+
+    def get_zone_states(self):
+        self.calls += 1
+        return self.samples.pop(0)
+
+
+class TestPoller:
+    def test_first_poll_is_a_snapshot(self):
+        sample = {"zoneStates": {"1": zone_state()}}
+        poller = Poller(FakeTado([sample]))
+
+        assert poller.poll() == [Snapshot("zone", None, (), None, sample)]
+
+    def test_unchanged_sample_yields_nothing(self):
+        sample = {"zoneStates": {"1": zone_state()}}
+        poller = Poller(FakeTado([sample, copy.deepcopy(sample)]))
+        poller.poll()
+
+        assert poller.poll() == []
+
+    def test_typed_events(self):
+        first = {"zoneStates": {"1": zone_state(), "2": zone_state()}}
+        overlay = {"type": "MANUAL", "termination": {"type": "MANUAL"}}
+        second = {"zoneStates": {
+            "1": zone_state(celsius=20.5, overlay=overlay),
+            "2": zone_state(open_window={"durationInSeconds": 900}, link="OFFLINE"),
+        }}
+        poller = Poller(FakeTado([first, second]))
+        poller.poll()
+
+        events = poller.poll()
+
+        assert OverlayStarted("zone", 1, ("overlay",), None, overlay) in events
+        assert TemperatureChanged("zone", 1, ("sensorDataPoints", "insideTemperature", "celsius"), 20.0, 20.5) in events
+        assert WindowOpened("zone", 2, ("openWindow",), None, {"durationInSeconds": 900}) in events
+        assert LinkLost("zone", 2, ("link", "state"), "ONLINE", "OFFLINE") in events
+        # Timestamps and Fahrenheit duplicates are not reported.
+        assert len(events) == 4
+
+    def test_zone_filter_and_generic_events(self):
+        overlay = {"type": "MANUAL"}
+        first = {"zoneStates": {"1": zone_state(overlay=overlay), "2": zone_state()}}
+        second = {"zoneStates": {"1": zone_state(), "2": zone_state(celsius=25.0)}}
+        second["zoneStates"]["1"]["tadoMode"] = "AWAY"
+        poller = Poller(FakeTado([first, second]), zones=[1], snapshot=False)
+
+        assert poller.poll() == []
+        assert poller.poll() == [
+            OverlayEnded("zone", 1, ("overlay",), overlay, None),
+            FieldChanged("zone", 1, ("tadoMode",), None, "AWAY"),
+        ]
+
+    def test_iterates_on_a_schedule(self):
+        samples = [{"zoneStates": {"1": zone_state(celsius=c)}} for c in (20.0, 20.0, 21.0)]
+        tado = FakeTado(samples)
+        poller = Poller(tado, interval=0.01, jitter=0.5, snapshot=False)
+
+        event = next(iter(poller))
+
+        assert isinstance(event, TemperatureChanged)
+        assert tado.calls == 3
+
+    def test_async_iterator(self):
+        samples = [{"zoneStates": {"1": zone_state(celsius=c)}} for c in (20.0, 21.0)]
+        poller = Poller(FakeTado(samples), interval=0, snapshot=False)
+
+        async def first():
+            async for event in poller:
+                poller.stop()
+                return event
+
+        event = asyncio.run(first())
+
+        assert event.new == 21.0
@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+from libtado.ratelimit import RateLimiter, TokenBucket
+
+
+class TestTokenBucket:
+    def test_burst_then_rate(self):
+        bucket = TokenBucket(rate=20, burst=3)
+
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        elapsed = time.monotonic() - start
+
+        assert 0.08 <= elapsed < 0.5
+
+    def test_fair_between_keys(self):
+        bucket = TokenBucket(rate=50, burst=1)
+        bucket.acquire()
+        served = []
+        lock = threading.Lock()
+
+        def worker(key):
+            bucket.acquire(key)
+            with lock:
+                served.append(key)
+
+        threads = [threading.Thread(target=worker, args=("busy",)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.01)
+        quiet = threading.Thread(target=worker, args=("quiet",))
+        quiet.start()
+        for thread in threads + [quiet]:
+            thread.join()
+
+        assert len(served) == 7
+        assert served.index("quiet") <= 2
+
+    def test_async(self):
+        bucket = TokenBucket(rate=20, burst=1)
+
+        async def main():
+            start = time.monotonic()
+            await asyncio.gather(*[bucket.acquire_async(key) for key in range(4)])
+            return time.monotonic() - start
+
+        assert 0.1 <= asyncio.run(main()) < 0.5
+
+
+class TestRateLimiter:
+    def test_per_host(self):
+        limiter = RateLimiter({"my.tado.com": (5, 2)}, default=None)
+
+        assert limiter.bucket("https://my.tado.com/api/v2/me").rate == 5
+        assert limiter.bucket("my.tado.com") is limiter.bucket("https://my.tado.com/api/v2/zones")
+        assert limiter.bucket("https://minder.tado.com/v1") is None
+        assert RateLimiter(default=(1, 1)).bucket("minder.tado.com").burst == 1
@@ -0,0 +1,58 @@
+import datetime
+
+import requests
+
+from libtado.api import Tado
+from libtado.reports import ReportCache, date_range
+
+
+class TestReportCache:
+    def test_roundtrip(self, tmp_path):
+        cache = ReportCache(str(tmp_path))
+
+        assert cache.get(1, 2, "2023-01-01") is None
+        cache.put(1, 2, "2023-01-01", {"hoursInDay": 24})
+
+        assert ReportCache(str(tmp_path)).get(1, 2, "2023-01-01") == {"hoursInDay": 24}
+        assert cache.get(1, 3, "2023-01-01") is None
+
+    def test_date_range(self):
+        assert date_range("2023-02-27", "2023-03-01") == [datetime.date(2023, 2, 27), datetime.date(2023, 2, 28), datetime.date(2023, 3, 1)]
+        assert date_range(datetime.date(2023, 1, 2), "2023-01-01") == []
+
+
+class TestGetReports:
+    def test_fetch_then_cache(self, tmp_path):
+        tado = Tado("username", "password", "secret", lazy=True, home_id=1)
+        calls = []
+
+        def get_report(zone, date):
+            calls.append((zone, date))
+            if zone == 2 and date == "2023-01-02":
+                raise requests.HTTPError("boom")
+            return {"zone": zone, "date": date}
+        tado.get_report = get_report
+
+        reports = {(zone, date): report for zone, date, report in tado.get_reports([1, 2], "2023-01-01", "2023-01-03", cache=str(tmp_path))}
+
+        assert len(reports) == 6
+        assert reports[(1, "2023-01-03")] == {"zone": 1, "date": "2023-01-03"}
+        assert isinstance(reports[(2, "2023-01-02")], requests.HTTPError)
+        assert len(calls) == 6
+
+        calls.clear()
+        reports = {(zone, date): report for zone, date, report in tado.get_reports([1, 2], "2023-01-01", "2023-01-03", cache=str(tmp_path))}
+
+        assert calls == [(2, "2023-01-02")]
+        assert reports[(2, "2023-01-01")] == {"zone": 2, "date": "2023-01-01"}
+        tado.close()
+
+    def test_today_not_cached(self, tmp_path):
+        tado = Tado("username", "password", "secret", lazy=True, home_id=1)
+        tado.get_report = lambda zone, date: {"date": date}
+        today = datetime.date.today()
+
+        list(tado.get_reports([1], today, today, cache=str(tmp_path)))
+
+        assert ReportCache(str(tmp_path)).get(1, 1, today.isoformat()) is None
+        tado.close()
@@ -0,0 +1,90 @@
+import pytest
+import requests
+
+from libtado.retry import RetryPolicy
+from libtado.transport import Transport
+
+ZONES = "my.tado.com/api/v2/homes/1/zones"
+
+
+def sent(server, path):
+    return [method for method, p in server.requests if p.split("?")[0] == path]
+
+
+class TestRetryPolicy:
+    def test_retry_after(self):
+        policy = RetryPolicy()
+
+        assert policy.retry_after({"Retry-After": "3"}) == 3
+        assert policy.retry_after({"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}) == 0
+        assert policy.retry_after({}) is None
+        assert policy.delay(0, {"Retry-After": "120"}) == policy.max_backoff
+
+    def test_backoff_bounds(self):
+        policy = RetryPolicy(backoff_factor=1)
+
+        assert all(0 <= policy.delay(3) <= 8 for _ in range(50))
+
+    def test_budget(self):
+        policy = RetryPolicy(total=10, budget=1)
+
+        assert policy.next_delay(0, 0, {"Retry-After": "5"}) is None
+        assert policy.next_delay(10, float("inf")) is None
+
+    def test_methods(self):
+        policy = RetryPolicy()
+
+        assert policy.allows("get")
+        assert not policy.allows("POST")
+        assert not RetryPolicy(total=0).allows("GET")
+
+
+class TestRetry:
+    def test_retries_until_success(self, server):
+        server.fail(ZONES, status=502)
+        server.fail(ZONES, status=429, headers={"Retry-After": "0"})
+        policy = RetryPolicy(backoff_factor=0.01)
+        t = server.client(retry=policy)
+
+        assert t.get_zones()[0]["id"] == 1
+        assert sent(server, ZONES) == ["GET", "GET", "GET"]
+        assert policy.stats["retries"] == 2
+        assert policy.stats[502] == 1
+        assert policy.stats[429] == 1
+
+    def test_gives_up(self, server):
+        server.fail(ZONES, status=503, times=None)
+        policy = RetryPolicy(total=2, backoff_factor=0.01)
+        t = server.client(retry=policy)
+
+        with pytest.raises(requests.HTTPError) as e:
+            t.get_zones()
+        assert e.value.response.status_code == 503
+        assert len(sent(server, ZONES)) == 3
+        assert policy.stats["gave_up"] == 1
+
+    def test_post_not_retried(self, server):
+        path = "energy-insights.tado.com/api/homes/1/costSimulator"
+        server.fail(path, status=502)
+        t = server.client(retry=RetryPolicy(backoff_factor=0.01))
+
+        with pytest.raises(requests.HTTPError):
+            t.set_cost_simulation("FRA", payload={})
+        assert sent(server, path) == ["POST"]
+
+    def test_connection_error(self, server):
+        server.fail(ZONES, status=None, times=None)
+        policy = RetryPolicy(total=1, backoff_factor=0.01)
+        t = server.client(retry=policy)
+
+        with pytest.raises(requests.ConnectionError):
+            t.get_zones()
+        assert policy.stats["ConnectionError"] == 1
+
+    def test_transport_does_not_retry(self, server):
+        server.fail(ZONES, status=503)
+
+        response = Transport().get("%s/%s" % (server.url, ZONES))
+
+        assert response.status_code == 503
+        assert sent(server, ZONES) == ["GET"]
@@ -0,0 +1,187 @@
+import asyncio
+import datetime
+
+import numpy as np
+import pytest
+
+from libtado.aio import AsyncTado
+from libtado.schedule import Block, CompiledSchedule, Schedule
+from tests.conftest import writes
+
+ZONES = "my.tado.com/api/v2/homes/1/zones"
+
+DESIRED = {
+    "timetable": "THREE_DAY",
+    "blocks": {
+        "MONDAY_TO_FRIDAY": [
+            {"start": "00:00", "end": "06:30", "temperature": 17},
+            {"start": "06:30", "end": "08:30", "temperature": 20},
+            {"start": "08:30", "end": "17:30", "temperature": 18},
+            {"start": "17:30", "end": "22:30", "temperature": 20},
+            {"start": "22:30", "end": "24:00", "temperature": 17},
+        ],
+        "SATURDAY": [
+            {"start": "00:00", "end": "09:00", "temperature": 17},
+            {"start": "09:00", "end": "00:00", "temperature": 20.5},
+        ],
+        "SUNDAY": [
+            {"start": "08:00", "end": "22:00", "temperature": 20},
+            {"start": "00:00", "end": "08:00", "temperature": 17},
+            {"start": "22:00", "end": "00:00", "temperature": 17},
+        ],
+    },
+}
+
+
+class TestSchedule:
+    def test_normalisation(self):
+        api = {"dayType": "SUNDAY", "start": "22:00", "end": "00:00", "geolocationOverride": False,
+               "setting": {"type": "HEATING", "power": "ON", "temperature": {"celsius": 17.0, "fahrenheit": 62.6}}}
+
+        assert Block.parse(api) == Block.parse({"start": "22:00", "end": "24:00", "temperature": 17})
+        assert Block.parse({"start": "00:00", "end": "00:00", "temperature": None}).to_api("SUNDAY")["setting"] == {"type": "HEATING", "power": "OFF"}
+
+    def test_validation(self):
+        with pytest.raises(ValueError):
+            Schedule("THREE_DAY", {"MONDAY_TO_SUNDAY": []})
+        with pytest.raises(ValueError):
+            Schedule("ONE_DAY", {"MONDAY_TO_SUNDAY": [{"start": "00:00", "end": "07:00", "temperature": 17}, {"start": "08:00", "end": "00:00", "temperature": 20}]})
+
+    def test_diff(self, server):
+        t = server.client()
+        schedule = Schedule.from_dict(DESIRED)
+
+        assert schedule.diff(2, {"id": 1}, t.get_schedule_blocks(2, 1))[0].day_type == "SATURDAY"
+        assert len(schedule.diff(2, {"id": 1}, t.get_schedule_blocks(2, 1))) == 1
+        assert Schedule("THREE_DAY", t.get_schedule_blocks(2, 1)).diff(2, {"id": 1}, t.get_schedule_blocks(2, 1)) == []
+
+
+class TestSyncSchedule:
+    def test_dry_run(self, server):
+        t = server.client()
+
+        plan = t.sync_schedule(Schedule.from_dict(DESIRED), [1, 2], dry_run=True)
+
+        assert writes(server) == []
+        assert str(plan).splitlines() == [
+            "Zone 1: set SATURDAY blocks to 00:00-09:00 17.0, 09:00-00:00 20.5",
+            "Zone 1: activate THREE_DAY timetable (was ONE_DAY)",
+            "Zone 2: set SATURDAY blocks to 00:00-09:00 17.0, 09:00-00:00 20.5",
+        ]
+
+    def test_apply(self, server):
+        t = server.client()
+
+        plan = t.sync_schedule(Schedule.from_dict(DESIRED))
+
+        assert not plan.failed
+        assert sorted(writes(server)) == [
+            ("PUT", ZONES + "/1/schedule/activeTimeTable"),
+            ("PUT", ZONES + "/1/schedule/timetables/1/blocks/SATURDAY"),
+            ("PUT", ZONES + "/2/schedule/timetables/1/blocks/SATURDAY"),
+        ]
+        saturday = server.fixtures["GET " + ZONES + "/2/schedule/timetables/1/blocks/SATURDAY"]
+        assert saturday[1]["setting"]["temperature"] == {"celsius": 20.5}
+
+    def test_failures(self, server):
+        t = server.client()
+        server.fail(ZONES + "/1/schedule/timetables/1/blocks/SATURDAY", status=500)
+        server.fail(ZONES + "/2/schedule/activeTimetable", status=500)
+
+        plan = t.sync_schedule(Schedule.from_dict(DESIRED))
+
+        assert plan.failed
+        assert list(plan.errors) == [2]
+        assert all(change.failed for change in plan)
+        assert writes(server) == [("PUT", ZONES + "/1/schedule/timetables/1/blocks/SATURDAY")]
+
+    def test_async(self, server):
+        async def run():
+            async with server.client(AsyncTado) as t:
+                return await t.sync_schedule(Schedule.from_dict(DESIRED), [2])
+
+        plan = asyncio.run(run())
+
+        assert [change.day_type for change in plan] == ["SATURDAY"]
+        assert writes(server) == [("PUT", ZONES + "/2/schedule/timetables/1/blocks/SATURDAY")]
+
+
+class TestCompiledSchedule:
+    def compiled(self, **kwargs):
+        blocks = [
+            {"dayType": "MONDAY_TO_FRIDAY", "start": "00:00", "end": "06:30", "setting": {"power": "ON", "temperature": {"celsius": 17}}},
+            {"dayType": "MONDAY_TO_FRIDAY", "start": "06:30", "end": "22:00", "setting": {"power": "ON", "temperature": {"celsius": 20}}},
+            {"dayType": "MONDAY_TO_FRIDAY", "start": "22:00", "end": "00:00", "setting": {"power": "ON", "temperature": {"celsius": 17}}},
+            {"dayType": "SATURDAY", "start": "00:00", "end": "00:00", "setting": {"power": "ON", "temperature": {"celsius": 19}}},
+            {"dayType": "SUNDAY", "start": "00:00", "end": "00:00", "setting": {"power": "OFF", "temperature": None}},
+        ]
+        return CompiledSchedule.from_api({"id": 1, "type": "THREE_DAY"}, blocks, timezone="Europe/Paris", **kwargs)
+
+    def test_at(self):
+        compiled = self.compiled()
+
+        assert compiled.at(datetime.datetime(2024, 1, 9, 6, 29)) == 17
+        assert compiled.at(datetime.datetime(2024, 1, 9, 6, 30)) == 20
+        assert compiled.at(datetime.datetime(2024, 1, 9, 21, 30, tzinfo=datetime.timezone.utc)) == 17
+        assert compiled.at(datetime.datetime(2024, 1, 13, 12, 0)) == 19
+        assert compiled.at(datetime.datetime(2024, 1, 14, 12, 0)) is None
+
+    def test_evaluate_matches_at(self):
+        compiled = self.compiled()
+        # A week across the switch to summer time.
+        start = int(datetime.datetime(2024, 3, 27, tzinfo=datetime.timezone.utc).timestamp())
+        timestamps = np.arange(start, start + 7 * 86400, 300)
+
+        expected = [compiled.at(int(ts)) for ts in timestamps]
+
+        values = compiled.evaluate(timestamps)
+        assert [None if np.isnan(v) else v for v in values] == expected
+        assert np.array_equal(compiled.evaluate(timestamps.astype("datetime64[s]")), values, equal_nan=True)
+
+    def test_evaluate_half_hour_zone(self):
+        blocks = [
+            {"dayType": "MONDAY_TO_SUNDAY", "start": "00:00", "end": "03:00", "setting": {"power": "ON", "temperature": {"celsius": 17}}},
+            {"dayType": "MONDAY_TO_SUNDAY", "start": "03:00", "end": "00:00", "setting": {"power": "ON", "temperature": {"celsius": 20}}},
+        ]
+        compiled = CompiledSchedule.from_api({"id": 0, "type": "ONE_DAY"}, blocks, timezone="America/St_Johns")
+        # Newfoundland switches from UTC-3:30 to UTC-2:30 at 05:30 UTC.
+        start = int(datetime.datetime(2024, 3, 10, 3, tzinfo=datetime.timezone.utc).timestamp())
+        timestamps = np.arange(start, start + 4 * 3600, 300)
+
+        values = compiled.evaluate(timestamps)
+
+        assert values.tolist() == [compiled.at(int(ts)) for ts in timestamps]
+        assert compiled.at(datetime.datetime(2024, 3, 10, 5, 30, tzinfo=datetime.timezone.utc)) == 20
+
+    def test_overlay(self):
+        since = datetime.datetime(2024, 1, 9, 12, 0, tzinfo=datetime.timezone.utc)
+        state = {"overlay": {"setting": {"power": "ON", "temperature": {"celsius": 23}}, "termination": {"projectedExpiry": "2024-01-09T14:00:00Z"}}}
+        compiled = self.compiled(state=state, since=since)
+
+        assert compiled.at(since - datetime.timedelta(minutes=1)) == 20
+        assert compiled.at(since) == 23
+        assert compiled.at(datetime.datetime(2024, 1, 9, 14, 0, tzinfo=datetime.timezone.utc)) == 20
+        timestamps, values = compiled.curve(since, since + datetime.timedelta(hours=3), step=3600)
+        assert values.tolist() == [23, 23, 20]
+
+    def test_compile_schedule(self, server):
+        t = server.client()
+
+        compiled = t.compile_schedule(2)
+        requests = len(server.requests)
+
+        assert compiled.schedule.timetable == "THREE_DAY"
+        assert compiled.at(datetime.datetime(2030, 1, 5, 12, 0)) == 21.0
+        assert compiled.block_at(datetime.datetime(2030, 1, 5, 12, 0)).celsius == 20.0
+        assert compiled.at(datetime.datetime(2000, 1, 1, 12, 0)) == 20.0
+        assert len(server.requests) == requests
+
+    def test_compile_schedule_async(self, server):
+        async def run():
+            async with server.client(AsyncTado) as t:
+                return await t.compile_schedule(1, overlay=False)
+
+        compiled = asyncio.run(run())
+
+        assert compiled.at(datetime.datetime(2030, 1, 5, 7, 0)) == 20.0
+        assert compiled.overlay is None
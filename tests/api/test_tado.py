@@ -1,3 +1,142 @@
+import threading
+import time
+
+import requests
+
+from libtado.api import Tado
+from libtado.cache import ResponseCache
+from tests.conftest import Response, Transport, make_tado
+
+
+def with_api_call(api_call):
+    tado = Tado("username", "password", "secret", lazy=True, home_id=1)
+    tado._api_call = api_call
+    return tado
+
 
 class TestTado:
-    pass
+    def test_map_zones(self):
+        def api_call(cmd, data=False, method="GET", decode=None):
+            if cmd == "homes/1/zones":
+                return [{"id": 1}, {"id": 2}, {"id": 3}]
+            if cmd == "homes/1/zones/2/capabilities":
+                raise requests.HTTPError("boom")
+            return {"cmd": cmd}
+        tado = with_api_call(api_call)
+
+        response = tado.map_zones("get_capabilities")
+
+        assert list(response) == [1, 2, 3]
+        assert response[1] == {"cmd": "homes/1/zones/1/capabilities"}
+        assert isinstance(response[2], requests.HTTPError)
+        assert response[3] == {"cmd": "homes/1/zones/3/capabilities"}
+
+    def test_map_zones_extra_args(self):
+        tado = with_api_call(lambda cmd, data=False, method="GET", decode=None: cmd)
+
+        response = tado.map_zones("get_schedule_blocks", 1, zones=[4])
+
+        assert response == {4: "homes/1/zones/4/schedule/timetables/1/blocks"}
+        assert tado.map_zones("get_state", zones=[4], model=False) == {4: "homes/1/zones/4/state"}
+
+    def test_cache_invalidated_by_setter(self):
+        transport = Transport()
+        tado = make_tado(transport, cache=ResponseCache())
+
+        tado.get_zones()
+        tado.get_zones()
+        assert len(transport.sent) == 1
+        tado.set_temperature(1, 21)
+        tado.get_zones()
+        assert [method for method, _, _ in transport.sent] == ["GET", "PUT"]
+        tado.set_zone_name(1, "Kitchen")
+        tado.get_zones()
+        assert [method for method, _, _ in transport.sent] == ["GET", "PUT", "PUT", "GET"]
+
+    def test_conditional_requests(self):
+        transport = Transport([Response(200, {"zoneStates": {}}, {"ETag": '"v1"'}), Response(304)])
+        tado = make_tado(transport, conditional=True)
+
+        first = tado.get_zone_states()
+        second = tado.get_zone_states()
+
+        assert second is first
+        assert transport.headers == [{}, {"If-None-Match": '"v1"'}]
+        assert (tado.conditional.hits, tado.conditional.misses) == (1, 1)
+
+    def test_lazy_does_no_io(self):
+        tado = Tado("username", "password", "secret", lazy=True)
+        calls = []
+        tado._api_call = lambda cmd, data=False, method="GET", decode=None: calls.append(cmd) or {"homes": [{"id": 7}]}
+
+        assert tado.access_token is None
+        assert calls == []
+        assert tado.id == 7
+        assert tado.id == 7
+        assert calls == ["me"]
+        tado.close()
+
+    def test_home_id_skips_me(self):
+        tado = Tado("username", "password", "secret", lazy=True, home_id=3)
+        tado._api_call = lambda cmd, data=False, method="GET", decode=None: cmd
+
+        assert tado.get_zones() == "homes/3/zones"
+        tado.close()
+
+    def test_refresh_auth_single_flight(self):
+        tado = Tado("username", "password", "secret", lazy=True, home_id=1)
+        refreshes = []
+
+        def refresh():
+            refreshes.append(threading.current_thread().name)
+            time.sleep(0.05)
+            tado._set_token("access", "refresh", time.time() + 600)
+        tado._refresh = refresh
+
+        threads = [threading.Thread(target=tado.refresh_auth) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(refreshes) == 1
+        assert tado.access_headers == {"Authorization": "Bearer access"}
+        tado.close()
+
+    def test_auto_refresh(self):
+        tado = Tado("username", "password", "secret", lazy=True, home_id=1)
+        tado._set_token("old", "refresh", time.time() + 61)
+        tado._refresh = lambda: tado._set_token("new", "refresh", time.time() + 600)
+
+        tado.start_auto_refresh(margin=60)
+        deadline = time.time() + 5
+        while tado.access_token == "old" and time.time() < deadline:
+            time.sleep(0.05)
+        tado.close()
+
+        assert tado.access_token == "new"
+        assert tado._refresher is None
+
+    def test_home_views(self):
+        calls = []
+        tado = with_api_call(lambda cmd, data=False, method="GET", decode=None: calls.append(cmd) or {"homes": [{"id": 1}, {"id": 2}]})
+
+        response = tado.map_homes("get_zone_states")
+
+        assert list(response) == [1, 2]
+        assert sorted(calls) == ["homes/1/zoneStates", "homes/2/zoneStates", "me"]
+        assert tado.home(2).id == 2
+        assert tado.id == 1
+
+    def test_home_view_shares_token(self):
+        tado = Tado("username", "password", "secret", lazy=True, home_id=1)
+        tado._refresh = lambda: tado._set_token("access", "refresh", time.time() + 600)
+        view = tado.home(2)
+
+        view.refresh_auth()
+
+        assert view.access_headers is tado.access_headers
+        assert tado.access_token == "access"
+        view.close()
+        assert tado.transport.session.adapters
+        tado.close()
@@ -0,0 +1,87 @@
+import math
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from libtado.timeseries import DayReportSeries, parse_timestamps  # noqa: E402
+
+
+def day_report(day, temperature):
+    return {
+        "zoneType": "HEATING",
+        "hoursInDay": 24,
+        "measuredData": {
+            "measuringDeviceConnected": {
+                "timeSeriesType": "dataIntervals",
+                "dataIntervals": [{"from": "%sT00:00:00.000Z" % day, "to": "%sT23:59:59.000Z" % day, "value": True}],
+            },
+            "insideTemperature": {
+                "timeSeriesType": "dataPoints",
+                "dataPoints": [
+                    {"timestamp": "%sT00:00:00.000Z" % day, "value": {"celsius": temperature, "fahrenheit": 0}},
+                    {"timestamp": "%sT12:00:00.000Z" % day, "value": {"celsius": temperature + 1, "fahrenheit": 0}},
+                ],
+            },
+            "humidity": {
+                "timeSeriesType": "dataPoints",
+                "dataPoints": [{"timestamp": "%sT00:00:00.000Z" % day, "value": 0.5}],
+            },
+        },
+        "settings": {
+            "timeSeriesType": "dataIntervals",
+            "dataIntervals": [
+                {"from": "%sT00:00:00.000Z" % day, "to": "%sT06:00:00.000Z" % day, "value": {"type": "HEATING", "power": "OFF", "temperature": None}},
+                {"from": "%sT06:00:00.000Z" % day, "to": "%sT23:59:59.000Z" % day, "value": {"type": "HEATING", "power": "ON", "temperature": {"celsius": 20.0}}},
+            ],
+        },
+        "callForHeat": {
+            "timeSeriesType": "dataIntervals",
+            "dataIntervals": [{"from": "%sT06:00:00.000Z" % day, "to": "%sT07:00:00.000Z" % day, "value": "HIGH"}],
+        },
+        "weather": {
+            "condition": {
+                "timeSeriesType": "dataIntervals",
+                "dataIntervals": [{"from": "%sT00:00:00.000Z" % day, "to": "%sT23:59:59.000Z" % day, "value": {"state": "CLOUDY", "temperature": {"celsius": 4.5}}}],
+            },
+            "sunny": {"timeSeriesType": "dataIntervals", "dataIntervals": []},
+        },
+    }
+
+
+class TestDayReportSeries:
+    def test_parse_timestamps(self):
+        assert parse_timestamps(["1970-01-01T00:01:00.000Z"]).tolist() == [60]
+        assert parse_timestamps([]).dtype == np.int64
+
+    def test_from_report(self):
+        series = DayReportSeries.from_report(day_report("2023-01-01", 19.0))
+
+        assert series.inside_temperature.values.dtype == np.float32
+        assert series.inside_temperature.values.tolist() == [19.0, 20.0]
+        assert series.humidity.values.tolist() == [0.5]
+        assert math.isnan(series.setting.values[0])
+        assert series.setting.values[1] == 20.0
+        assert series.call_for_heat.values.tolist() == [3.0]
+        assert series.weather_temperature.values.tolist() == [4.5]
+        assert len(series.sunny) == 0
+
+    def test_from_reports_sorted(self):
+        series = DayReportSeries.from_reports([day_report("2023-01-02", 15.0), day_report("2023-01-01", 19.0)])
+
+        assert series.inside_temperature.values.tolist() == [19.0, 20.0, 15.0, 16.0]
+        assert (np.diff(series.setting.starts) > 0).all()
+
+    def test_grid(self):
+        series = DayReportSeries.from_report(day_report("2023-01-01", 19.0))
+
+        timestamps, columns = series.grid(step=3600)
+
+        assert len(timestamps) == 24
+        assert timestamps[0] == parse_timestamps(["2023-01-01T00:00:00Z"])[0]
+        assert columns["inside_temperature"][11] == 19.0
+        assert columns["inside_temperature"][12] == 20.0
+        assert math.isnan(columns["setting"][5])
+        assert columns["setting"][6] == 20.0
+        assert columns["call_for_heat"][6] == 3.0
+        assert math.isnan(columns["call_for_heat"][7])
@@ -0,0 +1,69 @@
+import os
+import stat
+import threading
+import time
+
+from libtado.api import Tado
+from libtado.tokenstore import FileTokenStore, MemoryTokenStore
+
+TOKEN = {"access_token": "access", "refresh_token": "refresh", "token_expiry": time.time() + 600, "home_id": 42}
+
+
+class TestFileTokenStore:
+    def test_roundtrip(self, tmp_path):
+        path = str(tmp_path / "sub" / "tokens.json")
+        store = FileTokenStore(path)
+
+        assert store.load("user") is None
+        store.save("user", TOKEN)
+        store.save("other", dict(TOKEN, home_id=1))
+
+        assert FileTokenStore(path).load("user") == TOKEN
+        assert FileTokenStore(path).load("other")["home_id"] == 1
+        assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+        assert [name for name in os.listdir(tmp_path / "sub") if name.startswith(".tokens-")] == []
+
+    def test_save_while_locked(self, tmp_path):
+        store = FileTokenStore(str(tmp_path / "tokens.json"))
+
+        with store.lock("user"):
+            store.save("user", TOKEN)
+
+        assert store.load("user") == TOKEN
+
+    def test_lock_depth_per_thread(self, tmp_path):
+        store = FileTokenStore(str(tmp_path / "tokens.json"))
+        holders, entered, release = [], threading.Event(), threading.Event()
+
+        def hold():
+            with store.lock("user"):
+                holders.append(threading.current_thread().name)
+                entered.set()
+                release.wait(5)
+
+        with store.lock("user"):
+            with store.lock("user"):
+                store.save("user", TOKEN)
+            thread = threading.Thread(target=hold)
+            thread.start()
+            assert not entered.wait(0.1)
+        assert entered.wait(5)
+        release.set()
+        thread.join()
+
+        assert len(holders) == 1
+        assert getattr(store._held, "depth", 0) == 0
+        with store.lock("user"):
+            assert store._held.depth == 1
+
+
+class TestTokenStoreResume:
+    def test_resume_skips_login(self):
+        store = MemoryTokenStore()
+        store.save("user", TOKEN)
+
+        tado = Tado("user", "password", "secret", token_store=store)
+
+        assert tado.id == 42
+        assert tado.access_headers == {"Authorization": "Bearer access"}
+        tado.close()
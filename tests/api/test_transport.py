@@ -0,0 +1,25 @@
+from libtado.transport import Transport
+
+
+class TestTransport:
+    def test_mount_per_host_pool_size(self):
+        transport = Transport(pool_size={"my.tado.com": 20}, hosts=["https://my.tado.com/api/v2", "https://acme.tado.com/v1"])
+
+        adapter = transport.session.get_adapter("https://my.tado.com/api/v2/me")
+        assert adapter._pool_maxsize == 20
+        adapter = transport.session.get_adapter("https://acme.tado.com/v1/homes")
+        assert adapter._pool_maxsize == Transport.default_pool_size
+
+    def test_mount_is_idempotent(self):
+        transport = Transport(pool_size=5)
+
+        assert transport.mount("https://minder.tado.com/v1") == "minder.tado.com"
+        adapter = transport.session.get_adapter("https://minder.tado.com/v1/x")
+        transport.mount("minder.tado.com")
+        assert transport.session.get_adapter("https://minder.tado.com/v1/x") is adapter
+        assert adapter._pool_maxsize == 5
+
+    def test_keep_alive_disabled(self):
+        transport = Transport(keep_alive=False)
+
+        assert transport.session.headers["Connection"] == "close"
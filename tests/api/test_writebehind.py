@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+import requests
+
+from libtado.schedule import Schedule
+from libtado.writebehind import WriteBehind
+from tests.conftest import writes
+
+OVERLAY = "my.tado.com/api/v2/homes/1/zones/1/overlay"
+
+
+class TestWriteBehind:
+    def test_coalesces_writes(self, server):
+        t = server.client(write_behind=WriteBehind(delay=10))
+
+        futures = [t.set_temperature(1, temperature) for temperature in (19, 20, 21)]
+        futures.append(t.set_early_start(1, True))
+        assert len(t.write_behind) == 2
+        assert writes(server) == []
+
+        assert t.flush(timeout=5)
+        assert sorted(writes(server)) == [("PUT", "my.tado.com/api/v2/homes/1/zones/1/earlyStart"), ("PUT", OVERLAY)]
+        assert [f.result()["setting"]["temperature"]["celsius"] for f in futures[:3]] == [21, 21, 21]
+        assert t.write_behind.sent == 2
+        assert t.write_behind.coalesced == 2
+
+    def test_last_write_wins_across_setters(self, server):
+        t = server.client(write_behind=WriteBehind(delay=10))
+
+        t.set_temperature(1, 21)
+        future = t.end_manual_control(1)
+        t.flush()
+
+        assert writes(server) == [("DELETE", OVERLAY)]
+        assert future.result() is None
+
+    def test_reads_are_not_queued(self, server):
+        t = server.client(write_behind=True)
+
+        assert t.get_zones()[0]["id"] == 1
+
+    def test_background_send(self, server):
+        t = server.client(write_behind=WriteBehind(delay=0))
+        done = threading.Event()
+
+        t.set_home_state(False).add_done_callback(lambda f: done.set())
+
+        assert done.wait(5)
+        assert writes(server) == [("PUT", "my.tado.com/api/v2/homes/1/presenceLock")]
+
+    def test_errors(self, server):
+        t = server.client(write_behind=WriteBehind(delay=10))
+        server.fail(OVERLAY, status=422, method="PUT")
+
+        first, last = t.set_temperature(1, 20), t.set_temperature(1, 21)
+        t.flush()
+
+        for future in (first, last):
+            with pytest.raises(requests.HTTPError):
+                future.result()
+
+    def test_close(self, server):
+        t = server.client(write_behind=WriteBehind(delay=10))
+
+        future = t.set_open_window_detection(1, True, 900)
+        t.close()
+
+        assert future.done()
+        with pytest.raises(RuntimeError):
+            t.set_temperature(1, 21)
+
+    def test_other_writes_are_sent_at_once(self, server):
+        t = server.client(write_behind=WriteBehind(delay=10))
+
+        t.set_zone_name(1, "Kitchen")
+
+        assert writes(server) == [("PUT", "my.tado.com/api/v2/homes/1/zones/1/details")]
+        assert len(t.write_behind) == 0
+
+    def test_sync_schedule_sees_failures(self, server):
+        t = server.client(write_behind=WriteBehind(delay=10))
+        blocks = "my.tado.com/api/v2/homes/1/zones/2/schedule/timetables/0/blocks/MONDAY_TO_SUNDAY"
+        server.fail(blocks, status=422, method="PUT")
+        schedule = Schedule.from_dict({"timetable": "ONE_DAY", "blocks": {"MONDAY_TO_SUNDAY": [{"start": "00:00", "end": "00:00", "temperature": 18.5}]}})
+
+        plan = t.sync_schedule(schedule, zones=[2])
+
+        assert plan.failed
+        assert len(plan.changes) == 2
+        assert all(isinstance(change.result, requests.HTTPError) for change in plan)
+        assert writes(server) == [("PUT", blocks)]
+
+    def test_bulk_setters_return_results(self, server):
+        t = server.client(write_behind=WriteBehind(delay=0.05))
+        server.fail("my.tado.com/api/v2/homes/1/zones/2/overlay", status=422, method="PUT")
+
+        results = t.set_temperatures({1: 21, 2: 20})
+
+        assert results[1]["setting"]["temperature"]["celsius"] == 21
+        assert isinstance(results[2], requests.HTTPError)
+        assert t.end_manual_control_all() == {1: None, 2: None}
+        assert t.write_behind.sent == 4
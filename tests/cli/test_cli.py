@@ -1,3 +1,126 @@
+import json
+
+from click.testing import CliRunner
+
+from libtado.__main__ import apply, main, set_temperature, status, zone
+from libtado.schedule import load_schedule
+from tests.conftest import writes
+
+
+def zone_state(celsius):
+    return {
+        "tadoMode": "HOME",
+        "setting": {"type": "HEATING", "power": "ON", "temperature": {"celsius": celsius}},
+        "overlayType": None,
+        "overlay": None,
+        "openWindow": None,
+        "nextScheduleChange": None,
+        "link": {"state": "ONLINE"},
+        "activityDataPoints": {"heatingPower": {"percentage": 0.0}},
+        "sensorDataPoints": {"insideTemperature": {"celsius": 19.5}, "humidity": {"percentage": 50.0}},
+    }
+
+
+class FakeTado:
+    def __init__(self):
+        self.calls = []
+
+    def get_zones(self):
+        self.calls.append("get_zones")
+        return [
+            {"id": 1, "name": "Living", "type": "HEATING", "devices": []},
+            {"id": 2, "name": "Bedroom", "type": "HEATING", "devices": []},
+        ]
+
+    def get_zone_states(self):
+        self.calls.append("get_zone_states")
+        return {"zoneStates": {"1": zone_state(20.0), "2": zone_state(18.0)}}
+
+    def get_state(self, zone):
+        self.calls.append("get_state")
+        return zone_state(20.0)
+
+    def set_temperature(self, zone, temperature, termination="MANUAL"):
+        self.calls.append("set_temperature")
+
+    def set_temperatures(self, temperatures, termination="MANUAL"):
+        self.calls.append("set_temperatures")
+        return {z: ValueError("out of range") if z == 2 else {} for z in temperatures}
+
 
 class TestCli:
-    pass
+    def test_status_uses_zone_states(self):
+        tado = FakeTado()
+
+        result = CliRunner().invoke(status, obj=tado)
+
+        assert result.exit_code == 0, result.output
+        assert tado.calls == ["get_zones", "get_zone_states"]
+        assert "Living" in result.output
+        assert "Bedroom" in result.output
+
+    def test_zone_several(self):
+        tado = FakeTado()
+
+        result = CliRunner().invoke(zone, ["-z", "1", "-z", "2"], obj=tado)
+
+        assert result.exit_code == 0, result.output
+        assert tado.calls == ["get_zone_states"]
+        assert "Zone 2:" in result.output
+        assert "Desired Temperature : 18.0" in result.output
+
+    def test_zone_unknown(self):
+        result = CliRunner().invoke(zone, ["-z", "1", "-z", "7"], obj=FakeTado())
+
+        assert result.exit_code == 2
+        assert "unknown zone 7" in result.output
+        assert "Traceback" not in result.output
+
+    def test_help_does_no_io(self):
+        result = CliRunner().invoke(main, ["-u", "username", "-p", "password", "-c", "secret", "status", "--help"])
+
+        assert result.exit_code == 0, result.output
+        assert "--watch" in result.output
+
+    def test_set_temperature_single(self):
+        tado = FakeTado()
+
+        result = CliRunner().invoke(set_temperature, ["-z", "1", "-t", "21"], obj=tado)
+
+        assert result.exit_code == 0, result.output
+        assert tado.calls == ["set_temperature"]
+
+    def test_set_temperature_all(self):
+        tado = FakeTado()
+
+        result = CliRunner().invoke(set_temperature, ["--all", "-t", "21"], obj=tado)
+
+        assert result.exit_code == 1
+        assert tado.calls == ["get_zones", "set_temperatures"]
+        assert "Zone 1: ok" in result.output
+        assert "Zone 2: failed: out of range" in result.output
+        assert "Error: 1 of 2 zones failed" in result.output
+
+    def test_schedule_apply_dry_run(self, server, tmp_path):
+        path = tmp_path / "schedule.json"
+        blocks = [{"start": "00:00", "end": "00:00", "temperature": 19}]
+        path.write_text(json.dumps({"timetable": "ONE_DAY", "blocks": {"MONDAY_TO_SUNDAY": blocks}, "zones": [1]}))
+
+        result = CliRunner().invoke(apply, [str(path), "--dry-run"], obj=server.client())
+
+        assert result.exit_code == 0, result.output
+        assert result.output == "Zone 1: set MONDAY_TO_SUNDAY blocks to 00:00-00:00 19.0\n"
+        assert writes(server) == []
+        assert load_schedule(str(path)).zones == [1]
+
+    def test_schedule_apply_failure(self, server, tmp_path):
+        path = tmp_path / "schedule.json"
+        blocks = [{"start": "00:00", "end": "00:00", "temperature": 19}]
+        path.write_text(json.dumps({"timetable": "ONE_DAY", "blocks": {"MONDAY_TO_SUNDAY": blocks}}))
+        server.fail("my.tado.com/api/v2/homes/1/zones/2/schedule/*", status=500, times=None)
+
+        result = CliRunner().invoke(apply, [str(path), "-z", "1", "-z", "2"], obj=server.client())
+
+        assert result.exit_code == 1
+        assert "Zone 1: set MONDAY_TO_SUNDAY blocks" in result.output
+        assert "Error: 1 of 2 zones failed" in result.output
@@ -0,0 +1,64 @@
+import json
+import os
+
+import pytest
+import requests
+
+from libtado.api import Tado
+from libtado.mock import MockTadoServer
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "tado.json")
+
+
+class Response:
+    def __init__(self, status_code=200, body=None, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.content = b"" if body is None else json.dumps(body).encode()
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError("%i" % self.status_code, response=self)
+
+
+class Transport:
+    """Replays `responses` in order, then answers `{"method": <verb>}`."""
+
+    def __init__(self, responses=None):
+        self.sent = []
+        self.headers = []
+        self.responses = list(responses or [])
+
+    def mount(self, url):
+        pass
+
+    def request(self, method, url, headers=None, data=None, **kwargs):
+        self.sent.append((method, url, data))
+        self.headers.append(headers)
+        if self.responses:
+            return self.responses.pop(0)
+        return Response(body={"method": method})
+
+    def post(self, url, **kwargs):
+        return Response(body={"access_token": "a", "refresh_token": "r", "expires_in": 600})
+
+    def close(self):
+        pass
+
+
+def make_tado(transport, **kwargs):
+    tado = Tado("username", "password", "secret", lazy=True, home_id=1, transport=transport, **kwargs)
+    tado.refresh_auth = lambda: None
+    tado.access_headers = {}
+    return tado
+
+
+@pytest.fixture
+def server():
+    with MockTadoServer(FIXTURES) as server:
+        yield server
+
+
+def writes(server):
+    """The writes received by `server`, in order, logins excluded."""
+    return [(method, path) for method, path in server.requests if method != "GET" and not path.endswith("oauth/token")]